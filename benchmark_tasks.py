@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+Benchmark the Celery tasks in src/tasks.py on deterministic synthetic inputs.
+
+Every task function is called eagerly (no broker, no worker) in its own fresh
+process, so peak RSS is per case. For each case wall time, CPU time, peak
+RSS and output size are recorded and written as JSON; pass ``--compare`` with
+an earlier file to see how a change moved the numbers.
+
+Runs offline: fixtures are generated with Pillow and the local ffmpeg,
+gifsicle is used when it is on PATH, GCS is disabled and job metrics go to
+a throwaway SQLite database inside the work directory.
+
+    python benchmark_tasks.py --sizes small,720p --output bench.json
+    python benchmark_tasks.py --compare bench.json --output bench-new.json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from multiprocessing import get_context
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# name -> canvas size, GIF frames, still images, video seconds
+SIZES = {
+    "small": {"size": (320, 240), "frames": 24, "images": 10, "seconds": 2},
+    "720p": {"size": (1280, 720), "frames": 24, "images": 10, "seconds": 2},
+    "1080p": {"size": (1920, 1080), "frames": 24, "images": 10, "seconds": 2},
+    # More frames than MAX_GIF_FRAMES, so decimation is part of the measurement.
+    "long": {"size": (480, 270), "frames": 400, "images": 60, "seconds": 20},
+}
+VIDEO_FPS = 15
+SEED = 1234
+
+TEXT_LAYERS = [
+    {"text": "Benchmark", "font_size": 32, "color": "#ffffff", "stroke_color": "#000000", "stroke_width": 2,
+     "start_frame": 0, "end_frame": 8, "animation_style": "fade"},
+    {"text": "caption", "font_size": 20, "color": "#ffcc00", "vertical_align": "top",
+     "start_frame": 0, "end_frame": 10_000},
+]
+
+# Tasks that need the network or a broker; listed in the output but not run.
+SKIPPED = {
+    "orchestrate_gif_from_urls_task": "downloads remote URLs and dispatches a chord",
+    "handle_upload_task": "downloads a remote URL",
+    "download_file_from_url_task": "downloads a remote URL",
+}
+
+
+# --------------------------------------------------------------------------
+# Fixtures
+
+def _frame(size, i, n, rng_seed):
+    """One deterministic RGB frame: a gradient with a moving disc and a noisy band."""
+    import numpy as np
+    from PIL import Image, ImageDraw
+
+    w, h = size
+    x = np.linspace(0, 255, w, dtype=np.float32)
+    y = np.linspace(0, 255, h, dtype=np.float32)[:, None]
+    shift = 255.0 * i / max(n, 1)
+    arr = np.empty((h, w, 3), dtype=np.uint8)
+    arr[..., 0] = (x + shift) % 256
+    arr[..., 1] = (y + x * 0.25) % 256
+    arr[..., 2] = (255 - y + shift * 0.5) % 256
+    rng = np.random.default_rng(rng_seed + i)
+    band = slice(h * 3 // 4, h * 3 // 4 + max(1, h // 16))
+    arr[band] = rng.integers(0, 256, arr[band].shape, dtype=np.uint8)
+    im = Image.fromarray(arr)
+    r = max(4, min(w, h) // 8)
+    cx = int((w - 2 * r) * i / max(n - 1, 1)) + r
+    cy = h // 3
+    ImageDraw.Draw(im).ellipse((cx - r, cy - r, cx + r, cy + r), fill=(250, 240, 40))
+    return im
+
+
+def _sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as fp:
+        for chunk in iter(lambda: fp.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def make_gif(path, size, frames):
+    from PIL import Image
+
+    images = [_frame(size, i, frames, SEED).quantize(colors=256, method=Image.Quantize.MEDIANCUT, dither=Image.Dither.NONE)
+              for i in range(frames)]
+    images[0].save(path, save_all=True, append_images=images[1:], duration=80, loop=0, disposal=1)
+
+
+def make_images(directory, size, count):
+    os.makedirs(directory, exist_ok=True)
+    for i in range(count):
+        _frame(size, i, count, SEED + 7).save(os.path.join(directory, f"image_{i:03d}.png"))
+
+
+def make_video(path, size, seconds, ffmpeg):
+    codec = ["-c:v", "libx264", "-preset", "veryfast", "-threads", "1", "-pix_fmt", "yuv420p"]
+    encoders = subprocess.run([ffmpeg, "-hide_banner", "-encoders"], capture_output=True, text=True).stdout
+    if "libx264" not in encoders:
+        codec = ["-c:v", "mpeg4", "-q:v", "4"]
+    subprocess.run([ffmpeg, "-y", "-loglevel", "error", "-f", "lavfi",
+                    "-i", f"testsrc2=size={size[0]}x{size[1]}:rate=30:duration={seconds}",
+                    *codec, "-bitexact", path], check=True)
+
+
+def build_fixtures(work_dir, sizes, ffmpeg):
+    """Create (or reuse) the fixtures for ``sizes``; return ``{size: {"gif", "images", "video"}}``."""
+    fixtures = {}
+    for name in sizes:
+        spec = SIZES[name]
+        base = os.path.join(work_dir, "fixtures", name)
+        os.makedirs(base, exist_ok=True)
+        gif = os.path.join(base, "input.gif")
+        if not os.path.exists(gif):
+            print(f"🎞  generating {name} GIF ({spec['frames']} frames, {spec['size'][0]}x{spec['size'][1]})")
+            make_gif(gif, spec["size"], spec["frames"])
+        images = os.path.join(base, "images")
+        if not os.path.isdir(images) or len(os.listdir(images)) != spec["images"]:
+            shutil.rmtree(images, ignore_errors=True)
+            make_images(images, spec["size"], spec["images"])
+        video = os.path.join(base, "input.mp4")
+        if ffmpeg and not os.path.exists(video):
+            print(f"🎬 generating {name} video ({spec['seconds']}s)")
+            make_video(video, spec["size"], spec["seconds"], ffmpeg)
+        fixtures[name] = {
+            "gif": gif,
+            "images": sorted(os.path.join(images, f) for f in os.listdir(images)),
+            "video": video if ffmpeg else None,
+            "sha256": {"gif": _sha256(gif), **({"video": _sha256(video)} if ffmpeg else {})},
+        }
+    return fixtures
+
+
+# --------------------------------------------------------------------------
+# Cases
+
+def cases(fixture, size_name):
+    """``(task_name, input_kind, args_builder)`` for one fixture size.
+
+    ``args_builder(inputs, out_dir, upload_folder)`` gets private copies of the
+    inputs (tasks delete what they are given).
+    """
+    w, h = SIZES[size_name]["size"]
+    segments = [{"start": 0, "end": SIZES[size_name]["seconds"]}]
+    edit_ops = [
+        {"type": "crop", "x": w // 8, "y": h // 8, "width": w * 3 // 4, "height": h * 3 // 4},
+        {"type": "resize", "width": w // 2, "height": h // 2, "maintain_aspect_ratio": True},
+        {"type": "text", "layers": TEXT_LAYERS},
+        {"type": "optimize", "quality": 60},
+    ]
+    out = [
+        ("resize_gif_task", "gif", lambda i, o, u: (i, w // 2, h // 2, True, o, u)),
+        ("crop_gif_task", "gif", lambda i, o, u: (i, w // 8, h // 8, w // 2, h // 2, "free", o, u)),
+        ("reverse_gif_task", "gif", lambda i, o, u: (i, o, u)),
+        ("optimize_gif_task", "gif", lambda i, o, u: (i, 60, 256, 0, "floyd-steinberg", 2, o, u)),
+        ("add_text_to_gif_task", "gif", lambda i, o, u: (i, "Benchmark text", 28, "#ffffff", "Arial", "#000000", 2,
+                                                         "center", "bottom", 0, 0, 0, 8, "fade", o, u)),
+        ("add_text_layers_to_gif_task", "gif", lambda i, o, u: (i, TEXT_LAYERS, o, u)),
+        ("edit_gif_task", "gif", lambda i, o, u: (i, edit_ops, o, u)),
+        ("create_gif_from_images_task", "images", lambda i, o, u: (i, 100, 0, o, u)),
+    ]
+    if fixture["video"]:
+        out.append(("convert_video_to_gif_task", "video",
+                    lambda i, o, u: (i, segments, VIDEO_FPS, min(w, 480), -1, o, u)))
+    return out
+
+
+def _copy_inputs(fixture, kind, dest):
+    os.makedirs(dest, exist_ok=True)
+    if kind == "images":
+        paths = []
+        for path in fixture["images"]:
+            paths.append(shutil.copy(path, dest))
+        return paths
+    return shutil.copy(fixture[kind], dest)
+
+
+def _peak_rss_kb():
+    """Peak resident set of this process in KB.
+
+    ru_maxrss survives exec, so a spawned child would report the parent's peak;
+    VmHWM belongs to the current address space only.
+    """
+    try:
+        with open("/proc/self/status") as fp:
+            for line in fp:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return kb // 1024 if sys.platform == "darwin" else kb
+
+
+def _run_case(task_name, size_name, fixture, work_dir, repeat):
+    """Child process: run one task ``repeat`` times and return its measurements."""
+    for var in ("GCS_BUCKET_NAME", "GCS_UPLOAD_BUCKET"):
+        os.environ.pop(var, None)
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(work_dir, "bench_metrics.db")
+    os.environ["RESULT_CACHE_ENABLED"] = "false"
+    import logging
+    from src import tasks
+
+    logging.getLogger().setLevel(logging.WARNING)
+    task = getattr(tasks, task_name)
+    kind, build = next((k, b) for n, k, b in cases(fixture, size_name) if n == task_name)
+    upload_folder = os.path.join(work_dir, "uploads")
+    baseline_kb = _peak_rss_kb()
+    runs = []
+    for r in range(repeat):
+        case_dir = os.path.join(upload_folder, f"{task_name}_{size_name}_{r}")
+        shutil.rmtree(case_dir, ignore_errors=True)
+        inputs = _copy_inputs(fixture, kind, os.path.join(case_dir, "in"))
+        out_dir = os.path.join(case_dir, "out")
+        os.makedirs(out_dir, exist_ok=True)
+        args = build(inputs, out_dir, upload_folder)
+        cpu0 = resource.getrusage(resource.RUSAGE_SELF)
+        child0 = resource.getrusage(resource.RUSAGE_CHILDREN)
+        wall0 = time.perf_counter()
+        try:
+            rel = task(*args)
+            error = None
+        except Exception as e:
+            rel, error = None, f"{type(e).__name__}: {e}"
+        wall = time.perf_counter() - wall0
+        cpu1 = resource.getrusage(resource.RUSAGE_SELF)
+        child1 = resource.getrusage(resource.RUSAGE_CHILDREN)
+        output = os.path.join(upload_folder, rel) if isinstance(rel, str) else None
+        runs.append({
+            "wall_ms": round(wall * 1000, 1),
+            # ffmpeg/gifsicle run as subprocesses; their CPU is counted separately.
+            "cpu_ms": round((cpu1.ru_utime + cpu1.ru_stime - cpu0.ru_utime - cpu0.ru_stime) * 1000, 1),
+            "subprocess_cpu_ms": round((child1.ru_utime + child1.ru_stime - child0.ru_utime - child0.ru_stime) * 1000, 1),
+            "output_bytes": os.path.getsize(output) if output and os.path.exists(output) else None,
+            "error": error,
+        })
+        shutil.rmtree(case_dir, ignore_errors=True)
+    best = min(runs, key=lambda run: run["wall_ms"])
+    return {
+        "task": task_name,
+        "size": size_name,
+        "input": kind,
+        **best,
+        "wall_ms_runs": [run["wall_ms"] for run in runs],
+        "peak_rss_kb": _peak_rss_kb(),
+        "baseline_rss_kb": baseline_kb,
+        "subprocess_peak_rss_kb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    }
+
+
+# --------------------------------------------------------------------------
+# Reporting
+
+def _environment(ffmpeg):
+    import numpy
+    import PIL
+
+    def _version(cmd):
+        try:
+            return subprocess.run(cmd, capture_output=True, text=True, timeout=10).stdout.splitlines()[0]
+        except Exception:
+            return None
+
+    commit = None
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except Exception:
+        pass
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "pillow": PIL.__version__,
+        "numpy": numpy.__version__,
+        "ffmpeg": _version([ffmpeg, "-version"]) if ffmpeg else None,
+        "gifsicle": _version(["gifsicle", "--version"]) if shutil.which("gifsicle") else None,
+    }
+
+
+def _print_table(results, baseline=None):
+    previous = {(r["task"], r["size"]): r for r in (baseline or {}).get("results", [])}
+    print(f"\n{'task':32} {'size':6} {'wall ms':>9} {'cpu ms':>9} {'peak MB':>8} {'output KB':>10}  change")
+    print("-" * 90)
+    for r in results:
+        if r.get("error"):
+            print(f"{r['task']:32} {r['size']:6} ❌ {r['error']}")
+            continue
+        change = ""
+        old = previous.get((r["task"], r["size"]))
+        if old and old.get("wall_ms") and not old.get("error"):
+            change = f"{(r['wall_ms'] / old['wall_ms'] - 1) * 100:+.1f}% wall"
+            if old.get("output_bytes") and r.get("output_bytes"):
+                change += f", {(r['output_bytes'] / old['output_bytes'] - 1) * 100:+.1f}% size"
+        output_kb = f"{r['output_bytes'] / 1024:.1f}" if r.get("output_bytes") else "-"
+        print(f"{r['task']:32} {r['size']:6} {r['wall_ms']:9.1f} {r['cpu_ms']:9.1f} "
+              f"{r['peak_rss_kb'] / 1024:8.1f} {output_kb:>10}  {change}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="small,720p,1080p,long",
+                        help=f"comma-separated subset of {', '.join(SIZES)}")
+    parser.add_argument("--tasks", default="", help="comma-separated task names (default: all)")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per case; the fastest is reported")
+    parser.add_argument("--work-dir", default=os.path.join(tempfile.gettempdir(), "easygifmaker-benchmarks"),
+                        help="where fixtures are cached and tasks write their output")
+    parser.add_argument("--output", default=None, help="JSON file to write (default: <work-dir>/results-<time>.json)")
+    parser.add_argument("--compare", default=None, help="earlier results JSON to diff against")
+    args = parser.parse_args()
+
+    sizes = [s for s in args.sizes.split(",") if s]
+    unknown = [s for s in sizes if s not in SIZES]
+    if unknown:
+        parser.error(f"unknown size(s): {', '.join(unknown)}")
+    wanted = {t for t in args.tasks.split(",") if t}
+    work_dir = os.path.abspath(args.work_dir)
+    os.makedirs(work_dir, exist_ok=True)
+
+    ffmpeg = shutil.which("ffmpeg")
+    if not ffmpeg:
+        print("⚠️  ffmpeg not found: convert_video_to_gif_task will be skipped")
+    fixtures = build_fixtures(work_dir, sizes, ffmpeg)
+
+    results = []
+    # A fresh interpreter per case keeps peak RSS and import caches from leaking between cases.
+    ctx = get_context("spawn")
+    for size_name in sizes:
+        for task_name, _, _ in cases(fixtures[size_name], size_name):
+            if wanted and task_name not in wanted:
+                continue
+            print(f"⏱  {task_name} [{size_name}]", flush=True)
+            with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                result = pool.submit(_run_case, task_name, size_name, fixtures[size_name], work_dir, args.repeat).result()
+            results.append(result)
+
+    report = {
+        "environment": _environment(ffmpeg),
+        "sizes": {name: {**SIZES[name], "sha256": fixtures[name]["sha256"]} for name in sizes},
+        "skipped": SKIPPED,
+        "results": results,
+    }
+    output = args.output or os.path.join(work_dir, f"results-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(output, "w") as fp:
+        json.dump(report, fp, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as fp:
+            baseline = json.load(fp)
+    _print_table(results, baseline)
+    print(f"\n📄 Results written to {output}")
+    return 1 if any(r.get("error") for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
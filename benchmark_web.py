@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Benchmark the web tier's Gunicorn worker modes under slow, I/O-bound requests.
+
+For every mode (``sync`` as start.sh used to run it, ``gthread`` as it runs
+now) a Gunicorn server is started on localhost with one worker. While
+``--slow-clients`` clients keep calling ``/api/upload`` (which fetches a
+remote video and sends it back, like ``/api/download?proxy=1`` does for GCS
+objects) against a local upstream throttled to ``--upstream-kbps``, probe
+clients hit ``/api/health`` as fast as they can. The report has the probe
+requests per second and latency, and how many uploads completed.
+
+Runs offline: the upstream is served from this process, the server gets a
+throwaway SQLite database and upload folder, GCS and Redis are unset. The
+benchmark app (``create_bench_app``) turns the rate limiter off and lets
+``/api/upload`` fetch from 127.0.0.1, which the URL validation normally refuses.
+
+    python benchmark_web.py
+    python benchmark_web.py --modes sync,gthread --threads 8 --seconds 20 --output web.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def create_bench_app():
+    """Gunicorn entry point: the real app with rate limits off and loopback URLs allowed."""
+    from src import tasks
+    from src.main import app
+    from src.utils.limiter import limiter
+
+    limiter.enabled = False
+    tasks.validate_remote_url = lambda url: url
+    return app
+
+
+def _upstream(size_bytes, kbps):
+    """Serve ``/video.mp4`` (``size_bytes`` long) at ``kbps`` KiB/s per request; returns (server, url)."""
+    chunk = 16 * 1024
+    payload = os.urandom(chunk)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "video/mp4")
+            self.send_header("Content-Length", str(size_bytes))
+            self.end_headers()
+            sent = 0
+            try:
+                while sent < size_bytes:
+                    n = min(chunk, size_bytes - sent)
+                    self.wfile.write(payload[:n])
+                    sent += n
+                    time.sleep(n / (kbps * 1024))
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/video.mp4"
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_server(mode, threads, work_dir):
+    port = _free_port()
+    # Gunicorn quietly switches sync workers to gthread when --threads > 1
+    threads = threads if mode == "gthread" else 1
+    env = dict(os.environ)
+    for var in ("GCS_UPLOAD_BUCKET", "GCS_BUCKET_NAME", "REDIS_URL", "CELERY_BROKER_URL", "CELERY_RESULT_BACKEND"):
+        env.pop(var, None)
+    env.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(work_dir, 'bench.db')}",
+        "UPLOAD_FOLDER": os.path.join(work_dir, "uploads"),
+        "PYTHONPATH": os.path.dirname(os.path.abspath(__file__)),
+    })
+    os.makedirs(env["UPLOAD_FOLDER"], exist_ok=True)
+    cmd = [sys.executable, "-m", "gunicorn", "-b", f"127.0.0.1:{port}", "--workers=1",
+           f"--worker-class={mode}", f"--threads={threads}", "--timeout=120", "--log-level=warning",
+           "benchmark_web:create_bench_app()"]
+    proc = subprocess.Popen(cmd, env=env, cwd=os.path.dirname(os.path.abspath(__file__)),
+                            stdout=subprocess.DEVNULL, stderr=open(os.path.join(work_dir, f"{mode}.log"), "w"))
+    base = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"gunicorn ({mode}) exited, see {work_dir}/{mode}.log")
+        try:
+            if requests.get(f"{base}/api/health", timeout=1).ok:
+                return proc, base
+        except requests.RequestException:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f"gunicorn ({mode}) did not come up")
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def run_mode(mode, args, upstream_url, work_dir):
+    proc, base = _start_server(mode, args.threads, work_dir)
+    stop = threading.Event()
+    lock = threading.Lock()
+    probes, uploads, errors = [], [], {"probe": 0, "upload": 0}
+
+    def slow_client():
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                r = requests.post(f"{base}/api/upload", json={"url": upstream_url}, timeout=args.seconds + 60)
+                ok = r.status_code == 200
+            except requests.RequestException:
+                ok = False
+            with lock:
+                if ok:
+                    uploads.append(time.perf_counter() - started)
+                else:
+                    errors["upload"] += 1
+
+    def probe_client():
+        session = requests.Session()
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                ok = session.get(f"{base}/api/health", timeout=args.seconds + 60).ok
+            except requests.RequestException:
+                ok = False
+            with lock:
+                if ok:
+                    probes.append(time.perf_counter() - started)
+                else:
+                    errors["probe"] += 1
+
+    try:
+        workers = [threading.Thread(target=slow_client, daemon=True) for _ in range(args.slow_clients)]
+        for w in workers:
+            w.start()
+        time.sleep(0.5)  # let the slow requests occupy the server first
+        window_start = time.perf_counter()
+        probers = [threading.Thread(target=probe_client, daemon=True) for _ in range(args.probe_clients)]
+        for p in probers:
+            p.start()
+        time.sleep(args.seconds)
+        stop.set()
+        elapsed = time.perf_counter() - window_start
+        for t in probers + workers:
+            t.join(timeout=args.seconds + 60)
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    return {
+        "mode": mode,
+        "threads": args.threads if mode == "gthread" else 1,
+        "health_rps": round(len(probes) / elapsed, 1),
+        "health_p50_ms": round(_percentile(probes, 0.5) * 1000, 1) if probes else None,
+        "health_p95_ms": round(_percentile(probes, 0.95) * 1000, 1) if probes else None,
+        "health_max_ms": round(max(probes) * 1000, 1) if probes else None,
+        "uploads_completed": len(uploads),
+        "upload_p50_s": round(_percentile(uploads, 0.5), 2) if uploads else None,
+        "errors": errors,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--modes", default="sync,gthread", help="comma separated Gunicorn worker classes")
+    parser.add_argument("--threads", type=int, default=8, help="threads per gthread worker")
+    parser.add_argument("--slow-clients", type=int, default=4)
+    parser.add_argument("--probe-clients", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10.0, help="measurement window per mode")
+    parser.add_argument("--upstream-mb", type=float, default=2.0, help="size of the fetched video")
+    parser.add_argument("--upstream-kbps", type=float, default=512.0, help="upstream speed per request, KiB/s")
+    parser.add_argument("--output", help="write the results as JSON")
+    args = parser.parse_args(argv)
+
+    work_dir = tempfile.mkdtemp(prefix="easygifmaker-web-bench-")
+    server, upstream_url = _upstream(int(args.upstream_mb * 1024 * 1024), args.upstream_kbps)
+    results = []
+    try:
+        for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+            result = run_mode(mode, args, upstream_url, work_dir)
+            results.append(result)
+            print(f"{mode:8} health {result['health_rps']:>8} req/s  p50 {result['health_p50_ms']} ms  "
+                  f"p95 {result['health_p95_ms']} ms  max {result['health_max_ms']} ms  "
+                  f"uploads {result['uploads_completed']} (p50 {result['upload_p50_s']} s)  errors {result['errors']}")
+    finally:
+        server.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+    if args.output:
+        with open(args.output, "w") as fp:
+            json.dump({"settings": vars(args), "results": results}, fp, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,7 @@ import traceback
 import time
 import threading
 import shutil
+from datetime import datetime
 from functools import wraps
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
@@ -21,12 +22,14 @@ from flask_cors import CORS, cross_origin
 from flask_limiter.errors import RateLimitExceeded
 from src.celery_app import celery as celery_app
 from src.models.user import db, APILog # Import APILog
-from src.models.metrics import JobMetric, DailyMetric
+from src.models.metrics import JobMetric, DailyMetric, JobStage
 from src.config import DevelopmentConfig, ProductionConfig
 import requests
 import smtplib
 from email.message import EmailMessage
 from src.utils.limiter import limiter
+from src.utils import metrics_sink
+from src.utils.upload_stream import UploadRequest
 
 
 
@@ -138,6 +141,9 @@ def create_app():
                 static_folder=os.path.join(os.path.dirname(__file__), 'static'),
                 template_folder=os.path.join(os.path.dirname(__file__), 'static'))
     
+    # Multipart uploads are written straight into their session directory (see upload_stream)
+    app.request_class = UploadRequest
+
     config_class = ProductionConfig if os.environ.get('FLASK_ENV') == 'production' else DevelopmentConfig
     app.config.from_object(config_class)
     app.config['ADMIN_TOKEN'] = os.environ.get('ADMIN_TOKEN')
@@ -269,6 +275,22 @@ def create_app():
             runtimes = [r.processing_time_ms for r in q.filter(JobMetric.processing_time_ms.isnot(None)).all()]
             runtimes.sort()
             p95 = runtimes[int(0.95 * (len(runtimes)-1))] if runtimes else None
+            # Per-tool stage breakdown: where the time of each tool goes
+            durations = {}
+            for row in JobStage.query.filter(JobStage.created_at >= since).all():
+                durations.setdefault(row.tool, {}).setdefault(row.stage, []).append(row.duration_ms or 0)
+            stages = {}
+            for tool, by_stage in durations.items():
+                tool_total = sum(sum(v) for v in by_stage.values())
+                stages[tool] = {}
+                for stage, values in by_stage.items():
+                    values.sort()
+                    stages[tool][stage] = {
+                        'count': len(values),
+                        'avg_ms': int(sum(values) / len(values)),
+                        'p95_ms': values[int(0.95 * (len(values)-1))],
+                        'share': round(sum(values) / tool_total, 4) if tool_total else 0,
+                    }
             return {
                 'window_hours': hours,
                 'total': total,
@@ -276,6 +298,7 @@ def create_app():
                 'failure_rate': (failures / total) if total else 0,
                 'by_tool': by_tool,
                 'p95_processing_time_ms': p95,
+                'stages': stages,
             }
         except Exception as e:
             return {'error': str(e)}, 500
@@ -314,6 +337,20 @@ def create_app():
     def api_metrics_summary_alias():
         return metrics_summary()
 
+    @app.route('/admin/result-cache/stats')
+    @admin_required
+    def result_cache_stats():
+        try:
+            from src.utils.result_cache import stats
+            return stats()
+        except Exception as e:
+            return {'error': str(e)}, 500
+
+    @app.route('/api/admin/result-cache/stats')
+    @admin_required
+    def api_result_cache_stats_alias():
+        return result_cache_stats()
+
     @app.route('/admin/daily-metrics/rebuild')
     @admin_required
     def rebuild_daily_metrics():
@@ -387,14 +424,14 @@ def create_app():
     @app.before_request
     def log_ai_api_usage():
         if request.path.startswith('/api/ai/'):
-            log = APILog(
+            # Buffered and bulk-inserted by the metrics sink, off the request path.
+            metrics_sink.submit(APILog(
+                timestamp=datetime.utcnow(),
                 ip=request.remote_addr,
-                user_agent=request.headers.get('User-Agent', 'unknown'),
-                path=request.path,
+                user_agent=(request.headers.get('User-Agent', 'unknown') or '')[:256],
+                path=request.path[:128],
                 method=request.method
-            )
-            db.session.add(log)
-            db.session.commit()
+            ))
 
     @app.post('/api/contact')
     def api_contact():
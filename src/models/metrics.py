@@ -29,6 +29,9 @@ class JobMetric(db.Model):
     # options snapshot (short JSON-like string)
     options = db.Column(db.String(512))  # e.g., "layers=3; anim=fade; colors=128; lossy=80"
 
+    # per-stage timings (see src.utils.stage_timer)
+    stages = db.relationship('JobStage', backref='job', lazy='select', cascade='all, delete-orphan')
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -72,3 +75,24 @@ class DailyMetric(db.Model):
             'p95_ms': self.p95_ms,
             'avg_ms': self.avg_ms,
         }
+
+
+class JobStage(db.Model):
+    """Time one task spent in a named stage (download, decode, transform, encode, upload)."""
+    __tablename__ = 'job_stages'
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_metric_id = db.Column(db.Integer, db.ForeignKey('job_metrics.id'), index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    tool = db.Column(db.String(64), index=True)
+    stage = db.Column(db.String(32), index=True)
+    duration_ms = db.Column(db.Integer)
+
+    def to_dict(self):
+        return {
+            'job_metric_id': self.job_metric_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'tool': self.tool,
+            'stage': self.stage,
+            'duration_ms': self.duration_ms,
+        }
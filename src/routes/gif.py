@@ -15,7 +15,6 @@ from datetime import timedelta
 from urllib.parse import urlparse
 from celery import chain
 from src.celery_app import celery as celery_app
-from celery.result import AsyncResult, GroupResult
 import yt_dlp # Import yt_dlp
 from PIL import Image, ImageDraw, ImageFont
 from src.utils.url_validation import validate_remote_url
@@ -35,6 +34,7 @@ from src.tasks import (
     handle_upload_task,
     orchestrate_gif_from_urls_task,
     reverse_gif_task,
+    edit_gif_task,
     download_file_from_url_task_helper,
 )
 
@@ -44,17 +44,32 @@ from src.utils.gif_helpers import (
     extract_layers,
     prepare_layers,
     dispatch_add_text_layers_task,
+    cache_params_layers,
     allowed_file,
     ALLOWED_IMAGE_EXTENSIONS,
     ALLOWED_VIDEO_EXTENSIONS,
     create_session_dir,
     resolve_video_input,
 )
+from src.utils.result_cache import dispatch_cached
+from src.utils import chunked_upload, task_events
+from src.utils.upload_stream import receive_into, save_upload
+from src.utils.video_segments import SEGMENT_STRATEGIES
+from src.utils.ffmpeg_palette import GIF_ENCODERS, PALETTE_STATS_MODES, PALETTE_DITHERS
+from src.utils.palette import PALETTE_METHODS
 
 
 gif_bp = Blueprint("gif", __name__)
 
 
+def _task_response(task_id, cached_result=None):
+    """202 with the task id; cache hits also carry the finished result so clients can skip polling."""
+    body = {"task_id": task_id}
+    if cached_result is not None:
+        body.update({"cached": True, "result": cached_result})
+    return jsonify(body), 202
+
+
 @gif_bp.route("/ai/convert", methods=["POST"])
 @limiter.limit("5 per minute")
 def convert():
@@ -92,9 +107,9 @@ def ai_add_text_layers():
             return jsonify({"error": "Invalid GIF provided"}), 400
         layers = extract_layers(data)
         prepared_layers = prepare_layers(layers, fps, n_frames, temp_dir)
-        task = dispatch_add_text_layers_task(gif_path, prepared_layers, temp_dir, upload_folder)
-        logging.info(f"/ai/add-text returning task id: {task.id}")
-        return jsonify({"task_id": task.id}), 202
+        task_id, cached = dispatch_add_text_layers_task(gif_path, prepared_layers, temp_dir, upload_folder)
+        logging.info(f"/ai/add-text returning task id: {task_id}")
+        return _task_response(task_id, cached)
     except Exception as e:
         logging.error(f"Error in /ai/add-text: {e}", exc_info=True)
         return jsonify({"error": "An unexpected error occurred while adding text to the GIF."}), 500
@@ -195,6 +210,13 @@ def get_aspect_ratio_dimensions(width, height, aspect_ratio):
 def create_gif_from_images():
     """Create GIF from uploaded images or URLs"""
     try:
+        upload_folder = current_app.config['UPLOAD_FOLDER']
+        session_dir = create_session_dir(upload_folder)
+        logging.info(f"Created temporary directory for upload: {session_dir}")
+        # Uploaded images are written straight into session_dir while the form is parsed
+        receive_into(session_dir)
+        images = []
+
         # Robust error handling for form parsing
         try:
             urls = request.form.getlist("urls")
@@ -202,11 +224,6 @@ def create_gif_from_images():
             logging.error(f"Error parsing form data in /gif-maker: {form_err}", exc_info=True)
             return jsonify({"error": "Malformed form data. Please check your upload format and try again."}), 400
 
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        session_dir = create_session_dir(upload_folder)
-        logging.info(f"Created temporary directory for upload: {session_dir}")
-        images = []
-
         try:
             if urls and any(u.strip() for u in urls):
                 frame_duration = int(request.form.get("frame_duration", 500))
@@ -235,7 +252,7 @@ def create_gif_from_images():
                         filename = secure_filename(file.filename)
                         file_path = os.path.join(session_dir, filename)
                         try:
-                            file.save(file_path)
+                            save_upload(file, file_path)
                         except Exception as save_err:
                             logging.error(f"Error saving uploaded file {filename}: {save_err}", exc_info=True)
                             return jsonify({"error": f"Failed to save uploaded file: {filename}. Please try again."}), 500
@@ -265,15 +282,26 @@ def create_gif_from_images():
             loop_count = int(request.form.get("loop_count", 0))
             # Fallback to global frame_duration if per-frame not provided
             frame_duration = int(request.form.get("frame_duration", 500))
+            palette_mode = request.form.get("palette_mode") or None
+            palette_method = request.form.get("palette_method", "mediancut")
+            if palette_mode and palette_mode not in ("global", "per-frame"):
+                return jsonify({"error": "palette_mode must be 'global' or 'per-frame'"}), 400
+            if palette_method not in PALETTE_METHODS:
+                return jsonify({"error": f"palette_method must be one of {', '.join(PALETTE_METHODS)}"}), 400
             try:
-                task = create_gif_from_images_task.apply_async(
-                    args=[images, frame_duration, loop_count, session_dir, upload_folder, "high", frame_durations, effects],
-                    queue="fileops"
+                task_id, cached = dispatch_cached(
+                    create_gif_from_images_task,
+                    [images, frame_duration, loop_count, session_dir, upload_folder, "high", frame_durations, effects,
+                     palette_mode, palette_method],
+                    tool="gif-maker", input_paths=images, upload_folder=upload_folder, temp_dir=session_dir,
+                    params={"frame_duration": frame_duration, "loop_count": loop_count,
+                            "frame_durations": frame_durations, "effects": effects,
+                            "palette_mode": palette_mode, "palette_method": palette_method},
                 )
             except Exception as pub_err:
                 logging.error(f"Failed to publish create_gif_from_images_task to broker: {pub_err}", exc_info=True)
                 return jsonify({"error": "queue_unavailable", "message": "Background queue is currently unavailable. Please retry shortly."}), 503
-            return jsonify({"task_id": task.id}), 202
+            return _task_response(task_id, cached)
         finally:
             # Do not delete session_dir here; let Celery task handle cleanup
             pass
@@ -290,6 +318,8 @@ def convert_video_to_gif():
         upload_folder = current_app.config['UPLOAD_FOLDER']
         session_dir = create_session_dir(upload_folder)
         logging.info(f"Created session directory for video upload: {session_dir}")
+        # The video is written straight into session_dir while the form is parsed
+        receive_into(session_dir)
         # Add machine/instance debugging
         import socket
         hostname = socket.gethostname()
@@ -301,9 +331,16 @@ def convert_video_to_gif():
             return jsonify({"error": "Failed to read form data. The upload may be too large or incomplete. Please try a smaller file or check your connection."}), 413
 
         file = request.files.get("file")
+        upload_id = request.form.get("upload_id")
         max_content_length = current_app.config['MAX_CONTENT_LENGTH']
         try:            
-            video_path = resolve_video_input(url, file, session_dir, ALLOWED_VIDEO_EXTENSIONS, max_content_length)
+            if upload_id and not url and not file:
+                # Assembled from chunks PUT to /uploads/<upload_id>
+                video_path = chunked_upload.finalize(upload_folder, upload_id, session_dir)
+            else:
+                video_path = resolve_video_input(url, file, session_dir, ALLOWED_VIDEO_EXTENSIONS, max_content_length)
+        except FileNotFoundError:
+            return jsonify({"error": "Unknown upload id"}), 404
         except ValueError as ve:
             return jsonify({"error": str(ve)}), 400
             
@@ -317,6 +354,18 @@ def convert_video_to_gif():
         width = int(request.form.get("width", 480))
         height = int(request.form.get("height", 360))
         include_audio = request.form.get("include_audio", "false").lower() == "true"
+        segment_strategy = request.form.get("segment_strategy") or None
+        if segment_strategy and segment_strategy not in SEGMENT_STRATEGIES:
+            return jsonify({"error": f"segment_strategy must be one of {', '.join(SEGMENT_STRATEGIES)}"}), 400
+        encoder = request.form.get("encoder", "default")
+        palette_stats_mode = request.form.get("palette_stats_mode", "full")
+        palette_dither = request.form.get("palette_dither", "sierra2_4a")
+        if encoder not in GIF_ENCODERS:
+            return jsonify({"error": f"encoder must be one of {', '.join(GIF_ENCODERS)}"}), 400
+        if palette_stats_mode not in PALETTE_STATS_MODES:
+            return jsonify({"error": f"palette_stats_mode must be one of {', '.join(PALETTE_STATS_MODES)}"}), 400
+        if palette_dither not in PALETTE_DITHERS:
+            return jsonify({"error": f"palette_dither must be one of {', '.join(PALETTE_DITHERS)}"}), 400
         brightness = float(request.form.get("brightness", 0))
         contrast = float(request.form.get("contrast", 1))
 
@@ -374,12 +423,17 @@ def convert_video_to_gif():
             f"brightness={brightness}, contrast={contrast}, session_dir={session_dir}, upload_folder={upload_folder}, "
             f"include_audio={include_audio}"
         )
-        task = convert_video_to_gif_task.apply_async(
-            [video_path, segments, fps, width, height, session_dir, upload_folder, include_audio, brightness, contrast],
-            queue="fileops",
+        task_id, cached = dispatch_cached(
+            convert_video_to_gif_task,
+            [video_path, segments, fps, width, height, session_dir, upload_folder, include_audio, brightness, contrast, segment_strategy,
+             encoder, palette_stats_mode, palette_dither],
+            tool="video-to-gif", input_paths=[video_path], upload_folder=upload_folder, temp_dir=session_dir,
+            params={"segments": segments, "fps": fps, "width": width, "height": height,
+                    "include_audio": include_audio, "brightness": brightness, "contrast": contrast,
+                    "encoder": encoder, "palette_stats_mode": palette_stats_mode, "palette_dither": palette_dither},
         )
-        logging.info(f"/video-to-gif returning task id: {task.id}")
-        return jsonify({"task_id": task.id}), 202
+        logging.info(f"/video-to-gif returning task id: {task_id}")
+        return _task_response(task_id, cached)
     except Exception as e:
         logging.error(f"Error in convert_video_to_gif: {e}", exc_info=True)
         return jsonify({"error": str(e) if str(e) else "An unexpected error occurred during video conversion."}), 500
@@ -433,9 +487,13 @@ def resize_gif():
                 file.save(gif_path)
             
             upload_folder = current_app.config['UPLOAD_FOLDER']
-            task = resize_gif_task.apply_async([gif_path, width, height, maintain_aspect_ratio, temp_dir, upload_folder], queue="fileops")
-            logging.info(f"/resize (file) returning task id: {task.id}")
-            return jsonify({"task_id": task.id}), 202
+            task_id, cached = dispatch_cached(
+                resize_gif_task, [gif_path, width, height, maintain_aspect_ratio, temp_dir, upload_folder],
+                tool="resize", input_paths=[gif_path], upload_folder=upload_folder, temp_dir=temp_dir,
+                params={"width": width, "height": height, "maintain_aspect_ratio": maintain_aspect_ratio},
+            )
+            logging.info(f"/resize (file) returning task id: {task_id}")
+            return _task_response(task_id, cached)
             
         finally:
             # The task is responsible for cleaning up the temp_dir
@@ -486,9 +544,13 @@ def crop_gif():
                 file.save(gif_path)
             
             upload_folder = current_app.config['UPLOAD_FOLDER']
-            task = crop_gif_task.apply_async([gif_path, x, y, width, height, aspect_ratio, temp_dir, upload_folder], queue="fileops")
-            logging.info(f"/crop (file) returning task id: {task.id}")
-            return jsonify({"task_id": task.id}), 202
+            task_id, cached = dispatch_cached(
+                crop_gif_task, [gif_path, x, y, width, height, aspect_ratio, temp_dir, upload_folder],
+                tool="crop", input_paths=[gif_path], upload_folder=upload_folder, temp_dir=temp_dir,
+                params={"x": x, "y": y, "width": width, "height": height, "aspect_ratio": aspect_ratio},
+            )
+            logging.info(f"/crop (file) returning task id: {task_id}")
+            return _task_response(task_id, cached)
             
         finally:
             # The task is responsible for cleaning up the temp_dir
@@ -539,9 +601,13 @@ def optimize_gif():
                 file.save(gif_path)
             
             upload_folder = current_app.config['UPLOAD_FOLDER']
-            task = optimize_gif_task.apply_async([gif_path, quality, colors, lossy, dither, optimize_level, temp_dir, upload_folder], queue="fileops")
-            logging.info(f"/optimize (file) returning task id: {task.id}")
-            return jsonify({"task_id": task.id}), 202
+            task_id, cached = dispatch_cached(
+                optimize_gif_task, [gif_path, quality, colors, lossy, dither, optimize_level, temp_dir, upload_folder],
+                tool="optimize", input_paths=[gif_path], upload_folder=upload_folder, temp_dir=temp_dir,
+                params={"quality": quality, "colors": colors, "lossy": lossy, "dither": dither, "optimize_level": optimize_level},
+            )
+            logging.info(f"/optimize (file) returning task id: {task_id}")
+            return _task_response(task_id, cached)
             
         finally:
             # The task is responsible for cleaning up the temp_dir
@@ -577,14 +643,19 @@ def reverse_gif():
                 file.save(gif_path)
 
                 upload_folder = current_app.config['UPLOAD_FOLDER']
-                task = reverse_gif_task.apply_async([gif_path, temp_dir, upload_folder], queue="fileops")
-                logging.info(f"/reverse (file) returning task id: {task.id}")
-                return jsonify({"task_id": task.id}), 202
+                task_id, cached = dispatch_cached(
+                    reverse_gif_task, [gif_path, temp_dir, upload_folder],
+                    tool="reverse", input_paths=[gif_path], params={}, upload_folder=upload_folder, temp_dir=temp_dir,
+                )
+                logging.info(f"/reverse (file) returning task id: {task_id}")
+                return _task_response(task_id, cached)
         finally:
             pass
     except Exception as e:
         logging.error(f"Error in reverse_gif: {e}", exc_info=True)
         return jsonify({"error": "An unexpected error occurred while reversing the GIF."}), 500
+
+@gif_bp.route("/add-text", methods=["POST"])
 @limiter.limit("5 per minute")
 def add_text_to_gif():
     """Add text to GIF with advanced customization"""
@@ -675,13 +746,20 @@ def add_text_to_gif():
                 # For file upload, reuse gif_path_for_probe for the task
                 gif_path = gif_path_for_probe
                 upload_folder = current_app.config['UPLOAD_FOLDER']
-                task = add_text_to_gif_task.apply_async(
-                    gif_path, text, font_size, color, font_family, stroke_color, stroke_width,
-                    horizontal_align, vertical_align, offset_x, offset_y,
-                    start_frame, end_frame, animation_style, temp_dir, upload_folder
+                task_id, cached = dispatch_cached(
+                    add_text_to_gif_task,
+                    [gif_path, text, font_size, color, font_family, stroke_color, stroke_width,
+                     horizontal_align, vertical_align, offset_x, offset_y,
+                     start_frame, end_frame, animation_style, temp_dir, upload_folder],
+                    tool="add-text", input_paths=[gif_path], upload_folder=upload_folder, temp_dir=temp_dir,
+                    params={"text": text, "font_size": font_size, "color": color, "font_family": font_family,
+                            "stroke_color": stroke_color, "stroke_width": stroke_width,
+                            "horizontal_align": horizontal_align, "vertical_align": vertical_align,
+                            "offset_x": offset_x, "offset_y": offset_y, "start_frame": start_frame,
+                            "end_frame": end_frame, "animation_style": animation_style},
                 )
-                logging.info(f"/add-text (file) returning task id: {task.id}")
-                return jsonify({"task_id": task.id}), 202
+                logging.info(f"/add-text (file) returning task id: {task_id}")
+                return _task_response(task_id, cached)
             
         finally:
             # The task is responsible for cleaning up the temp_dir
@@ -724,13 +802,129 @@ def add_text_layers_to_gif():
         prepared_layers = prepare_layers(layers, fps, n_frames, temp_dir)
 
         upload_folder = current_app.config['UPLOAD_FOLDER']
-        task = dispatch_add_text_layers_task(gif_path, prepared_layers, temp_dir, upload_folder)
-        logging.info(f"/add-text-layers returning task id: {task.id}")
-        return jsonify({"task_id": task.id}), 202
+        task_id, cached = dispatch_add_text_layers_task(gif_path, prepared_layers, temp_dir, upload_folder)
+        logging.info(f"/add-text-layers returning task id: {task_id}")
+        return _task_response(task_id, cached)
     except Exception as e:
         logging.error(f"Error in add_text_layers_to_gif: {e}", exc_info=True)
         return jsonify({"error": "An unexpected error occurred while adding text layers to the GIF."}), 500
 
+EDIT_OPERATION_TYPES = ("crop", "resize", "text", "optimize")
+# Operations end up in the task args and the job metric, so keep the list short.
+EDIT_MAX_OPERATIONS = int(os.environ.get("EDIT_MAX_OPERATIONS", 10))
+# Integer fields per operation type: (name, required, minimum)
+EDIT_INT_FIELDS = {
+    "crop": (("x", False, 0), ("y", False, 0), ("width", False, 1), ("height", False, 1)),
+    "resize": (("width", True, 1), ("height", True, 1)),
+    "optimize": (("quality", False, 1), ("colors", False, 2), ("lossy", False, 0)),
+}
+# String fields per operation type: (name, allowed values)
+EDIT_CHOICE_FIELDS = {
+    "crop": (("aspect_ratio", ("free", "square", "4:3", "16:9", "3:2", "2:1", "golden")),),
+    "optimize": (("dither", ("floyd-steinberg", "atkinson", "burkes", "none")),),
+}
+EDIT_BOOL_FIELDS = {
+    "resize": ("maintain_aspect_ratio",),
+}
+
+
+def _validate_edit_op(idx, op):
+    """Return ``op`` with its integer fields parsed and its other fields checked.
+
+    Raises ValueError with a client-facing message.
+    """
+    op = dict(op)
+    for name, required, minimum in EDIT_INT_FIELDS.get(op["type"], ()):
+        value = op.get(name)
+        if value is None:
+            if required:
+                raise ValueError(f"{op['type']} operation at index {idx} requires {name}")
+            continue
+        try:
+            if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+                raise ValueError
+            value = int(value)
+        except (TypeError, ValueError, OverflowError):
+            raise ValueError(f"{op['type']} operation at index {idx}: {name} must be an integer")
+        if value < minimum:
+            raise ValueError(f"{op['type']} operation at index {idx}: {name} must be at least {minimum}")
+        op[name] = value
+    for name, allowed in EDIT_CHOICE_FIELDS.get(op["type"], ()):
+        if name in op and op[name] not in allowed:
+            raise ValueError(f"{op['type']} operation at index {idx}: {name} must be one of {', '.join(allowed)}")
+    for name in EDIT_BOOL_FIELDS.get(op["type"], ()):
+        if name in op and not isinstance(op[name], bool):
+            raise ValueError(f"{op['type']} operation at index {idx}: {name} must be true or false")
+    return op
+
+
+@gif_bp.route("/edit", methods=["POST"])
+@limiter.limit("5 per minute")
+def edit_gif():
+    """Apply an ordered list of crop/resize/text/optimize operations in a single job."""
+    try:
+        url = request.form.get("url")
+        file = request.files.get("file")
+        temp_dir = tempfile.mkdtemp(dir=current_app.config.get('UPLOAD_FOLDER'))
+        try:
+            gif_path = resolve_input_gif(url=url, file=file, temp_dir=temp_dir)
+        except ValueError as ve:
+            return jsonify({"error": str(ve)}), 400
+
+        try:
+            n_frames, fps = probe_gif(gif_path)
+        except Exception as e:
+            logging.error(f"Uploaded file is not a valid image: {gif_path}, error: {e}")
+            return jsonify({"error": "Uploaded file is not a valid GIF image."}), 400
+
+        operations_raw = request.form.get("operations")
+        if not operations_raw:
+            return jsonify({"error": "Missing operations data"}), 400
+        try:
+            operations = json.loads(operations_raw)
+        except Exception:
+            return jsonify({"error": "Invalid operations JSON"}), 400
+        if not isinstance(operations, list) or not operations:
+            return jsonify({"error": "operations must be a non-empty list"}), 400
+        if len(operations) > EDIT_MAX_OPERATIONS:
+            return jsonify({"error": f"At most {EDIT_MAX_OPERATIONS} operations are allowed"}), 400
+
+        prepared = []
+        for idx, op in enumerate(operations):
+            op_type = op.get("type") if isinstance(op, dict) else None
+            if op_type not in EDIT_OPERATION_TYPES:
+                return jsonify({"error": f"Unsupported operation at index {idx}: {op_type}"}), 400
+            if op_type == "optimize" and idx != len(operations) - 1:
+                return jsonify({"error": "optimize must be the last operation"}), 400
+            try:
+                op = _validate_edit_op(idx, op)
+            except ValueError as ve:
+                return jsonify({"error": str(ve)}), 400
+            if op_type == "text":
+                layers = op.get("layers") or []
+                if not isinstance(layers, list) or not layers:
+                    return jsonify({"error": f"text operation at index {idx} has no layers"}), 400
+                try:
+                    op = {"type": "text", "layers": prepare_layers(layers, fps, n_frames, temp_dir)}
+                except (TypeError, ValueError, AttributeError):
+                    return jsonify({"error": f"text operation at index {idx} has invalid layers"}), 400
+            prepared.append(op)
+
+        upload_folder = current_app.config['UPLOAD_FOLDER']
+        params = {"operations": [
+            {**op, "layers": cache_params_layers(op["layers"])} if op["type"] == "text" else op
+            for op in prepared
+        ]}
+        task_id, cached = dispatch_cached(
+            edit_gif_task, [gif_path, prepared, temp_dir, upload_folder],
+            tool="edit", input_paths=[gif_path], params=params, upload_folder=upload_folder, temp_dir=temp_dir,
+        )
+        logging.info(f"/edit returning task id: {task_id}")
+        return _task_response(task_id, cached)
+    except Exception as e:
+        logging.error(f"Error in edit_gif: {e}", exc_info=True)
+        return jsonify({"error": "An unexpected error occurred while editing the GIF."}), 500
+
 @gif_bp.route("/health", methods=["GET"])
 def health_check():
     """Health check endpoint"""
@@ -769,68 +963,73 @@ def handle_upload():
         logging.error(f"Error in handle_upload (URL proxy): {e}", exc_info=True)
         return jsonify({"error": "An unexpected error occurred while processing the URL."}), 500
     finally:
-        pass
+        # send_file has already opened the file, so the download can go now; the open handle keeps streaming
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+@gif_bp.route("/uploads", methods=["POST"])
+@cross_origin()
+@limiter.limit("10 per minute")
+def create_chunked_upload():
+    """Start a resumable upload: JSON {filename, size} -> {upload_id, ...}; then PUT chunks and pass upload_id to /video-to-gif."""
+    data = request.get_json(silent=True) or {}
+    try:
+        result = chunked_upload.create(current_app.config['UPLOAD_FOLDER'], data.get("filename"), data.get("size"),
+                                       ALLOWED_VIDEO_EXTENSIONS, current_app.config['MAX_CONTENT_LENGTH'])
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+    logging.info(f"[chunked_upload] created {result['upload_id']} ({result['size']} bytes)")
+    return jsonify(result), 201
+
+@gif_bp.route("/uploads/<upload_id>", methods=["PUT"])
+@cross_origin()
+@limiter.limit("300 per minute")  # every chunk is a request; 16 MB chunks allow ~80 MB/s per client
+def put_upload_chunk(upload_id):
+    """Store one chunk (raw body) at ?offset=N or at the start of its Content-Range header."""
+    offset = request.args.get("offset", type=int)
+    content_range = request.headers.get("Content-Range", "")
+    if offset is None and content_range.startswith("bytes "):
+        try:
+            offset = int(content_range[6:].split("-", 1)[0])
+        except ValueError:
+            offset = None
+    if offset is None:
+        return jsonify({"error": "offset query parameter or Content-Range header required"}), 400
+    if request.content_length is None:
+        return jsonify({"error": "Content-Length required"}), 411
+    try:
+        result = chunked_upload.write_chunk(current_app.config['UPLOAD_FOLDER'], upload_id, offset,
+                                            request.content_length, request.stream)
+    except FileNotFoundError:
+        return jsonify({"error": "Unknown upload id"}), 404
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+    return jsonify(result)
+
+@gif_bp.route("/uploads/<upload_id>", methods=["GET"])
+@cross_origin()
+def get_upload_status(upload_id):
+    """Received byte count and missing ranges, so a client can resume after a dropped connection."""
+    try:
+        return jsonify(chunked_upload.status(current_app.config['UPLOAD_FOLDER'], upload_id))
+    except FileNotFoundError:
+        return jsonify({"error": "Unknown upload id"}), 404
 
 @gif_bp.route("/task-status/<task_id>", methods=["GET"])
 def get_task_status(task_id):
     """Endpoint to check the status of a Celery task."""
-    try:
-        task = GroupResult.restore(task_id, backend=celery_app.backend) or AsyncResult(task_id, backend=celery_app.backend)
-    except Exception:
-        task = AsyncResult(task_id, backend=celery_app.backend)
-    logging.info(f"[get_task_status] Task {task_id} state: {task.state}")
-    if task.state == 'PENDING':
-        response = {
-            'state': task.state,
-            'status': 'Pending...'
-        }
-    elif task.state == 'PROGRESS':
-        response = {
-            'state': task.state,
-            'status': task.info.get('status', 'Processing...'),
-            'progress': task.info.get('progress', 0)
-        }
-    elif task.state == 'SUCCESS':
-        # Always return the actual GIF path as 'result', even for chords
-        result = None
-        try:
-            result = task.get(timeout=1)
-            # If result is a list (from a chord), return the first item (the GIF path)
-            if isinstance(result, list) and len(result) == 1:
-                result = result[0]
-            # If result is a string and looks like a Celery task id, fetch its result
-            if isinstance(result, str) and len(result) == 36 and '-' in result:
-                callback_task = AsyncResult(result, backend=celery_app.backend)
-                logging.info(f"[get_task_status] Resolving callback task id: {result} (state: {callback_task.state})")
-                if callback_task.state == 'SUCCESS':
-                    result = callback_task.get(timeout=1)
-        except Exception as e:
-            logging.error(f"[get_task_status] Error getting result for {task_id}: {e}")
-        logging.info(f"[get_task_status] Task {task_id} resolved result: {result}")
-        response = {
-            'state': task.state,
-            'status': 'Task completed!',
-            'result': result
-        }
-    elif task.state == 'FAILURE':
-        error_msg = 'An unknown error occurred during processing.'
-        if isinstance(task.info, Exception):
-            if isinstance(task.info, ValueError):
-                error_msg = str(task.info)
-            else:
-                logging.error(f"Task {task_id} failed with an unhandled exception: {task.info!r}")
-        response = {
-            'state': task.state,
-            'status': 'Task failed!',
-            'error': error_msg,
-        }
-    else:
-        response = {
-            'state': task.state,
-            'status': 'Unknown state'
-        }
+    response = task_events.status_payload(task_id)
+    logging.info(f"[get_task_status] Task {task_id} state: {response['state']}")
     return jsonify(response)
 
+@gif_bp.route("/task-events/<task_id>", methods=["GET"])
+def stream_task_status(task_id):
+    """Server-Sent Events with the task's status, pushed as it changes (replaces polling /task-status)."""
+    return Response(
+        task_events.stream(task_id),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @gif_bp.route("/download-result/<path:filename>", methods=["GET"])
 def download_result(filename):
     """Endpoint to download the processed file from Google Cloud Storage."""
@@ -839,7 +1038,7 @@ def download_result(filename):
         return jsonify({"error": "GCS bucket not configured"}), 500
 
     try:
-        from google.cloud import storage  # type: ignore
+        from src.utils.gcs_helpers import get_storage_client
         from google.auth.exceptions import GoogleAuthError  # type: ignore
         from google.api_core.exceptions import NotFound  # type: ignore
     except ImportError:
@@ -847,8 +1046,7 @@ def download_result(filename):
         return jsonify({"error": "Storage service unavailable"}), 500
 
     try:
-        client = storage.Client()
-        bucket = client.bucket(bucket_name)
+        bucket = get_storage_client().bucket(bucket_name)
         blob = bucket.blob(filename)
         if not blob.exists():
             return jsonify({"error": "File not found"}), 404
@@ -881,7 +1079,7 @@ def download_gif(filename):
 
     # Import deps
     try:
-        from google.cloud import storage  # type: ignore
+        from src.utils.gcs_helpers import get_storage_client
         from google.auth.exceptions import GoogleAuthError  # type: ignore
         from google.api_core.exceptions import NotFound  # type: ignore
     except ImportError:
@@ -890,8 +1088,7 @@ def download_gif(filename):
 
     proxy = request.args.get("proxy") in ("1", "true", "yes")
     try:
-        client = storage.Client()
-        bucket = client.bucket(bucket_name)
+        bucket = get_storage_client().bucket(bucket_name)
         blob = bucket.blob(filename)
         if not blob.exists():
             return jsonify({"error": "File not found"}), 404
@@ -909,6 +1106,7 @@ def download_gif(filename):
             return jsonify({"error": "Upstream fetch failed"}), 502
         if r.status_code >= 400:
             logging.error(f"Upstream GCS returned {r.status_code} for {filename}")
+            r.close()
             return jsonify({"error": "Upstream error"}), 502
 
         def generate():
@@ -14,6 +14,30 @@ import time
 import resource
 from src.utils.url_validation import validate_remote_url
 from src.utils.gcs_helpers import upload_file_to_gcs, download_file_from_gcs
+from src.utils.frame_pipeline import (
+    iter_frames,
+    apply_ops,
+    write_gif,
+    write_gif_reversed,
+    plan_decimation,
+    resize_op,
+    crop_op,
+    quantize_op,
+    scale_op,
+)
+from src.utils.text_layers import hex_to_rgb, layer_active, normalize_layers, text_layers_op
+from src.utils.gif_blocks import index_gif, passthrough_untouched, write_reversed_blocks
+# Imported for its task_success hook, which records finished results in the cache
+import src.utils.result_cache  # noqa: F401
+# Importing task_events also registers the task_success/task_failure hooks that feed /task-events streams
+from src.utils.task_events import ProgressReporter
+from src.utils.transport import is_token, resolve_token
+from src.utils.video_segments import resolve_segment_strategy, build_video_source
+from src.utils.effects import EFFECTS, adjust_contrast_brightness, to_array
+from src.utils.palette import quantize_shared
+from src.utils.ffmpeg_palette import palette_cache_key, get_or_create_palette, paletteuse_filter
+from src.utils.stage_timer import StageTimer
+from src.utils import metrics_sink
 
 # Import the shared Celery application instance
 from src.celery_app import celery as celery_app
@@ -44,6 +68,200 @@ def _compute_scale_factor(width: int, height: int, max_pixels: int) -> float:
     ratio = (max_pixels / float(total)) ** 0.5
     return max(0.2, min(1.0, ratio))
 
+def _decimation_plan(gif, tag, required=()):
+    """Frames to keep when ``gif`` has more than MAX_GIF_FRAMES (see plan_decimation); None keeps them all."""
+    if not getattr(gif, "is_animated", False):
+        return None
+    plan = plan_decimation(gif, MAX_GIF_FRAMES, required)
+    if plan:
+        logging.info(f"[{tag}] Keeping {len(plan)} of {gif.n_frames} frames (MAX_GIF_FRAMES={MAX_GIF_FRAMES})")
+    return plan
+
+def _frame_total(gif, plan):
+    """Number of frames the pipeline yields for ``gif`` (drives progress reporting)."""
+    return len(plan) if plan else getattr(gif, "n_frames", 1)
+
+def _text_frames(gif, gif_path, index, plan, scale, layers):
+    """Decoded frames for a text job; frames outside every layer window are copied from the source when possible.
+
+    Copying needs the output to keep the source geometry and every frame, so it
+    is skipped when frames are decimated or downscaled.
+    """
+    frames = iter_frames(gif, plan, index)
+    if plan is not None or scale < 1.0 or not getattr(gif, "is_animated", False):
+        return frames
+    if not index or len(index["frames"]) != gif.n_frames or index["size"] != gif.size:
+        return frames
+    return passthrough_untouched(frames, gif_path, index, lambda i: any(layer_active(l, i) for l in layers))
+
+def _crop_box(original_width, original_height, x, y, width, height, aspect_ratio="free"):
+    """Snap a crop request to a preset aspect ratio and clamp it to the image bounds."""
+    def get_aspect_ratio_dimensions(w, h, ar):
+        if ar == "square": size = min(w, h); return size, size
+        elif ar == "4:3": return (int(h * 4/3), h) if w / h > 4/3 else (w, int(w * 3/4))
+        elif ar == "16:9": return (int(h * 16/9), h) if w / h > 16/9 else (w, int(w * 9/16))
+        elif ar == "3:2": return (int(h * 3/2), h) if w / h > 3/2 else (w, int(w * 2/3))
+        elif ar == "2:1": return (int(h * 2), h) if w / h > 2 else (w, int(w / 2))
+        elif ar == "golden": golden_ratio = 1.618; return (int(h * golden_ratio), h) if w / h > golden_ratio else (w, int(w / golden_ratio))
+        else: return w, h
+
+    if aspect_ratio != "free":
+        width, height = get_aspect_ratio_dimensions(width, height, aspect_ratio)
+
+    x = max(0, min(x, original_width - width))
+    y = max(0, min(y, original_height - height))
+    width = min(width, original_width - x)
+    height = min(height, original_height - y)
+    return x, y, width, height
+
+def _resize_dimensions(original_width, original_height, width, height, maintain_aspect_ratio):
+    if maintain_aspect_ratio:
+        aspect_ratio = original_width / original_height
+        if width / height > aspect_ratio:
+            width = int(height * aspect_ratio)
+        else:
+            height = int(width / aspect_ratio)
+    return width, height
+
+def _optimize_settings(quality, colors, lossy):
+    """Map the user-facing quality knob to (colors, lossy, optimize level)."""
+    if quality >= 95:
+        # Very high quality: minimal compression but still optimize
+        return min(colors, 200), 0, 2
+    elif quality >= 80:
+        # High quality: light compression
+        return min(colors, 128), max(0, lossy // 3), 2
+    elif quality >= 60:
+        # Medium quality: moderate compression
+        return min(colors, 64), lossy, 3
+    # Low quality: aggressive compression
+    return min(colors, 32), min(100, lossy * 2), 3
+
+def _run_gifsicle(src_path, output_path, level, colors, lossy, dither):
+    """Optimize with gifsicle. Raises CalledProcessError/FileNotFoundError so callers can fall back to PIL."""
+    # Enhanced gifsicle optimization
+    cmd = ["gifsicle", f"--optimize={level}", f"--colors={colors}"]
+
+    # Add lossy compression if specified
+    if lossy > 0:
+        cmd.extend([f"--lossy={lossy}"])
+
+    # Add dithering for better color quality
+    if dither and dither != "none":
+        cmd.extend([f"--dither={dither}"])
+
+    # Add additional optimizations for better compression
+    cmd.extend(["--no-extensions", "--no-comments", "--no-names"])
+
+    # Add frame optimization for better compression
+    cmd.extend(["--optimize-frames"])
+
+    # Add interlace optimization
+    cmd.extend(["--interlace"])
+
+    cmd.extend([src_path, "-o", output_path])
+
+    logging.info(f"[gifsicle] Running gifsicle command: {' '.join(cmd)}")
+    result = subprocess.run(cmd, capture_output=True, text=True)
+
+    if result.returncode != 0:
+        logging.warning(f"Gifsicle optimization failed: {result.stderr}. Falling back to PIL.")
+        raise subprocess.CalledProcessError(result.returncode, cmd)
+
+def _run_ffmpeg(cmd, progress, duration_s, start, end, status, timeout=None):
+    """Run ffmpeg like ``subprocess.run(cmd, capture_output=True, text=True)``.
+
+    ffmpeg writes ``key=value`` progress blocks to stdout (``-progress pipe:1``);
+    ``out_time_us`` against ``duration_s`` (seconds of output) moves ``progress``
+    from ``start`` to ``end``. stderr goes to a temp file so it cannot fill a pipe.
+    """
+    cmd = [cmd[0], "-progress", "pipe:1", "-nostats", *cmd[1:]]
+    deadline = time.monotonic() + timeout if timeout else None
+    with tempfile.TemporaryFile(mode="w+") as err:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=err, text=True)
+        try:
+            for line in proc.stdout:
+                key, _, value = line.strip().partition("=")
+                if key == "out_time_us" and duration_s:
+                    try:
+                        done = int(value) / 1e6 / duration_s
+                    except ValueError:  # N/A before the first frame
+                        continue
+                    progress.update(start + (end - start) * min(max(done, 0.0), 1.0), status)
+                if deadline and time.monotonic() > deadline:
+                    raise subprocess.TimeoutExpired(cmd, timeout)
+            proc.wait(timeout=max(deadline - time.monotonic(), 0.1) if deadline else None)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+            raise
+        finally:
+            proc.stdout.close()
+        err.seek(0)
+        stderr = err.read()
+    return subprocess.CompletedProcess(cmd, proc.returncode, "", stderr)
+
+def _check_output_gif(output_path, tag):
+    """Raise unless ``output_path`` is a GIF Pillow can open with at least one frame.
+
+    Delta-encoded outputs can be valid in well under a kilobyte, so size alone says nothing.
+    """
+    try:
+        with Image.open(output_path) as out:
+            if out.format != "GIF" or getattr(out, "n_frames", 1) < 1:
+                raise ValueError(f"not a GIF ({out.format})")
+    except Exception as e:
+        logging.error(f"[{tag}] Output GIF missing or invalid: {output_path} ({e})")
+        raise Exception("Output GIF missing or invalid.")
+
+def _upload_output(output_path, rel, tag):
+    """Upload a finished output to GCS when a bucket is configured.
+
+    Returns ``(result, upload_stats)``: the object name (or ``rel`` when there is
+    no bucket or the upload failed) and the transfer stats of the upload.
+    """
+    upload_stats = {}
+    try:
+        bucket_name = os.environ.get("GCS_UPLOAD_BUCKET") or os.environ.get("GCS_BUCKET_NAME")
+        if bucket_name:
+            object_name = rel.replace("\\", "/")
+            try:
+                upload_file_to_gcs(output_path, bucket_name, object_name, stats=upload_stats)
+                try:
+                    os.remove(output_path)
+                except Exception as de:
+                    logging.warning(f"[{tag}] cleanup failed: {de}")
+                rel = object_name
+            except Exception as ue:
+                logging.error(f"[{tag}] Failed to upload to GCS: {ue}")
+    except Exception as be:
+        logging.warning(f"[{tag}] Bucket upload skipped: {be}")
+    return rel, upload_stats
+
+def _transfer_opts(upload_stats):
+    """Upload throughput suffix for JobMetric.options (empty when nothing was uploaded)."""
+    if not upload_stats:
+        return ""
+    return f"; upload_ms={upload_stats['ms']}; upload_mbps={upload_stats['mbps']}; upload_parallel={upload_stats['parallel']}"
+
+def _save_job_metric(jm, stages=None):
+    """Hand ``jm`` and the task's stage timings (JobStage rows) to the metrics sink.
+
+    The rows are written in batches by a background thread, so the task does
+    not wait on the database. String values are cut to their column's length
+    first (``options`` echoes user input such as edit operations), so the
+    row cannot fail the batch insert.
+    """
+    for column in JobMetric.__table__.columns:
+        length = getattr(column.type, "length", None)
+        value = getattr(jm, column.key)
+        if length and isinstance(value, str) and len(value) > length:
+            setattr(jm, column.key, value[:length])
+    if stages is not None:
+        jm.stages.extend(stages.rows(jm.tool))
+        logging.info(f"[metrics] {jm.tool} {jm.status} stages: {stages.summary()}")
+    metrics_sink.submit(jm)
+
 def download_file_from_url_task_helper(url, temp_dir, max_size):
     try:
         if not os.path.exists(temp_dir):
@@ -76,55 +294,56 @@ def download_file_from_url_task_helper(url, temp_dir, max_size):
                 raise ValueError("Failed to download from the provided video URL.")
 
         headers = {"User-Agent": "Mozilla/5.0"}
-        response = requests.get(url, stream=True, timeout=30, headers=headers)
-        response.raise_for_status()
-
-        content_length = response.headers.get('Content-Length')
-        if content_length and int(content_length) > max_size:
-            raise ValueError("File too large.")
-
-        content_type = response.headers.get("content-type", "")
-        logging.info(f"Downloading: {url} [content-type: {content_type}]")
-
-        if 'text' in content_type.lower():
-            snippet = response.content[:256]
-            logging.warning(f"URL appears to return text/html, not an image: {snippet.decode(errors='ignore')}")
-            raise ValueError("URL did not return an image. Possibly a 404 page or HTML response.")
-
-        filename = os.path.basename(parsed_url.path) or "downloaded_file"
-        if "." not in filename:
-            if "image" in content_type:
-                if "gif" in content_type: filename += ".gif"
-                elif "png" in content_type: filename += ".png"
-                elif "jpeg" in content_type or "jpg" in content_type: filename += ".jpeg"
-                elif "webp" in content_type: filename += ".webp"
-                else: filename += ".gif"
-            elif "video" in content_type:
-                filename += ".mp4"
-            else:
-                filename += ".bin"
-
-        file_path = os.path.join(temp_dir, filename)
-
-        logging.info(f"Saving file to: {file_path}")
-        downloaded_size = 0
-        with open(file_path, "wb") as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                downloaded_size += len(chunk)
-                if downloaded_size > max_size:
-                    f.close()
-                    os.remove(file_path)
-                    raise ValueError("Download exceeded size limit.")
-                f.write(chunk)
-
-        if os.path.getsize(file_path) < 1024:
-            with open(file_path, 'rb') as f:
-                head = f.read(256)
-                logging.warning(f"Downloaded file too small: {file_path}. Head: {head}")
-            os.remove(file_path)
-            raise ValueError(f"Downloaded file from {url} is too small or invalid.")
-
-        return file_path
+        # Release the upstream connection however this returns (the web tier serves requests on threads)
+        with requests.get(url, stream=True, timeout=30, headers=headers) as response:
+            response.raise_for_status()
+
+            content_length = response.headers.get('Content-Length')
+            if content_length and int(content_length) > max_size:
+                raise ValueError("File too large.")
+
+            content_type = response.headers.get("content-type", "")
+            logging.info(f"Downloading: {url} [content-type: {content_type}]")
+
+            if 'text' in content_type.lower():
+                snippet = response.content[:256]
+                logging.warning(f"URL appears to return text/html, not an image: {snippet.decode(errors='ignore')}")
+                raise ValueError("URL did not return an image. Possibly a 404 page or HTML response.")
+
+            filename = os.path.basename(parsed_url.path) or "downloaded_file"
+            if "." not in filename:
+                if "image" in content_type:
+                    if "gif" in content_type: filename += ".gif"
+                    elif "png" in content_type: filename += ".png"
+                    elif "jpeg" in content_type or "jpg" in content_type: filename += ".jpeg"
+                    elif "webp" in content_type: filename += ".webp"
+                    else: filename += ".gif"
+                elif "video" in content_type:
+                    filename += ".mp4"
+                else:
+                    filename += ".bin"
+
+            file_path = os.path.join(temp_dir, filename)
+
+            logging.info(f"Saving file to: {file_path}")
+            downloaded_size = 0
+            with open(file_path, "wb") as f:
+                for chunk in response.iter_content(chunk_size=8192):
+                    downloaded_size += len(chunk)
+                    if downloaded_size > max_size:
+                        f.close()
+                        os.remove(file_path)
+                        raise ValueError("Download exceeded size limit.")
+                    f.write(chunk)
+
+            if os.path.getsize(file_path) < 1024:
+                with open(file_path, 'rb') as f:
+                    head = f.read(256)
+                    logging.warning(f"Downloaded file too small: {file_path}. Head: {head}")
+                os.remove(file_path)
+                raise ValueError(f"Downloaded file from {url} is too small or invalid.")
+
+            return file_path
 
     except Exception as e:
         logging.error(f"Error downloading file: {e}", exc_info=True)
@@ -134,6 +353,10 @@ def download_file_from_url_task_helper(url, temp_dir, max_size):
 def _ensure_local_path(path: str, output_dir: str, upload_folder: str) -> str:
     """Ensure the given path refers to a local file. If it's a GCS object name,
     download it to the output_dir and return the local path."""
+    # Small inputs handed over in Redis/shared memory
+    if is_token(path):
+        return resolve_token(path, output_dir)
+
     # If already absolute and exists, just return
     if os.path.isabs(path) and os.path.exists(path):
         return path
@@ -180,6 +403,7 @@ def orchestrate_gif_from_urls_task(self, urls, frame_duration, loop_count, base_
     Orchestrates downloading images from URLs and then creating a GIF from them.
     """
     _task_start = time.time()
+    _stages = StageTimer()
     try:
         # Ensure base directory exists (worker may be on a different machine)
         os.makedirs(base_output_dir, exist_ok=True)
@@ -207,40 +431,27 @@ def orchestrate_gif_from_urls_task(self, urls, frame_duration, loop_count, base_
         try:
             jm = JobMetric(tool='gif-maker', task_id=self.request.id if getattr(self,'request',None) else None,
                            status='FAILURE', error_message=str(e), processing_time_ms=int((time.time()-_task_start)*1000))
-            flask_app = get_flask_app()
-            if flask_app:
-                with flask_app.app_context(): db.session.add(jm); db.session.commit()
-            else:
-                db.session.add(jm); db.session.commit()
+            _save_job_metric(jm, _stages)
         except Exception:
             pass
         raise
 
 @celery_app.task(bind=True)
-def convert_video_to_gif_task(self, video_path, segments, fps, width, height, output_dir, upload_folder, include_audio=False, brightness=0.0, contrast=1.0):
+def convert_video_to_gif_task(self, video_path, segments, fps, width, height, output_dir, upload_folder, include_audio=False, brightness=0.0, contrast=1.0, segment_strategy=None,
+                              encoder="default", palette_stats_mode="full", palette_dither="sierra2_4a"):
     _task_start = time.time()
+    _stages = StageTimer()
+    _progress = ProgressReporter(self)
     try:
         os.makedirs(output_dir, exist_ok=True)
-        video_path = _ensure_local_path(video_path, output_dir, upload_folder)
+        with _stages.stage("download"):
+            video_path = _ensure_local_path(video_path, output_dir, upload_folder)
 
-        # Check if input file exists with retry mechanism for distributed file systems
-        max_retries = 3
-        for attempt in range(max_retries):
-            if os.path.exists(video_path):
-                break
-            if attempt < max_retries - 1:
-                logging.warning(f"[convert_video_to_gif_task] Input video file not found on attempt {attempt + 1}, retrying in 1 second: {video_path}")
-                time.sleep(1)
-            else:
-                logging.error(f"[convert_video_to_gif_task] Input video file not found after {max_retries} attempts: {video_path}")
-                # List directory contents for debugging
-                dir_path = os.path.dirname(video_path)
-                if os.path.exists(dir_path):
-                    files = os.listdir(dir_path)
-                    logging.error(f"[convert_video_to_gif_task] Directory contents of {dir_path}: {files}")
-                else:
-                    logging.error(f"[convert_video_to_gif_task] Directory does not exist: {dir_path}")
-                raise Exception(f"Input video file not found: {video_path}")
+        # Inputs arrive as a token, a shared-volume path or a GCS object, all resolved above;
+        # a path that is still missing will not appear by waiting.
+        if not os.path.exists(video_path):
+            logging.error(f"[convert_video_to_gif_task] Input video file not found: {video_path}")
+            raise FileNotFoundError(f"Input video file not found: {video_path}")
 
         # Check file size to ensure it is not empty
         if os.path.getsize(video_path) == 0:
@@ -253,31 +464,44 @@ def convert_video_to_gif_task(self, video_path, segments, fps, width, height, ou
         logging.info(f"[convert_video_to_gif_task] Task processing on machine: {hostname}")
         logging.info(f"[convert_video_to_gif_task] Processing video: {video_path} (size: {os.path.getsize(video_path)} bytes)")
 
-        # Build filter_complex for video segments and apply fps/scale/eq AFTER concat to avoid -vf conflict
-        fc_parts = []
-        v_labels = []
-        for i, seg in enumerate(segments):
-            fc_parts.append(
-                f"[0:v]trim=start={seg['start']}:end={seg['end']},setpts=PTS-STARTPTS[v{i}]"
-            )
-            v_labels.append(f"[v{i}]")
-        # Concat segments (video only)
-        fc_parts.append("".join(v_labels) + f"concat=n={len(segments)}:v=1:a=0[vcat]")
-        # Apply fps + scale + eq to concatenated output -> [vout]
-        fc_parts.append(
-            f"[vcat]fps={fps},scale={width}:{height}:flags=lanczos,eq=brightness={brightness}:contrast={contrast}[vout]"
-        )
-        filter_complex_v = ";".join(fc_parts)
-
+        # Segments are cut, fps-limited and scaled into [vsrc]; eq is applied last to avoid -vf conflicts
+        strategy = resolve_segment_strategy(segment_strategy, segments)
+        segments_dir = os.path.join(output_dir, f"segments_{uuid.uuid4().hex}")
+        logging.info(f"[convert_video_to_gif_task] segment_strategy={strategy}, segments={len(segments)}")
+        try:
+            clip_seconds = sum(max(float(seg['end']) - float(seg['start']), 0.0) for seg in segments)
+        except Exception:
+            clip_seconds = None
         output_gif = os.path.join(output_dir, f"output_{uuid.uuid4().hex}.gif")
-        cmd_gif = [
-            "ffmpeg", "-i", video_path,
-            "-filter_complex", filter_complex_v,
-            "-map", "[vout]",
-            "-y", output_gif,
-        ]
-        logging.debug(f"[convert_video_to_gif_task] video_path={video_path}, output_gif={output_gif}, cmd={' '.join(cmd_gif)}")
-        result_gif = subprocess.run(cmd_gif, capture_output=True, text=True)
+        try:
+            # ffmpeg decodes, filters and encodes in one process: segment extraction
+            # counts as decode, palette generation as transform, the GIF pass as encode.
+            _progress.update(5, "Preparing video", force=True)
+            with _stages.stage("decode"):
+                input_args, filter_prefix = build_video_source(video_path, segments, fps, width, height, strategy, segments_dir)
+            eq_filter = f"eq=brightness={brightness}:contrast={contrast}"
+            if encoder == "palette":
+                # Two-pass: palettegen (cached per input/segments/eq) then paletteuse
+                palette_key = palette_cache_key(video_path, segments, brightness, contrast, palette_stats_mode)
+                _progress.update(15, "Generating palette", force=True)
+                with _stages.stage("transform"):
+                    palette_path = get_or_create_palette(input_args, filter_prefix, eq_filter, palette_stats_mode,
+                                                         os.path.join(upload_folder, "palette_cache"), palette_key)
+                input_args = [*input_args, "-i", palette_path]
+                filter_complex_v = paletteuse_filter(filter_prefix, eq_filter, palette_dither, 1)
+            else:
+                filter_complex_v = f"{filter_prefix};[vsrc]{eq_filter}[vout]"
+            cmd_gif = [
+                "ffmpeg", *input_args,
+                "-filter_complex", filter_complex_v,
+                "-map", "[vout]",
+                "-y", output_gif,
+            ]
+            logging.debug(f"[convert_video_to_gif_task] video_path={video_path}, output_gif={output_gif}, cmd={' '.join(cmd_gif)}")
+            with _stages.stage("encode"):
+                result_gif = _run_ffmpeg(cmd_gif, _progress, clip_seconds, 20, 90 if include_audio else 95, "Encoding GIF")
+        finally:
+            shutil.rmtree(segments_dir, ignore_errors=True)
         logging.debug(f"[convert_video_to_gif_task] ffmpeg stdout: {result_gif.stdout}")
         logging.debug(f"[convert_video_to_gif_task] ffmpeg stderr: {result_gif.stderr}")
         if result_gif.returncode != 0:
@@ -295,9 +519,11 @@ def convert_video_to_gif_task(self, video_path, segments, fps, width, height, ou
         gif_rel = os.path.relpath(output_gif, upload_folder)
         # Optionally upload GIF to GCS
         bucket_name = os.environ.get("GCS_UPLOAD_BUCKET") or os.environ.get("GCS_BUCKET_NAME")
+        upload_stats = {}
         if bucket_name:
             try:
-                upload_file_to_gcs(output_gif, bucket_name, gif_rel.replace("\\", "/"))
+                with _stages.stage("upload"):
+                    upload_file_to_gcs(output_gif, bucket_name, gif_rel.replace("\\", "/"), stats=upload_stats)
                 try:
                     os.remove(output_gif)
                 except Exception as de:
@@ -354,14 +580,16 @@ def convert_video_to_gif_task(self, video_path, segments, fps, width, height, ou
                 ]
                 logging.debug(f"[convert_video_to_gif_task] output_mp4={output_mp4}, cmd={' '.join(cmd_mp4)}")
                 try:
-                    result_mp4 = subprocess.run(cmd_mp4, capture_output=True, text=True, timeout=60)
+                    with _stages.stage("encode"):
+                        result_mp4 = _run_ffmpeg(cmd_mp4, _progress, clip_seconds, 90, 99, "Encoding MP4", timeout=60)
                     logging.debug(f"[convert_video_to_gif_task] ffmpeg mp4 stdout: {result_mp4.stdout}")
                     logging.debug(f"[convert_video_to_gif_task] ffmpeg mp4 stderr: {result_mp4.stderr}")
                     if result_mp4.returncode == 0 and os.path.exists(output_mp4) and os.path.getsize(output_mp4) > 1024:
                         mp4_rel = os.path.relpath(output_mp4, upload_folder)
                         if bucket_name:
                             try:
-                                upload_file_to_gcs(output_mp4, bucket_name, mp4_rel.replace("\\", "/"))
+                                with _stages.stage("upload"):
+                                    upload_file_to_gcs(output_mp4, bucket_name, mp4_rel.replace("\\", "/"))
                                 try:
                                     os.remove(output_mp4)
                                 except Exception as de:
@@ -383,12 +611,8 @@ def convert_video_to_gif_task(self, video_path, segments, fps, width, height, ou
             peak_kb = getattr(resource.getrusage(resource.RUSAGE_SELF),'ru_maxrss',0)
             jm = JobMetric(tool='video-to-gif', task_id=self.request.id if getattr(self,'request',None) else None,
                            status='SUCCESS', input_type='video', output_size_bytes=os.path.getsize(output_gif) if os.path.exists(output_gif) else None,
-                           processing_time_ms=int((time.time()-_task_start)*1000), options=f"fps={fps}; size={width}x{height}; peak_kb={peak_kb}; audio={include_audio}")
-            flask_app = get_flask_app()
-            if flask_app:
-                with flask_app.app_context(): db.session.add(jm); db.session.commit()
-            else:
-                db.session.add(jm); db.session.commit()
+                           processing_time_ms=int((time.time()-_task_start)*1000), options=f"fps={fps}; size={width}x{height}; segments={len(segments)}; strategy={strategy}; encoder={encoder}; peak_kb={peak_kb}{_transfer_opts(upload_stats)}; audio={include_audio}")
+            _save_job_metric(jm, _stages)
         except Exception:
             pass
         return result
@@ -397,11 +621,7 @@ def convert_video_to_gif_task(self, video_path, segments, fps, width, height, ou
         try:
             jm = JobMetric(tool='video-to-gif', task_id=self.request.id if getattr(self,'request',None) else None,
                            status='FAILURE', error_message=str(e), processing_time_ms=int((time.time()-_task_start)*1000))
-            flask_app = get_flask_app()
-            if flask_app:
-                with flask_app.app_context(): db.session.add(jm); db.session.commit()
-            else:
-                db.session.add(jm); db.session.commit()
+            _save_job_metric(jm, _stages)
         except Exception:
             pass
         raise
@@ -413,8 +633,11 @@ def convert_video_to_gif_task(self, video_path, segments, fps, width, height, ou
             logging.warning(f"Error deleting input video file {video_path}: {e}")
 
 @celery_app.task(bind=True)
-def create_gif_from_images_task(self, image_paths, frame_duration=None, loop_count=None, output_dir=None, upload_folder=None, quality_level="high", frame_durations=None, effects=None):
+def create_gif_from_images_task(self, image_paths, frame_duration=None, loop_count=None, output_dir=None, upload_folder=None, quality_level="high", frame_durations=None, effects=None,
+                                palette_mode=None, palette_method="mediancut"):
     _task_start = time.time()
+    _stages = StageTimer()
+    _progress = ProgressReporter(self)
     try:
         if isinstance(image_paths, list) and image_paths and isinstance(image_paths[0], list):
             image_paths = [item for sublist in image_paths for item in (sublist if isinstance(sublist, list) else [sublist])]
@@ -434,97 +657,88 @@ def create_gif_from_images_task(self, image_paths, frame_duration=None, loop_cou
         }
 
         settings = quality_settings.get(quality_level, quality_settings["high"])
+        # "global": one palette sampled across every frame; "per-frame": an adaptive palette per image
+        palette_mode = palette_mode or os.environ.get("GIF_MAKER_PALETTE_MODE", "per-frame")
+        global_frames = []
+
+        # Decoding each image is booked separately from enhancement, effects and quantization
+        with _stages.stage("transform"):
+            for idx, path in enumerate(image_paths):
+                _progress.update(80 * idx / len(image_paths), "Processing images")
+                exists = os.path.exists(path)
+                if not exists:
+                    for _ in range(5):
+                        time.sleep(0.1)
+                        if os.path.exists(path):
+                            exists = True
+                            break
+                if not exists:
+                    logging.error(f"File does not exist: {path}")
+                    continue
 
-        for idx, path in enumerate(image_paths):
-            exists = os.path.exists(path)
-            if not exists:
-                for _ in range(5):
-                    time.sleep(0.1)
-                    if os.path.exists(path):
-                        exists = True
-                        break
-            if not exists:
-                logging.error(f"File does not exist: {path}")
-                continue
-
-            file_size = os.path.getsize(path)
-            if file_size < 1024:
-                logging.error(f"Skipped: file too small ({file_size} bytes): {path}")
-                continue
+                file_size = os.path.getsize(path)
+                if file_size < 1024:
+                    logging.error(f"Skipped: file too small ({file_size} bytes): {path}")
+                    continue
 
-            try:
-                img = Image.open(path)
-                # Store original image for potential enhancement
-                original_img = img.copy()
-                # Flatten transparency if present (WEBP/PNG with alpha)
-                if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
-                    background = Image.new("RGBA", img.size, (255, 255, 255, 255))
-                    background.paste(img, mask=img.split()[-1])
-                    img = background.convert("RGB")
-                else:
-                    img = img.convert("RGB")
-                # Image enhancement for better quality
-                if settings["enhance"]:
-                    from PIL import ImageEnhance, ImageFilter
-                    # Enhance sharpness
-                    enhancer = ImageEnhance.Sharpness(img)
-                    img = enhancer.enhance(1.2)
-                    # Enhance contrast slightly
-                    enhancer = ImageEnhance.Contrast(img)
-                    img = enhancer.enhance(1.1)
-                    # Enhance brightness if image is too dark
-                    enhancer = ImageEnhance.Brightness(img)
-                    img = enhancer.enhance(1.05)
-                    # Apply subtle unsharp mask for better detail
-                    img = img.filter(ImageFilter.UnsharpMask(radius=1, percent=150, threshold=3))
-                # --- Apply per-frame effect if specified ---
-                effect = None
-                if effects and idx < len(effects):
-                    effect = effects[idx]
-                if effect == "fade":
-                    # Generate fade-in animation (white to image)
-                    fade_frames = []
-                    fade_steps = 6
-                    for step in range(fade_steps):
-                        alpha = int(255 * (1 - step / (fade_steps - 1)))
-                        fade_img = img.convert("RGBA")
-                        overlay = Image.new("RGBA", fade_img.size, (255, 255, 255, alpha))
-                        blended = Image.alpha_composite(fade_img, overlay)
-                        pal_img = blended.convert("P", palette=Image.ADAPTIVE)
-                        fade_frames.append(pal_img)
-                    images.extend(fade_frames)
-                    enhanced_images.extend(fade_frames)
-                    logging.info(f"Added {fade_steps} fade frames for {path}")
-                elif effect == "zoom":
-                    # Generate zoom-in animation
-                    zoom_frames = []
-                    zoom_steps = 6
-                    w, h = img.size
-                    for step in range(zoom_steps):
-                        crop_pct = 0.1 * (1 - step / (zoom_steps - 1))
-                        crop_box = (
-                            int(w * crop_pct),
-                            int(h * crop_pct),
-                            int(w * (1 - crop_pct)),
-                            int(h * (1 - crop_pct))
-                        )
-                        zoom_img = img.copy().crop(crop_box).resize((w, h), Image.Resampling.LANCZOS)
-                        pal_img = zoom_img.convert("P", palette=Image.ADAPTIVE)
-                        zoom_frames.append(pal_img)
-                    images.extend(zoom_frames)
-                    enhanced_images.extend(zoom_frames)
-                    logging.info(f"Added {zoom_steps} zoom frames for {path}")
-                else:
-                    # Convert to palette mode with better color handling
-                    if settings["dither"]:
-                        img = img.convert("P", palette=Image.ADAPTIVE, dither=Image.FLOYDSTEINBERG)
+                try:
+                    with _stages.stage("decode"):
+                        img = Image.open(path)
+                        # Store original image for potential enhancement
+                        original_img = img.copy()
+                        # Flatten transparency if present (WEBP/PNG with alpha)
+                        if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+                            background = Image.new("RGBA", img.size, (255, 255, 255, 255))
+                            background.paste(img, mask=img.split()[-1])
+                            img = background.convert("RGB")
+                        else:
+                            img = img.convert("RGB")
+                    # Image enhancement for better quality
+                    if settings["enhance"]:
+                        from PIL import ImageEnhance, ImageFilter
+                        # Enhance sharpness
+                        enhancer = ImageEnhance.Sharpness(img)
+                        img = enhancer.enhance(1.2)
+                        # Enhance contrast slightly and lift brightness, in one array pass
+                        img = adjust_contrast_brightness(img, contrast=1.1, brightness=1.05)
+                        # Apply subtle unsharp mask for better detail
+                        img = img.filter(ImageFilter.UnsharpMask(radius=1, percent=150, threshold=3))
+                    # --- Apply per-frame effect if specified ---
+                    effect = None
+                    if effects and idx < len(effects):
+                        effect = effects[idx]
+                    effect_fn = EFFECTS.get(effect)
+                    if palette_mode == "global":
+                        # Keep RGB; every frame is quantized against one palette after the loop
+                        stack = effect_fn(img) if effect_fn else [to_array(img)]
+                        global_frames.extend(stack)
+                        logging.info(f"Loaded image {path}, size={img.size}, frames={len(stack)}, effect={effect}")
+                    elif effect_fn:
+                        # Build every step of the effect as one array stack and map it onto a shared palette
+                        effect_frames = quantize_shared(effect_fn(img), settings["colors"], settings["dither"])
+                        images.extend(effect_frames)
+                        enhanced_images.extend(effect_frames)
+                        logging.info(f"Added {len(effect_frames)} {effect} frames for {path}")
                     else:
-                        img = img.convert("P", palette=Image.ADAPTIVE)
-                    images.append(img)
-                    enhanced_images.append(img)
-                    logging.info(f"Loaded and processed image {path}, size={img.size}, mode={img.mode}, enhanced={settings['enhance']}, effect={effect}")
-            except Exception as e:
-                logging.error(f"Failed to open/process image {path}: {e}")
+                        # Convert to palette mode with better color handling
+                        if settings["dither"]:
+                            img = img.convert("P", palette=Image.ADAPTIVE, dither=Image.FLOYDSTEINBERG)
+                        else:
+                            img = img.convert("P", palette=Image.ADAPTIVE)
+                        images.append(img)
+                        enhanced_images.append(img)
+                        logging.info(f"Loaded and processed image {path}, size={img.size}, mode={img.mode}, enhanced={settings['enhance']}, effect={effect}")
+                except Exception as e:
+                    logging.error(f"Failed to open/process image {path}: {e}")
+
+            if global_frames:
+                target_h, target_w = global_frames[0].shape[:2]
+                global_frames = [f if f.shape[:2] == (target_h, target_w)
+                                 else to_array(Image.fromarray(f).resize((target_w, target_h), Image.Resampling.LANCZOS))
+                                 for f in global_frames]
+                images = quantize_shared(global_frames, settings["colors"], settings["dither"], palette_method)
+                global_frames = []
+                logging.info(f"Quantized {len(images)} frames against one global palette (method={palette_method})")
 
         if not images:
             raise ValueError("No valid images to create GIF.")
@@ -546,47 +760,32 @@ def create_gif_from_images_task(self, image_paths, frame_duration=None, loop_cou
             durations = [max(frame_duration or 100, 100)] * len(images)
 
         # Create GIF with improved settings and per-frame durations
-        images[0].save(
-            output_path,
-            save_all=True,
-            append_images=images[1:],
-            duration=durations,
-            loop=loop_count or 0,
-            disposal=2,
-            optimize=settings["optimize"],
-            colors=settings["colors"]
-        )
+        _progress.update(85, "Encoding GIF", force=True)
+        with _stages.stage("encode"):
+            images[0].save(
+                output_path,
+                save_all=True,
+                append_images=images[1:],
+                duration=durations,
+                loop=loop_count or 0,
+                disposal=2,
+                optimize=settings["optimize"],
+                colors=settings["colors"]
+            )
 
         logging.info(f"High-quality GIF created at: {output_path} ({os.path.getsize(output_path)} bytes)")
         rel = os.path.relpath(output_path, upload_folder)
 
-        # If a GCS bucket is configured, upload the output and return the object key
-        try:
-            bucket_name = os.environ.get("GCS_UPLOAD_BUCKET") or os.environ.get("GCS_BUCKET_NAME")
-            if bucket_name:
-                object_name = rel.replace("\\", "/")
-                try:
-                    upload_file_to_gcs(output_path, bucket_name, object_name)
-                    # Remove local file after upload to save space
-                    try:
-                        os.remove(output_path)
-                    except Exception as de:
-                        logging.warning(f"Could not delete local output after upload: {de}")
-                    rel = object_name
-                except Exception as ue:
-                    logging.error(f"Failed to upload output to GCS: {ue}")
-        except Exception as be:
-            logging.warning(f"Bucket upload skipped due to error: {be}")
+        # Optionally upload to GCS
+        _progress.update(95, "Uploading", force=True)
+        with _stages.stage("upload"):
+            rel, upload_stats = _upload_output(output_path, rel, "create_gif_from_images_task")
         try:
             peak_kb = getattr(resource.getrusage(resource.RUSAGE_SELF),'ru_maxrss',0)
             jm = JobMetric(tool='gif-maker', task_id=self.request.id if getattr(self,'request',None) else None,
                            status='SUCCESS', input_type='images', output_size_bytes=os.path.getsize(output_path) if os.path.exists(output_path) else None,
-                           processing_time_ms=int((time.time()-_task_start)*1000), options=f"n={len(image_paths)}; frame_ms={frame_duration}; peak_kb={peak_kb}; quality={quality_level}")
-            flask_app = get_flask_app()
-            if flask_app:
-                with flask_app.app_context(): db.session.add(jm); db.session.commit()
-            else:
-                db.session.add(jm); db.session.commit()
+                           processing_time_ms=int((time.time()-_task_start)*1000), options=f"n={len(image_paths)}; frame_ms={frame_duration}; peak_kb={peak_kb}{_transfer_opts(upload_stats)}; quality={quality_level}; palette={palette_mode}")
+            _save_job_metric(jm, _stages)
         except Exception:
             pass
         return rel
@@ -595,11 +794,7 @@ def create_gif_from_images_task(self, image_paths, frame_duration=None, loop_cou
         try:
             jm = JobMetric(tool='gif-maker', task_id=self.request.id if getattr(self,'request',None) else None,
                            status='FAILURE', error_message=str(e), processing_time_ms=int((time.time()-_task_start)*1000))
-            flask_app = get_flask_app()
-            if flask_app:
-                with flask_app.app_context(): db.session.add(jm); db.session.commit()
-            else:
-                db.session.add(jm); db.session.commit()
+            _save_job_metric(jm, _stages)
         except Exception:
             pass
         raise
@@ -621,11 +816,14 @@ def create_gif_from_images_task(self, image_paths, frame_duration=None, loop_cou
 @celery_app.task(bind=True)
 def resize_gif_task(self, gif_path, width, height, maintain_aspect_ratio, output_dir, upload_folder):
     _task_start = time.time()
+    _stages = StageTimer()
+    _progress = ProgressReporter(self)
     try:
         os.makedirs(output_dir, exist_ok=True)
         logging.info(f"[resize_gif_task] gif_path={gif_path}, width={width}, height={height}, maintain_aspect_ratio={maintain_aspect_ratio}, output_dir={output_dir}, upload_folder={upload_folder}")
 
-        gif_path = _ensure_local_path(gif_path, output_dir, upload_folder)
+        with _stages.stage("download"):
+            gif_path = _ensure_local_path(gif_path, output_dir, upload_folder)
 
         if not os.path.exists(gif_path):
             logging.error(f"[resize_gif_task] File does not exist: {gif_path}")
@@ -635,61 +833,29 @@ def resize_gif_task(self, gif_path, width, height, maintain_aspect_ratio, output
             import mimetypes
             mime_type, _ = mimetypes.guess_type(gif_path)
         
-        gif = Image.open(gif_path)
-        frames = []
-
-        if maintain_aspect_ratio:
-            original_width, original_height = gif.size
-            aspect_ratio = original_width / original_height
-            if width / height > aspect_ratio:
-                width = int(height * aspect_ratio)
-            else:
-                height = int(width / aspect_ratio)
-
-        for frame in range(gif.n_frames):
-            gif.seek(frame)
-            resized_frame = gif.copy().resize((width, height), Image.Resampling.LANCZOS)
-            frames.append(resized_frame)
-
         output_path = os.path.join(output_dir, f"resized_{uuid.uuid4().hex}.gif")
-        frames[0].save(
-            output_path,
-            save_all=True,
-            append_images=frames[1:],
-            duration=gif.info.get("duration", 100),
-            loop=gif.info.get("loop", 0)
-        )
-        if not os.path.exists(output_path) or os.path.getsize(output_path) < 1024:
-            logging.error(f"[resize_gif_task] Output GIF missing or too small: {output_path}")
-            raise Exception("Output GIF missing or too small.")
+        with Image.open(gif_path) as gif:
+            width, height = _resize_dimensions(gif.size[0], gif.size[1], width, height, maintain_aspect_ratio)
+            with _stages.stage("decode"):
+                plan, index = _decimation_plan(gif, "resize_gif_task"), index_gif(gif_path)
+            frames = _stages.iterate("decode", iter_frames(gif, plan, index))
+            frames = _stages.iterate("transform", apply_ops(frames, [resize_op((width, height))]))
+            frames = _progress.iterate(frames, _frame_total(gif, plan), 5, 90, "Resizing frames")
+            with _stages.stage("encode"):
+                write_gif(frames, output_path, loop=gif.info.get("loop", 0), delta=True)
+        _check_output_gif(output_path, "resize_gif_task")
         logging.info(f"[resize_gif_task] Successfully created resized GIF: {output_path} (size: {os.path.getsize(output_path)} bytes)")
         rel = os.path.relpath(output_path, upload_folder)
         # Optionally upload to GCS
-        try:
-            bucket_name = os.environ.get("GCS_UPLOAD_BUCKET") or os.environ.get("GCS_BUCKET_NAME")
-            if bucket_name:
-                object_name = rel.replace("\\", "/")
-                try:
-                    upload_file_to_gcs(output_path, bucket_name, object_name)
-                    try:
-                        os.remove(output_path)
-                    except Exception as de:
-                        logging.warning(f"[resize_gif_task] cleanup failed: {de}")
-                    rel = object_name
-                except Exception as ue:
-                    logging.error(f"[resize_gif_task] Failed to upload to GCS: {ue}")
-        except Exception as be:
-            logging.warning(f"[resize_gif_task] Bucket upload skipped: {be}")
+        _progress.update(95, "Uploading", force=True)
+        with _stages.stage("upload"):
+            rel, upload_stats = _upload_output(output_path, rel, "resize_gif_task")
         try:
             peak_kb = getattr(resource.getrusage(resource.RUSAGE_SELF),'ru_maxrss',0)
             jm = JobMetric(tool='resize', task_id=self.request.id if getattr(self,'request',None) else None,
                            status='SUCCESS', input_type='gif', output_size_bytes=os.path.getsize(output_path) if os.path.exists(output_path) else None,
-                           processing_time_ms=int((time.time()-_task_start)*1000), options=f"size={width}x{height}; keep_ar={maintain_aspect_ratio}; peak_kb={peak_kb}")
-            flask_app = get_flask_app()
-            if flask_app:
-                with flask_app.app_context(): db.session.add(jm); db.session.commit()
-            else:
-                db.session.add(jm); db.session.commit()
+                           processing_time_ms=int((time.time()-_task_start)*1000), options=f"size={width}x{height}; keep_ar={maintain_aspect_ratio}; peak_kb={peak_kb}{_transfer_opts(upload_stats)}")
+            _save_job_metric(jm, _stages)
         except Exception:
             pass
         return rel
@@ -698,11 +864,7 @@ def resize_gif_task(self, gif_path, width, height, maintain_aspect_ratio, output
         try:
             jm = JobMetric(tool='resize', task_id=self.request.id if getattr(self,'request',None) else None,
                            status='FAILURE', error_message=str(e), processing_time_ms=int((time.time()-_task_start)*1000))
-            flask_app = get_flask_app()
-            if flask_app:
-                with flask_app.app_context(): db.session.add(jm); db.session.commit()
-            else:
-                db.session.add(jm); db.session.commit()
+            _save_job_metric(jm, _stages)
         except Exception:
             pass
         raise
@@ -717,11 +879,14 @@ def resize_gif_task(self, gif_path, width, height, maintain_aspect_ratio, output
 @celery_app.task(bind=True)
 def crop_gif_task(self, gif_path, x, y, width, height, aspect_ratio, output_dir, upload_folder):
     _task_start = time.time()
+    _stages = StageTimer()
+    _progress = ProgressReporter(self)
     try:
         os.makedirs(output_dir, exist_ok=True)
         logging.info(f"[crop_gif_task] gif_path={gif_path}, x={x}, y={y}, width={width}, height={height}, aspect_ratio={aspect_ratio}, output_dir={output_dir}, upload_folder={upload_folder}")
 
-        gif_path = _ensure_local_path(gif_path, output_dir, upload_folder)
+        with _stages.stage("download"):
+            gif_path = _ensure_local_path(gif_path, output_dir, upload_folder)
 
         if not os.path.exists(gif_path):
             logging.error(f"[crop_gif_task] File does not exist: {gif_path}")
@@ -731,75 +896,36 @@ def crop_gif_task(self, gif_path, x, y, width, height, aspect_ratio, output_dir,
             import mimetypes
             mime_type, _ = mimetypes.guess_type(gif_path)
         
-        gif = Image.open(gif_path)
-        original_width, original_height = gif.size
-        logging.info(f"[crop_gif_task] Original GIF size: {original_width}x{original_height}, n_frames: {getattr(gif, 'n_frames', 1)}")
-
-        # Helper function from gif.py
-        def get_aspect_ratio_dimensions(w, h, ar):
-            if ar == "square": size = min(w, h); return size, size
-            elif ar == "4:3": return (int(h * 4/3), h) if w / h > 4/3 else (w, int(w * 3/4))
-            elif ar == "16:9": return (int(h * 16/9), h) if w / h > 16/9 else (w, int(w * 9/16))
-            elif ar == "3:2": return (int(h * 3/2), h) if w / h > 3/2 else (w, int(w * 2/3))
-            elif ar == "2:1": return (int(h * 2), h) if w / h > 2 else (w, int(w / 2))
-            elif ar == "golden": golden_ratio = 1.618; return (int(h * golden_ratio), h) if w / h > golden_ratio else (w, int(w / golden_ratio))
-            else: return w, h
-
-        if aspect_ratio != "free":
-            width, height = get_aspect_ratio_dimensions(width, height, aspect_ratio)
-
-        x = max(0, min(x, original_width - width))
-        y = max(0, min(y, original_height - height))
-        width = min(width, original_width - x)
-        height = min(height, original_height - y)
-
-        frames = []
-        for frame in range(gif.n_frames):
-            gif.seek(frame)
-            cropped_frame = gif.copy().crop((x, y, x + width, y + height))
-            logging.info(f"[crop_gif_task] Cropped frame {frame}: {cropped_frame.size}")
-            frames.append(cropped_frame)
+        with Image.open(gif_path) as gif_probe:
+            original_width, original_height = gif_probe.size
+            logging.info(f"[crop_gif_task] Original GIF size: {original_width}x{original_height}, n_frames: {getattr(gif_probe, 'n_frames', 1)}")
+
+        x, y, width, height = _crop_box(original_width, original_height, x, y, width, height, aspect_ratio)
 
         output_path = os.path.join(output_dir, f"cropped_{uuid.uuid4().hex}.gif")
-        frames[0].save(
-            output_path,
-            save_all=True,
-            append_images=frames[1:],
-            duration=gif.info.get("duration", 100),
-            loop=gif.info.get("loop", 0)
-        )
-        if not os.path.exists(output_path) or os.path.getsize(output_path) < 1024:
-            logging.error(f"[crop_gif_task] Output GIF missing or too small: {output_path}")
-            raise Exception("Output GIF missing or too small.")
-        else:
-            logging.info(f"[crop_gif_task] Output GIF size: {os.path.getsize(output_path)} bytes")
+        with Image.open(gif_path) as gif:
+            with _stages.stage("decode"):
+                plan, index = _decimation_plan(gif, "crop_gif_task"), index_gif(gif_path)
+            # Cropping changes no colour, so frames stay on the source palette.
+            frames = _stages.iterate("decode", iter_frames(gif, plan, index, keep_palette=True))
+            frames = _stages.iterate("transform", apply_ops(frames, [crop_op((x, y, x + width, y + height))]))
+            frames = _progress.iterate(frames, _frame_total(gif, plan), 5, 90, "Cropping frames")
+            with _stages.stage("encode"):
+                n_written = write_gif(frames, output_path, loop=gif.info.get("loop", 0), delta=True)
+        logging.info(f"[crop_gif_task] Cropped {n_written} frames to {width}x{height}")
+        _check_output_gif(output_path, "crop_gif_task")
+        logging.info(f"[crop_gif_task] Output GIF size: {os.path.getsize(output_path)} bytes")
         rel = os.path.relpath(output_path, upload_folder)
         # Optionally upload to GCS
-        try:
-            bucket_name = os.environ.get("GCS_UPLOAD_BUCKET") or os.environ.get("GCS_BUCKET_NAME")
-            if bucket_name:
-                object_name = rel.replace("\\", "/")
-                try:
-                    upload_file_to_gcs(output_path, bucket_name, object_name)
-                    try:
-                        os.remove(output_path)
-                    except Exception as de:
-                        logging.warning(f"[crop_gif_task] cleanup failed: {de}")
-                    rel = object_name
-                except Exception as ue:
-                    logging.error(f"[crop_gif_task] Failed to upload to GCS: {ue}")
-        except Exception as be:
-            logging.warning(f"[crop_gif_task] Bucket upload skipped: {be}")
+        _progress.update(95, "Uploading", force=True)
+        with _stages.stage("upload"):
+            rel, upload_stats = _upload_output(output_path, rel, "crop_gif_task")
         try:
             peak_kb = getattr(resource.getrusage(resource.RUSAGE_SELF),'ru_maxrss',0)
             jm = JobMetric(tool='crop', task_id=self.request.id if getattr(self,'request',None) else None,
                            status='SUCCESS', input_type='gif', output_size_bytes=os.path.getsize(output_path) if os.path.exists(output_path) else None,
-                           processing_time_ms=int((time.time()-_task_start)*1000), options=f"crop={x},{y},{width},{height}; ar={aspect_ratio}; peak_kb={peak_kb}")
-            flask_app = get_flask_app()
-            if flask_app:
-                with flask_app.app_context(): db.session.add(jm); db.session.commit()
-            else:
-                db.session.add(jm); db.session.commit()
+                           processing_time_ms=int((time.time()-_task_start)*1000), options=f"crop={x},{y},{width},{height}; ar={aspect_ratio}; peak_kb={peak_kb}{_transfer_opts(upload_stats)}")
+            _save_job_metric(jm, _stages)
         except Exception:
             pass
         return rel
@@ -808,11 +934,7 @@ def crop_gif_task(self, gif_path, x, y, width, height, aspect_ratio, output_dir,
         try:
             jm = JobMetric(tool='crop', task_id=self.request.id if getattr(self,'request',None) else None,
                            status='FAILURE', error_message=str(e), processing_time_ms=int((time.time()-_task_start)*1000))
-            flask_app = get_flask_app()
-            if flask_app:
-                with flask_app.app_context(): db.session.add(jm); db.session.commit()
-            else:
-                db.session.add(jm); db.session.commit()
+            _save_job_metric(jm, _stages)
         except Exception:
             pass
         raise
@@ -827,9 +949,12 @@ def crop_gif_task(self, gif_path, x, y, width, height, aspect_ratio, output_dir,
 @celery_app.task(bind=True)
 def optimize_gif_task(self, gif_path, quality, colors, lossy, dither, optimize_level, output_dir, upload_folder):
     _task_start = time.time()
+    _stages = StageTimer()
+    _progress = ProgressReporter(self)
     try:
         os.makedirs(output_dir, exist_ok=True)
-        gif_path = _ensure_local_path(gif_path, output_dir, upload_folder)
+        with _stages.stage("download"):
+            gif_path = _ensure_local_path(gif_path, output_dir, upload_folder)
 
         logging.info(f"[optimize_gif_task] gif_path={gif_path}, quality={quality}, colors={colors}, lossy={lossy}, dither={dither}, optimize_level={optimize_level}, output_dir={output_dir}, upload_folder={upload_folder}")
         if not os.path.exists(gif_path):
@@ -843,103 +968,29 @@ def optimize_gif_task(self, gif_path, quality, colors, lossy, dither, optimize_l
         output_path = os.path.join(output_dir, f"optimized_{uuid.uuid4().hex}.gif")
         
         # Quality-based optimization settings
-        if quality >= 95:
-            # Very high quality: minimal compression but still optimize
-            optimized_colors = min(colors, 200)
-            optimized_lossy = 0
-            optimized_level = 2
-        elif quality >= 80:
-            # High quality: light compression
-            optimized_colors = min(colors, 128)
-            optimized_lossy = max(0, lossy // 3)
-            optimized_level = 2
-        elif quality >= 60:
-            # Medium quality: moderate compression
-            optimized_colors = min(colors, 64)
-            optimized_lossy = lossy
-            optimized_level = 3
-        else:
-            # Low quality: aggressive compression
-            optimized_colors = min(colors, 32)
-            optimized_lossy = min(100, lossy * 2)
-            optimized_level = 3
-        
+        optimized_colors, optimized_lossy, optimized_level = _optimize_settings(quality, colors, lossy)
+
         logging.info(f"[optimize_gif_task] Quality-based settings: colors={optimized_colors}, lossy={optimized_lossy}, level={optimized_level}")
         
         try:
-            # Enhanced gifsicle optimization
-            cmd = ["gifsicle", f"--optimize={optimized_level}", f"--colors={optimized_colors}"]
-            
-            # Add lossy compression if specified
-            if optimized_lossy > 0:
-                cmd.extend([f"--lossy={optimized_lossy}"])
-            
-            # Add dithering for better color quality
-            if dither and dither != "none":
-                cmd.extend([f"--dither={dither}"])
-            
-            # Add additional optimizations for better compression
-            cmd.extend(["--no-extensions", "--no-comments", "--no-names"])
-            
-            # Add frame optimization for better compression
-            cmd.extend(["--optimize-frames"])
-            
-            # Add interlace optimization
-            cmd.extend(["--interlace"])
-            
-            cmd.extend([gif_path, "-o", output_path])
-            
-            logging.info(f"[optimize_gif_task] Running gifsicle command: {' '.join(cmd)}")
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            
-            if result.returncode != 0:
-                logging.warning(f"Gifsicle optimization failed: {result.stderr}. Falling back to PIL.")
-                raise subprocess.CalledProcessError(result.returncode, cmd)
-                
+            with _stages.stage("encode"):
+                _run_gifsicle(gif_path, output_path, optimized_level, optimized_colors, optimized_lossy, dither)
         except (subprocess.CalledProcessError, FileNotFoundError):
             # Fallback to PIL optimization
             logging.info("[optimize_gif_task] Using PIL fallback optimization")
-            gif = Image.open(gif_path)
-            
-            # Check if it's an animated GIF
-            try:
-                # Get all frames
-                frames = []
-                durations = []
-                
-                while True:
-                    frames.append(gif.copy())
-                    durations.append(gif.info.get('duration', 100))
-                    gif.seek(gif.tell() + 1)
-            except EOFError:
-                pass
-            
-            logging.info(f"[optimize_gif_task] Found {len(frames)} frames in animated GIF")
-            
-            # Apply quality-based PIL optimization to each frame
-            optimized_frames = []
-            for frame in frames:
-                if optimized_colors < 256:
-                    # Convert to palette mode for color reduction
-                    optimized_frame = frame.quantize(colors=optimized_colors, dither=Image.Dither.FLOYDSTEINBERG if dither == "floyd-steinberg" else Image.Dither.NONE)
-                else:
-                    optimized_frame = frame
-                optimized_frames.append(optimized_frame)
-            
-            # Save as animated GIF with all frames
-            if optimized_frames:
-                optimized_frames[0].save(
-                    output_path,
-                    save_all=True,
-                    append_images=optimized_frames[1:],
-                    optimize=True,
-                    duration=durations,
-                    loop=0
-                )
+            # Apply quality-based PIL optimization to each frame while streaming
+            ops = []
+            if optimized_colors < 256:
+                ops.append(quantize_op(optimized_colors, Image.Dither.FLOYDSTEINBERG if dither == "floyd-steinberg" else Image.Dither.NONE))
+            with Image.open(gif_path) as gif:
+                frames = _stages.iterate("decode", iter_frames(gif))
+                frames = _stages.iterate("transform", apply_ops(frames, ops))
+                frames = _progress.iterate(frames, _frame_total(gif, None), 5, 90, "Optimizing frames")
+                with _stages.stage("encode"):
+                    n_written = write_gif(frames, output_path, loop=0, delta=True)
+            logging.info(f"[optimize_gif_task] Re-encoded {n_written} frames with PIL")
         
-        if not os.path.exists(output_path) or os.path.getsize(output_path) < 1024:
-            logging.error(f"[optimize_gif_task] Output GIF missing or too small: {output_path}")
-            raise Exception("Output GIF missing or too small.")
+        _check_output_gif(output_path, "optimize_gif_task")
         
         # Calculate compression ratio
         original_size = os.path.getsize(gif_path)
@@ -952,31 +1003,15 @@ def optimize_gif_task(self, gif_path, quality, colors, lossy, dither, optimize_l
         
         rel = os.path.relpath(output_path, upload_folder)
         # Optionally upload to GCS
-        try:
-            bucket_name = os.environ.get("GCS_UPLOAD_BUCKET") or os.environ.get("GCS_BUCKET_NAME")
-            if bucket_name:
-                object_name = rel.replace("\\", "/")
-                try:
-                    upload_file_to_gcs(output_path, bucket_name, object_name)
-                    try:
-                        os.remove(output_path)
-                    except Exception as de:
-                        logging.warning(f"[optimize_gif_task] cleanup failed: {de}")
-                    rel = object_name
-                except Exception as ue:
-                    logging.error(f"[optimize_gif_task] Failed to upload to GCS: {ue}")
-        except Exception as be:
-            logging.warning(f"[optimize_gif_task] Bucket upload skipped: {be}")
+        _progress.update(95, "Uploading", force=True)
+        with _stages.stage("upload"):
+            rel, upload_stats = _upload_output(output_path, rel, "optimize_gif_task")
         try:
             peak_kb = getattr(resource.getrusage(resource.RUSAGE_SELF),'ru_maxrss',0)
             jm = JobMetric(tool='optimize', task_id=self.request.id if getattr(self,'request',None) else None,
                            status='SUCCESS', input_type='gif', output_size_bytes=os.path.getsize(output_path) if os.path.exists(output_path) else None,
-                           processing_time_ms=int((time.time()-_task_start)*1000), options=f"quality={quality}; colors={colors}; lossy={lossy}; dither={dither}; level={optimize_level}; peak_kb={peak_kb}")
-            flask_app = get_flask_app()
-            if flask_app:
-                with flask_app.app_context(): db.session.add(jm); db.session.commit()
-            else:
-                db.session.add(jm); db.session.commit()
+                           processing_time_ms=int((time.time()-_task_start)*1000), options=f"quality={quality}; colors={colors}; lossy={lossy}; dither={dither}; level={optimize_level}; peak_kb={peak_kb}{_transfer_opts(upload_stats)}")
+            _save_job_metric(jm, _stages)
         except Exception:
             pass
         return rel
@@ -985,11 +1020,7 @@ def optimize_gif_task(self, gif_path, quality, colors, lossy, dither, optimize_l
         try:
             jm = JobMetric(tool='optimize', task_id=self.request.id if getattr(self,'request',None) else None,
                            status='FAILURE', error_message=str(e), processing_time_ms=int((time.time()-_task_start)*1000))
-            flask_app = get_flask_app()
-            if flask_app:
-                with flask_app.app_context(): db.session.add(jm); db.session.commit()
-            else:
-                db.session.add(jm); db.session.commit()
+            _save_job_metric(jm, _stages)
         except Exception:
             pass
         raise
@@ -1004,11 +1035,14 @@ def optimize_gif_task(self, gif_path, quality, colors, lossy, dither, optimize_l
 @celery_app.task(bind=True)
 def reverse_gif_task(self, gif_path, output_dir, upload_folder):
     _task_start = time.time()
+    _stages = StageTimer()
+    _progress = ProgressReporter(self)
     try:
         os.makedirs(output_dir, exist_ok=True)
         logging.info(f"[reverse_gif_task] gif_path={gif_path}, output_dir={output_dir}, upload_folder={upload_folder}")
 
-        gif_path = _ensure_local_path(gif_path, output_dir, upload_folder)
+        with _stages.stage("download"):
+            gif_path = _ensure_local_path(gif_path, output_dir, upload_folder)
 
         if not os.path.exists(gif_path):
             logging.error(f"[reverse_gif_task] File does not exist: {gif_path}")
@@ -1020,74 +1054,43 @@ def reverse_gif_task(self, gif_path, output_dir, upload_folder):
         # Simple check - if it exists and we can open it as GIF, it should be valid
         
         
-        gif = Image.open(gif_path)
-        frames = []
-        durations = []
-        
-        try:
-            for frame in range(getattr(gif, 'n_frames', 1)):
-                gif.seek(frame)
-                frames.append(gif.copy())
-                durations.append(gif.info.get('duration', 100))
-        except EOFError:
-            pass
-            
-        if not frames:
-            raise ValueError("No frames found in GIF")
-            
-        logging.info(f"[reverse_gif_task] Found {len(frames)} frames to reverse")
-        
-        # Reverse the frames and durations
-        frames.reverse()
-        durations.reverse()
-        
         output_path = os.path.join(output_dir, f"reversed_{uuid.uuid4().hex}.gif")
-        
-        frames[0].save(
-            output_path,
-            save_all=True,
-            append_images=frames[1:],
-            duration=durations,
-            loop=gif.info.get('loop', 0)
-        )
-        if not os.path.exists(output_path) or os.path.getsize(output_path) < 1024:
-            logging.error(f"[reverse_gif_task] Output GIF missing or too small: {output_path}")
-            raise Exception("Output GIF missing or too small.")
+        with Image.open(gif_path) as gif:
+            try:
+                with _stages.stage("decode"):
+                    plan = _decimation_plan(gif, "reverse_gif_task")
+                    index = index_gif(gif_path)
+                loop = gif.info.get('loop', 0)
+                # Frames that each show a full picture are copied backwards as compressed blocks.
+                with _stages.stage("encode"):
+                    n_written = write_reversed_blocks(gif_path, index, output_path, loop, plan) if index else None
+                if n_written is None:
+                    frames = _stages.iterate("decode", iter_frames(gif, plan, index, keep_palette=True))
+                    frames = _progress.iterate(frames, _frame_total(gif, plan), 5, 80, "Reading frames")
+                    with _stages.stage("encode"):
+                        n_written = write_gif_reversed(frames, output_path, loop=loop, delta=True)
+                else:
+                    logging.info("[reverse_gif_task] Copied frame blocks without decoding")
+            except ValueError:
+                raise ValueError("No frames found in GIF")
+        logging.info(f"[reverse_gif_task] Reversed {n_written} frames")
+        _check_output_gif(output_path, "reverse_gif_task")
             
         logging.info(f"[reverse_gif_task] Successfully created reversed GIF: {output_path} (size: {os.path.getsize(output_path)} bytes)")
         
         rel = os.path.relpath(output_path, upload_folder)
         # Optionally upload to GCS
-        try:
-            bucket_name = os.environ.get("GCS_UPLOAD_BUCKET") or os.environ.get("GCS_BUCKET_NAME")
-            if bucket_name:
-                object_name = rel.replace("\\", "/")
-                try:
-                    upload_file_to_gcs(output_path, bucket_name, object_name)
-                    try:
-                        os.remove(output_path)
-                    except Exception as de:
-                        logging.warning(f"[reverse_gif_task] cleanup failed: {de}")
-                    rel = object_name
-                except Exception as ue:
-                    logging.error(f"[reverse_gif_task] Failed to upload to GCS: {ue}")
-        except Exception as be:
-            logging.warning(f"[reverse_gif_task] Bucket upload skipped: {be}")
+        _progress.update(95, "Uploading", force=True)
+        with _stages.stage("upload"):
+            rel, upload_stats = _upload_output(output_path, rel, "reverse_gif_task")
         try:
             peak_kb = getattr(resource.getrusage(resource.RUSAGE_SELF), 'ru_maxrss', 0)
             jm = JobMetric(tool='reverse', task_id=self.request.id if getattr(self, 'request', None) else None,
                            status='SUCCESS', input_type='gif',
                            output_size_bytes=os.path.getsize(output_path) if os.path.exists(output_path) else None,
                            processing_time_ms=int((time.time()-_task_start)*1000),
-                           options=f"peak_kb={peak_kb}")
-            flask_app = get_flask_app()
-            if flask_app:
-                with flask_app.app_context():
-                    db.session.add(jm)
-                    db.session.commit()
-            else:
-                db.session.add(jm)
-                db.session.commit()
+                           options=f"peak_kb={peak_kb}{_transfer_opts(upload_stats)}")
+            _save_job_metric(jm, _stages)
         except Exception:
             pass
         return rel
@@ -1097,14 +1100,7 @@ def reverse_gif_task(self, gif_path, output_dir, upload_folder):
             jm = JobMetric(tool='reverse', task_id=self.request.id if getattr(self, 'request', None) else None,
                            status='FAILURE', error_message=str(e),
                            processing_time_ms=int((time.time()-_task_start)*1000))
-            flask_app = get_flask_app()
-            if flask_app:
-                with flask_app.app_context():
-                    db.session.add(jm)
-                    db.session.commit()
-            else:
-                db.session.add(jm)
-                db.session.commit()
+            _save_job_metric(jm, _stages)
         except Exception:
             pass
         raise
@@ -1117,14 +1113,11 @@ def reverse_gif_task(self, gif_path, output_dir, upload_folder):
 @celery_app.task(bind=True)
 def add_text_to_gif_task(self, gif_path, text, font_size, color, font_family, stroke_color, stroke_width, horizontal_align, vertical_align, offset_x, offset_y, start_frame, end_frame, animation_style, output_dir, upload_folder):
     _task_start = time.time()
+    _stages = StageTimer()
+    _progress = ProgressReporter(self)
     os.makedirs(output_dir, exist_ok=True)
-    abs_gif_path = _ensure_local_path(gif_path, output_dir, upload_folder)
-
-    # Utility to convert hex color to RGB tuple
-    def hex_to_rgb(value):
-        value = value.lstrip('#')
-        lv = len(value)
-        return tuple(int(value[i:i + lv // 3], 16) for i in range(0, lv, lv // 3))
+    with _stages.stage("download"):
+        abs_gif_path = _ensure_local_path(gif_path, output_dir, upload_folder)
 
     # Convert color and stroke_color to RGB tuples if needed
     orig_color = color
@@ -1149,213 +1142,47 @@ def add_text_to_gif_task(self, gif_path, text, font_size, color, font_family, st
             logging.error(f"[add_text_to_gif_task] Input GIF does not exist: {abs_gif_path}")
             raise FileNotFoundError(f"Input GIF does not exist: {abs_gif_path}")
         logging.info(f"[add_text_to_gif_task] Input GIF size: {os.path.getsize(abs_gif_path)} bytes")
-        _basedir = os.path.abspath(os.path.dirname(__file__)) # This will be src/
-        font_paths = {
-            "Arial": [os.path.join(_basedir, "fonts/DejaVuSans.ttf")],
-            "Helvetica": [os.path.join(_basedir, "fonts/DejaVuSans.ttf")],
-            "Times New Roman": [os.path.join(_basedir, "fonts/DejaVuSerif.ttf")],
-            "Courier New": [os.path.join(_basedir, "fonts/DejaVuSansMono.ttf")],
-            "Verdana": [os.path.join(_basedir, "fonts/DejaVuSans.ttf")],
-            "Georgia": [os.path.join(_basedir, "fonts/DejaVuSerif.ttf")],
-            "Comic Sans MS": [os.path.join(_basedir, "fonts/ComicNeue-Regular.ttf")],
-            "Impact": [os.path.join(_basedir, "fonts/impact.ttf")]
-        }
-        font = None
-        font_loaded = False
-        # Try to load custom fonts with better error handling
-        if font_family in font_paths:
-            for font_path in font_paths[font_family]:
-                try:
-                    # Check if file exists first
-                    if os.path.exists(font_path):
-                        font = ImageFont.truetype(font_path, font_size)
-                        font_loaded = True
-                        logging.info(f"[add_text_to_gif_task] Loaded font: {font_path}")
-                        break
-                    else:
-                        logging.warning(f"[add_text_to_gif_task] Font file not found: {font_path}")
-                except (IOError, ImportError, OSError) as fe:
-                    logging.warning(f"[add_text_to_gif_task] Could not load font {font_path}: {fe}")
-        # Try fallback font
-        if font is None:
-            try:
-                fallback_font_path = os.path.join(_basedir, "fonts/DejaVuSans.ttf")
-                if os.path.exists(fallback_font_path):
-                    font = ImageFont.truetype(fallback_font_path, font_size)
-                    font_loaded = True
-                    logging.info(f"[add_text_to_gif_task] Loaded fallback font: {fallback_font_path}")
-                else:
-                    logging.warning(f"[add_text_to_gif_task] Fallback font not found: {fallback_font_path}")
-            except (IOError, ImportError, OSError) as fe:
-                logging.warning(f"[add_text_to_gif_task] Could not load fallback font: {fe}")
-        # Use default font as last resort
-        if font is None:
-            try:
-                font = ImageFont.load_default()
-                font_loaded = True
-                logging.info(f"[add_text_to_gif_task] Using default font")
-            except Exception as fe:
-                logging.error(f"[add_text_to_gif_task] Could not load any font: {fe}")
-                raise Exception("No fonts available for text rendering")
-        frames = []
-        frame_count = 0
         # Downscale factor for large frames
         base_w, base_h = gif.size
         scale = _compute_scale_factor(base_w, base_h, MAX_GIF_PIXELS)
         if scale < 1.0:
             logging.info(f"[add_text_to_gif_task] Downscaling frames by factor {scale:.2f} due to size {base_w}x{base_h}")
         
-        # Function to calculate text position based on alignment and offset
-        def calculate_text_position(img_width, img_height, text_width, text_height, horizontal_align, vertical_align, offset_x, offset_y):
-            # Calculate base position based on alignment
-            if horizontal_align == 'left':
-                base_x = 0
-            elif horizontal_align == 'center':
-                base_x = (img_width - text_width) // 2
-            elif horizontal_align == 'right':
-                base_x = img_width - text_width
-            else:
-                base_x = (img_width - text_width) // 2
-            
-            if vertical_align == 'top':
-                base_y = 0
-            elif vertical_align == 'middle':
-                base_y = (img_height - text_height) // 2
-            elif vertical_align == 'bottom':
-                base_y = img_height - text_height
-            else:
-                base_y = (img_height - text_height) // 2
-            
-            # Apply offsets
-            final_x = base_x + offset_x
-            final_y = base_y + offset_y
-            
-            return final_x, final_y
-
-        def wrap_text(draw, text, font, max_width):
-            if not text:
-                return []
-            lines = []
-            paragraphs = text.split('\n')
-            for para in paragraphs:
-                words = para.split()
-                line = ''
-                for word in words:
-                    test = f"{line} {word}".strip()
-                    w = draw.textlength(test, font=font)
-                    if w <= max_width or not line:
-                        line = test
-                    else:
-                        lines.append(line)
-                        line = word
-                if line:
-                    lines.append(line)
-            return lines
-
-        def draw_text_block(draw, lines, top_left, font, fill, stroke_color=None, stroke_width=0, line_height=None):
-            if not lines:
-                return
-            if line_height is None:
-                ascent, descent = font.getmetrics()
-                line_height = ascent + descent + 2
-            x, y = top_left
-            for i, line in enumerate(lines):
-                ly = y + i * line_height
-                if stroke_width and stroke_width > 0 and stroke_color is not None:
-                    # draw stroke by offsetting around
-                    for dx in range(-stroke_width, stroke_width + 1):
-                        for dy in range(-stroke_width, stroke_width + 1):
-                            if dx != 0 or dy != 0:
-                                draw.text((x + dx, ly + dy), line, font=font, fill=stroke_color)
-                draw.text((x, ly), line, font=font, fill=fill)
-
-        def apply_animation(draw, lines, position, font, color, stroke_color, stroke_width, animation_style, frame_index, start_frame, end_frame, line_height):
-            progress = max(0.0, min(1.0, (frame_index - start_frame) / max(1, (end_frame - start_frame))))
-            if animation_style == 'fade':
-                alpha = int(255 * progress)
-                rgba = (*color, alpha) if isinstance(color, tuple) and len(color) == 3 else color
-                draw_text_block(draw, lines, position, font, rgba, stroke_color, stroke_width, line_height)
-            elif animation_style == 'slide_up':
-                y_offset = int(50 * (1 - progress))
-                draw_text_block(draw, lines, (position[0], position[1] + y_offset), font, color, stroke_color, stroke_width, line_height)
-            else:
-                draw_text_block(draw, lines, position, font, color, stroke_color, stroke_width, line_height)
-
         # Check if image is animated (GIF) or static (PNG, JPEG, etc.)
         is_animated = getattr(gif, "is_animated", False)
+        # Decimate long GIFs, always keeping the frame the text appears on
+        with _stages.stage("decode"):
+            plan = _decimation_plan(gif, "add_text_to_gif_task", required=[start_frame])
+            index = index_gif(abs_gif_path)
+
+        # A single text layer; rendered once as a sprite and composited onto each frame
+        layer = {
+            'text': text,
+            'font_size': font_size,
+            'font_family': font_family,
+            'color': color,
+            'stroke_color': stroke_color,
+            'stroke_width': stroke_width,
+            'horizontal_align': horizontal_align,
+            'vertical_align': vertical_align,
+            'offset_x': offset_x,
+            'offset_y': offset_y,
+            'start_frame': start_frame,
+            'end_frame': end_frame,
+            'animation_style': animation_style,
+            'line_height': 1.0,
+            'auto_fit': False,
+        }
+        layers = normalize_layers([layer])
+        draw_text_op = text_layers_op(layers, is_animated)
 
-        if is_animated:
-            # Sample frames if too many
-            total_frames = gif.n_frames
-            step = max(1, int((total_frames + MAX_GIF_FRAMES - 1) // MAX_GIF_FRAMES))
-            for frame in range(0, total_frames, step):
-                gif.seek(frame)
-                frame_copy = gif.copy().convert("RGBA")
-                if scale < 1.0:
-                    new_size = (max(1, int(frame_copy.width * scale)), max(1, int(frame_copy.height * scale)))
-                    frame_copy = frame_copy.resize(new_size, Image.Resampling.LANCZOS)
-                draw = ImageDraw.Draw(frame_copy)
-
-                if start_frame <= frame <= end_frame:
-                    # Wrap text to frame width with small padding
-                    max_text_width = int(frame_copy.width * 0.95)
-                    lines = wrap_text(draw, text, font, max_text_width)
-                    # Compute text block size
-                    ascent, descent = font.getmetrics()
-                    line_height = ascent + descent + 2
-                    text_width = max((draw.textlength(line, font=font) for line in lines), default=0)
-                    text_height = line_height * max(len(lines), 1)
-
-                    # Calculate position based on alignment and offset for the whole block
-                    final_x, final_y = calculate_text_position(
-                        frame_copy.width, frame_copy.height, text_width, text_height,
-                        horizontal_align, vertical_align, offset_x, offset_y
-                    )
-
-                    apply_animation(
-                        draw, lines, (final_x, final_y), font, color, stroke_color,
-                        stroke_width, animation_style, frame, start_frame, end_frame, line_height
-                    )
-
-                frames.append(frame_copy.convert("RGB"))
-                frame_count += 1
-            logging.info(f"[add_text_to_gif_task] Processed {frame_count} frames (animated GIF).")
-        else:
-            # Static image (PNG, JPEG, etc.)
-            frame_copy = gif.convert("RGBA")
-            if scale < 1.0:
-                new_size = (max(1, int(frame_copy.width * scale)), max(1, int(frame_copy.height * scale)))
-                frame_copy = frame_copy.resize(new_size, Image.Resampling.LANCZOS)
-            draw = ImageDraw.Draw(frame_copy)
-
-            # Wrap text to image width with small padding
-            max_text_width = int(frame_copy.width * 0.95)
-            lines = wrap_text(draw, text, font, max_text_width)
-            ascent, descent = font.getmetrics()
-            line_height = ascent + descent + 2
-            text_width = max((draw.textlength(line, font=font) for line in lines), default=0)
-            text_height = line_height * max(len(lines), 1)
-
-            # Calculate position based on alignment and offset for the whole block
-            final_x, final_y = calculate_text_position(
-                frame_copy.width, frame_copy.height, text_width, text_height,
-                horizontal_align, vertical_align, offset_x, offset_y
-            )
-
-            # Draw multi-line block with optional stroke
-            draw_text_block(draw, lines, (final_x, final_y), font, color, stroke_color, stroke_width, line_height)
-            frames.append(frame_copy.convert("RGB"))
-            frame_count = 1
-            logging.info(f"[add_text_to_gif_task] Processed 1 frame (static image).")
-        
         output_path = os.path.join(output_dir, f"text_{uuid.uuid4().hex}.gif")
-        frames[0].save(
-            output_path,
-            save_all=True,
-            append_images=frames[1:] if len(frames) > 1 else [],
-            duration=gif.info.get("duration", 100),
-            loop=gif.info.get("loop", 0)
-        )
+        frames = _stages.iterate("decode", _text_frames(gif, abs_gif_path, index, plan, scale, layers))
+        frames = _stages.iterate("transform", apply_ops(frames, [scale_op(scale), draw_text_op]))
+        frames = _progress.iterate(frames, _frame_total(gif, plan), 5, 90, "Drawing text")
+        with _stages.stage("encode"):
+            frame_count = write_gif(frames, output_path, loop=gif.info.get("loop", 0), delta=True)
+        logging.info(f"[add_text_to_gif_task] Processed {frame_count} frames (animated={is_animated}).")
         
         if os.path.exists(output_path):
             logging.info(f"[add_text_to_gif_task] Output GIF created: {output_path}, size: {os.path.getsize(output_path)} bytes")
@@ -1364,21 +1191,9 @@ def add_text_to_gif_task(self, gif_path, text, font_size, color, font_family, st
             raise Exception("Output GIF was not created.")
         rel = os.path.relpath(output_path, upload_folder)
         # Optionally upload to GCS
-        try:
-            bucket_name = os.environ.get("GCS_UPLOAD_BUCKET") or os.environ.get("GCS_BUCKET_NAME")
-            if bucket_name:
-                object_name = rel.replace("\\", "/")
-                try:
-                    upload_file_to_gcs(output_path, bucket_name, object_name)
-                    try:
-                        os.remove(output_path)
-                    except Exception as de:
-                        logging.warning(f"[add_text_to_gif_task] cleanup failed: {de}")
-                    rel = object_name
-                except Exception as ue:
-                    logging.error(f"[add_text_to_gif_task] Failed to upload to GCS: {ue}")
-        except Exception as be:
-            logging.warning(f"[add_text_to_gif_task] Bucket upload skipped: {be}")
+        _progress.update(95, "Uploading", force=True)
+        with _stages.stage("upload"):
+            rel, upload_stats = _upload_output(output_path, rel, "add_text_to_gif_task")
         # Record metrics (best-effort)
         try:
             out_size = os.path.getsize(output_path)
@@ -1395,16 +1210,9 @@ def add_text_to_gif_task(self, gif_path, text, font_size, color, font_family, st
                 input_size_bytes=os.path.getsize(abs_gif_path) if os.path.exists(abs_gif_path) else None,
                 output_size_bytes=out_size,
                 processing_time_ms=proc_ms,
-                options=f"anim={animation_style}; stroke={stroke_width}; font={font_family}; peak_kb={peak_kb}"
+                options=f"anim={animation_style}; stroke={stroke_width}; font={font_family}; peak_kb={peak_kb}{_transfer_opts(upload_stats)}"
             )
-            flask_app = get_flask_app()
-            if flask_app:
-                with flask_app.app_context():
-                    db.session.add(jm)
-                    db.session.commit()
-            else:
-                db.session.add(jm)
-                db.session.commit()
+            _save_job_metric(jm, _stages)
         except Exception as _me:
             logging.warning(f"[metrics] add-text save failed: {_me}")
         return rel
@@ -1418,14 +1226,7 @@ def add_text_to_gif_task(self, gif_path, text, font_size, color, font_family, st
                 error_message=str(e),
                 processing_time_ms=int((time.time() - _task_start) * 1000)
             )
-            flask_app = get_flask_app()
-            if flask_app:
-                with flask_app.app_context():
-                    db.session.add(jm)
-                    db.session.commit()
-            else:
-                db.session.add(jm)
-                db.session.commit()
+            _save_job_metric(jm, _stages)
         except Exception:
             pass
         raise
@@ -1440,239 +1241,32 @@ def add_text_to_gif_task(self, gif_path, text, font_size, color, font_family, st
 @celery_app.task(bind=True)
 def add_text_layers_to_gif_task(self, gif_path, layers, output_dir, upload_folder):
     _task_start = time.time()
+    _stages = StageTimer()
+    _progress = ProgressReporter(self)
     os.makedirs(output_dir, exist_ok=True)
-    abs_gif_path = _ensure_local_path(gif_path, output_dir, upload_folder)
-
-    def hex_to_rgb(value):
-        value = value.lstrip('#')
-        lv = len(value)
-        return tuple(int(value[i:i + lv // 3], 16) for i in range(0, lv, lv // 3))
-
-    def load_font(font_family, font_size):
-        _basedir = os.path.abspath(os.path.dirname(__file__))
-        font_paths = {
-            "Arial": [os.path.join(_basedir, "fonts/DejaVuSans.ttf")],
-            "Helvetica": [os.path.join(_basedir, "fonts/DejaVuSans.ttf")],
-            "Times New Roman": [os.path.join(_basedir, "fonts/DejaVuSerif.ttf")],
-            "Courier New": [os.path.join(_basedir, "fonts/DejaVuSansMono.ttf")],
-            "Verdana": [os.path.join(_basedir, "fonts/DejaVuSans.ttf")],
-            "Georgia": [os.path.join(_basedir, "fonts/DejaVuSerif.ttf")],
-            "Comic Sans MS": [os.path.join(_basedir, "fonts/ComicNeue-Regular.ttf")],
-            "Impact": [os.path.join(_basedir, "fonts/impact.ttf")]
-        }
-        font = None
-        # Try named fonts first
-        if font_family in font_paths:
-            for p in font_paths[font_family]:
-                try:
-                    if os.path.exists(p):
-                        font = ImageFont.truetype(p, font_size)
-                        break
-                except Exception:
-                    continue
-        if font is None:
-            # Fallback
-            try:
-                fallback = os.path.join(_basedir, "fonts/DejaVuSans.ttf")
-                if os.path.exists(fallback):
-                    font = ImageFont.truetype(fallback, font_size)
-            except Exception:
-                pass
-        if font is None:
-            font = ImageFont.load_default()
-        return font
-
-    def wrap_text(draw, text, font, max_width):
-        if not text:
-            return []
-        lines = []
-        for para in text.split('\n'):
-            words = para.split()
-            line = ''
-            for w in words:
-                test = f"{line} {w}".strip()
-                if draw.textlength(test, font=font) <= max_width or not line:
-                    line = test
-                else:
-                    lines.append(line)
-                    line = w
-            if line:
-                lines.append(line)
-        return lines
-
-    def draw_text_block(draw, lines, top_left, font, fill, stroke_color=None, stroke_width=0, line_height=None):
-        if not lines:
-            return
-        if line_height is None:
-            ascent, descent = font.getmetrics()
-            line_height = ascent + descent + 2
-        x, y = top_left
-        for i, line in enumerate(lines):
-            ly = y + i * line_height
-            if stroke_width and stroke_width > 0 and stroke_color is not None:
-                for dx in range(-stroke_width, stroke_width + 1):
-                    for dy in range(-stroke_width, stroke_width + 1):
-                        if dx != 0 or dy != 0:
-                            draw.text((x + dx, ly + dy), line, font=font, fill=stroke_color)
-            draw.text((x, ly), line, font=font, fill=fill)
-
-    def calculate_position(img_w, img_h, block_w, block_h, h_align, v_align, offset_x, offset_y):
-        if h_align == 'left':
-            base_x = 0
-        elif h_align == 'center':
-            base_x = (img_w - block_w) // 2
-        elif h_align == 'right':
-            base_x = img_w - block_w
-        else:
-            base_x = (img_w - block_w) // 2
-        if v_align == 'top':
-            base_y = 0
-        elif v_align == 'middle':
-            base_y = (img_h - block_h) // 2
-        elif v_align == 'bottom':
-            base_y = img_h - block_h
-        else:
-            base_y = (img_h - block_h) // 2
-        return base_x + offset_x, base_y + offset_y
-
-    def apply_animation(draw, lines, position, font, color, stroke_color, stroke_width, animation_style, frame_index, start_frame, end_frame, line_height):
-        progress = max(0.0, min(1.0, (frame_index - start_frame) / max(1, (end_frame - start_frame))))
-        if animation_style == 'fade':
-            alpha = int(255 * progress)
-            rgba = (*color, alpha) if isinstance(color, tuple) and len(color) == 3 else color
-            draw_text_block(draw, lines, position, font, rgba, stroke_color, stroke_width, line_height)
-        elif animation_style == 'slide_up':
-            y_offset = int(50 * (1 - progress))
-            draw_text_block(draw, lines, (position[0], position[1] + y_offset), font, color, stroke_color, stroke_width, line_height)
-        else:
-            draw_text_block(draw, lines, position, font, color, stroke_color, stroke_width, line_height)
+    with _stages.stage("download"):
+        abs_gif_path = _ensure_local_path(gif_path, output_dir, upload_folder)
 
     try:
         gif = Image.open(abs_gif_path)
         is_animated = getattr(gif, 'is_animated', False)
-        frames = []
         # Downscale factor for large frames
         base_w, base_h = gif.size
         scale = _compute_scale_factor(base_w, base_h, MAX_GIF_PIXELS)
         if scale < 1.0:
             logging.info(f"[add_text_layers_to_gif_task] Downscaling frames by factor {scale:.2f} due to size {base_w}x{base_h}")
-        # Convert any hex colors to RGB
-        normalized_layers = []
-        for l in layers:
-            col = l.get('color', '#ffffff')
-            sc = l.get('stroke_color', '#000000')
-            if isinstance(col, str) and col.startswith('#'):
-                col = hex_to_rgb(col)
-            if isinstance(sc, str) and sc.startswith('#'):
-                sc = hex_to_rgb(sc)
-            normalized_layers.append({ **l, 'color': col, 'stroke_color': sc })
-
-        if is_animated:
-            total_frames = gif.n_frames
-            step = max(1, int((total_frames + MAX_GIF_FRAMES - 1) // MAX_GIF_FRAMES))
-            for frame_idx in range(0, total_frames, step):
-                gif.seek(frame_idx)
-                frame_img = gif.copy().convert('RGBA')
-                if scale < 1.0:
-                    new_size = (max(1, int(frame_img.width * scale)), max(1, int(frame_img.height * scale)))
-                    frame_img = frame_img.resize(new_size, Image.Resampling.LANCZOS)
-                draw = ImageDraw.Draw(frame_img)
-                for l in normalized_layers:
-                    if frame_idx < l['start_frame'] or frame_idx > l['end_frame']:
-                        continue
-                    # Font: try custom font via temporary path? If font_field is provided, it refers to a file saved by Flask in temp upload dir.
-                    font_size = int(l.get('font_size', 24))
-                    if l.get('font_path') and os.path.exists(l['font_path']):
-                        try:
-                            font = ImageFont.truetype(l['font_path'], font_size)
-                        except Exception:
-                            font = load_font(l.get('font_family', 'Arial'), font_size)
-                    else:
-                        font = load_font(l.get('font_family', 'Arial'), font_size)
-                    max_width = int(frame_img.width * float(l.get('max_width_ratio', 0.95)))
-                    lines = wrap_text(draw, l.get('text', ''), font, max_width)
-                    ascent, descent = font.getmetrics()
-                    base_line_h = ascent + descent + 2
-                    line_height = max(10, int(base_line_h * float(l.get('line_height', 1.2))))
-                    block_w = max((draw.textlength(line, font=font) for line in lines), default=0)
-                    block_h = max(1, len(lines)) * line_height
-                    # auto-fit: shrink font if too tall
-                    if l.get('auto_fit', True):
-                        guard = 0
-                        while block_h > frame_img.height * 0.95 and font_size > 8 and guard < 50:
-                            font_size = max(8, int(font_size * 0.9))
-                            if l.get('font_path') and os.path.exists(l['font_path']):
-                                try:
-                                    font = ImageFont.truetype(l['font_path'], font_size)
-                                except Exception:
-                                    font = load_font(l.get('font_family', 'Arial'), font_size)
-                            else:
-                                font = load_font(l.get('font_family', 'Arial'), font_size)
-                            ascent, descent = font.getmetrics()
-                            line_height = max(10, int((ascent + descent + 2) * float(l.get('line_height', 1.2))))
-                            lines = wrap_text(draw, l.get('text', ''), font, max_width)
-                            block_w = max((draw.textlength(line, font=font) for line in lines), default=0)
-                            block_h = max(1, len(lines)) * line_height
-                            guard += 1
-                    pos = calculate_position(frame_img.width, frame_img.height, block_w, block_h,
-                                              l.get('horizontal_align', 'center'), l.get('vertical_align', 'middle'),
-                                              int(l.get('offset_x', 0)), int(l.get('offset_y', 0)))
-                    apply_animation(draw, lines, pos, font, l['color'], l['stroke_color'], int(l.get('stroke_width', 0)),
-                                    l.get('animation_style', 'none'), frame_idx, int(l['start_frame']), int(l['end_frame']), line_height)
-                frames.append(frame_img.convert('RGB'))
-        else:
-            frame_img = gif.convert('RGBA')
-            if scale < 1.0:
-                new_size = (max(1, int(frame_img.width * scale)), max(1, int(frame_img.height * scale)))
-                frame_img = frame_img.resize(new_size, Image.Resampling.LANCZOS)
-            draw = ImageDraw.Draw(frame_img)
-            for l in normalized_layers:
-                font_size = int(l.get('font_size', 24))
-                if l.get('font_path') and os.path.exists(l['font_path']):
-                    try:
-                        font = ImageFont.truetype(l['font_path'], font_size)
-                    except Exception:
-                        font = load_font(l.get('font_family', 'Arial'), font_size)
-                else:
-                    font = load_font(l.get('font_family', 'Arial'), font_size)
-                max_width = int(frame_img.width * float(l.get('max_width_ratio', 0.95)))
-                lines = wrap_text(draw, l.get('text', ''), font, max_width)
-                ascent, descent = font.getmetrics()
-                base_line_h = ascent + descent + 2
-                line_height = max(10, int(base_line_h * float(l.get('line_height', 1.2))))
-                block_w = max((draw.textlength(line, font=font) for line in lines), default=0)
-                block_h = max(1, len(lines)) * line_height
-                if l.get('auto_fit', True):
-                    guard = 0
-                    while block_h > frame_img.height * 0.95 and font_size > 8 and guard < 50:
-                        font_size = max(8, int(font_size * 0.9))
-                        if l.get('font_path') and os.path.exists(l['font_path']):
-                            try:
-                                font = ImageFont.truetype(l['font_path'], font_size)
-                            except Exception:
-                                font = load_font(l.get('font_family', 'Arial'), font_size)
-                        else:
-                            font = load_font(l.get('font_family', 'Arial'), font_size)
-                        ascent, descent = font.getmetrics()
-                        line_height = max(10, int((ascent + descent + 2) * float(l.get('line_height', 1.2))))
-                        lines = wrap_text(draw, l.get('text', ''), font, max_width)
-                        block_w = max((draw.textlength(line, font=font) for line in lines), default=0)
-                        block_h = max(1, len(lines)) * line_height
-                        guard += 1
-                pos = calculate_position(frame_img.width, frame_img.height, block_w, block_h,
-                                          l.get('horizontal_align', 'center'), l.get('vertical_align', 'middle'),
-                                          int(l.get('offset_x', 0)), int(l.get('offset_y', 0)))
-                draw_text_block(draw, lines, pos, font, l['color'], l['stroke_color'], int(l.get('stroke_width', 0)), line_height)
-            frames.append(frame_img.convert('RGB'))
+        layers = normalize_layers(layers)
+        with _stages.stage("decode"):
+            plan = _decimation_plan(gif, "add_text_layers_to_gif_task", required=[int(l['start_frame']) for l in layers])
+            index = index_gif(abs_gif_path)
+        draw_layers_op = text_layers_op(layers, is_animated)
 
         output_path = os.path.join(output_dir, f"text_layers_{uuid.uuid4().hex}.gif")
-        frames[0].save(
-            output_path,
-            save_all=True,
-            append_images=frames[1:] if len(frames) > 1 else [],
-            duration=gif.info.get("duration", 100),
-            loop=gif.info.get("loop", 0)
-        )
+        frames = _stages.iterate("decode", _text_frames(gif, abs_gif_path, index, plan, scale, layers))
+        frames = _stages.iterate("transform", apply_ops(frames, [scale_op(scale), draw_layers_op]))
+        frames = _progress.iterate(frames, _frame_total(gif, plan), 5, 90, "Drawing text")
+        with _stages.stage("encode"):
+            write_gif(frames, output_path, loop=gif.info.get("loop", 0), delta=True)
 
         if os.path.exists(output_path):
             logging.info(f"[add_text_layers_to_gif_task] Output GIF created: {output_path}, size: {os.path.getsize(output_path)} bytes")
@@ -1681,21 +1275,9 @@ def add_text_layers_to_gif_task(self, gif_path, layers, output_dir, upload_folde
             raise Exception("Output GIF was not created.")
         rel = os.path.relpath(output_path, upload_folder)
         # Optionally upload to GCS
-        try:
-            bucket_name = os.environ.get("GCS_UPLOAD_BUCKET") or os.environ.get("GCS_BUCKET_NAME")
-            if bucket_name:
-                object_name = rel.replace("\\", "/")
-                try:
-                    upload_file_to_gcs(output_path, bucket_name, object_name)
-                    try:
-                        os.remove(output_path)
-                    except Exception as de:
-                        logging.warning(f"[add_text_layers_to_gif_task] cleanup failed: {de}")
-                    rel = object_name
-                except Exception as ue:
-                    logging.error(f"[add_text_layers_to_gif_task] Failed to upload to GCS: {ue}")
-        except Exception as be:
-            logging.warning(f"[add_text_layers_to_gif_task] Bucket upload skipped: {be}")
+        _progress.update(95, "Uploading", force=True)
+        with _stages.stage("upload"):
+            rel, upload_stats = _upload_output(output_path, rel, "add_text_layers_to_gif_task")
         # Record metrics (best-effort)
         try:
             out_size = os.path.getsize(output_path)
@@ -1712,16 +1294,9 @@ def add_text_layers_to_gif_task(self, gif_path, layers, output_dir, upload_folde
                 input_size_bytes=os.path.getsize(abs_gif_path) if os.path.exists(abs_gif_path) else None,
                 output_size_bytes=out_size,
                 processing_time_ms=proc_ms,
-                options=f"layers={len(layers)}; peak_kb={peak_kb}"
+                options=f"layers={len(layers)}; peak_kb={peak_kb}{_transfer_opts(upload_stats)}"
             )
-            flask_app = get_flask_app()
-            if flask_app:
-                with flask_app.app_context():
-                    db.session.add(jm)
-                    db.session.commit()
-            else:
-                db.session.add(jm)
-                db.session.commit()
+            _save_job_metric(jm, _stages)
         except Exception as _me:
             logging.warning(f"[metrics] add-text-layers save failed: {_me}")
         return rel
@@ -1735,14 +1310,163 @@ def add_text_layers_to_gif_task(self, gif_path, layers, output_dir, upload_folde
                 error_message=str(e),
                 processing_time_ms=int((time.time() - _task_start) * 1000)
             )
-            flask_app = get_flask_app()
-            if flask_app:
-                with flask_app.app_context():
-                    db.session.add(jm)
-                    db.session.commit()
+            _save_job_metric(jm, _stages)
+        except Exception:
+            pass
+        raise
+    finally:
+        try:
+            if os.path.exists(abs_gif_path):
+                os.remove(abs_gif_path)
+        except Exception as e:
+            logging.warning(f"Error deleting input GIF file {abs_gif_path}: {e}")
+
+@celery_app.task(bind=True)
+def edit_gif_task(self, gif_path, operations, output_dir, upload_folder):
+    """Apply an ordered list of crop/resize/text/optimize operations in a single decode/encode pass."""
+    _task_start = time.time()
+    _stages = StageTimer()
+    _progress = ProgressReporter(self)
+    os.makedirs(output_dir, exist_ok=True)
+    with _stages.stage("download"):
+        abs_gif_path = _ensure_local_path(gif_path, output_dir, upload_folder)
+
+    try:
+        logging.info(f"[edit_gif_task] gif_path={abs_gif_path}, operations={[op.get('type') for op in operations]}, output_dir={output_dir}")
+        if not os.path.exists(abs_gif_path):
+            logging.error(f"[edit_gif_task] File does not exist: {abs_gif_path}")
+            raise FileNotFoundError(f"Input GIF for edit does not exist: {abs_gif_path}")
+        gif = Image.open(abs_gif_path)
+        is_animated = getattr(gif, 'is_animated', False)
+        base_w, base_h = gif.size
+        cur_w, cur_h = base_w, base_h
+
+        # Build the frame op chain, tracking the frame size each op produces so
+        # later ops (crop bounds, text layout) see the same geometry as the
+        # standalone tasks would. Like add_text_to_gif_task, text is drawn on
+        # frames already capped to MAX_GIF_PIXELS; ``coord_scale`` maps the
+        # client's crop coordinates onto such downscaled frames.
+        ops = []
+        optimize = None
+        coord_scale = 1.0
+        for i, op in enumerate(operations):
+            op_type = op.get('type')
+            if optimize is not None:
+                raise ValueError("optimize must be the last operation")
+            if op_type == 'crop':
+                def _coord(name, default):
+                    value = op.get(name)
+                    return default if value is None else int(int(value) * coord_scale)
+                x, y, w, h = _crop_box(cur_w, cur_h, _coord('x', 0), _coord('y', 0),
+                                       max(1, _coord('width', cur_w)), max(1, _coord('height', cur_h)),
+                                       op.get('aspect_ratio', 'free'))
+                ops.append(crop_op((x, y, x + w, y + h)))
+                cur_w, cur_h = w, h
+            elif op_type == 'resize':
+                w, h = _resize_dimensions(cur_w, cur_h, int(op['width']), int(op['height']),
+                                          bool(op.get('maintain_aspect_ratio', False)))
+                ops.append(resize_op((w, h)))
+                cur_w, cur_h = w, h
+                coord_scale = 1.0
+            elif op_type == 'text':
+                scale = _compute_scale_factor(cur_w, cur_h, MAX_GIF_PIXELS)
+                if scale < 1.0:
+                    logging.info(f"[edit_gif_task] Downscaling frames by factor {scale:.2f} before text due to size {cur_w}x{cur_h}")
+                    ops.append(scale_op(scale))
+                    cur_w, cur_h = max(1, int(cur_w * scale)), max(1, int(cur_h * scale))
+                    coord_scale *= scale
+                ops.append(text_layers_op(normalize_layers(op.get('layers', [])), is_animated))
+            elif op_type == 'optimize':
+                optimize = op
             else:
-                db.session.add(jm)
-                db.session.commit()
+                raise ValueError(f"Unsupported operation at index {i}: {op_type}")
+
+        scale = _compute_scale_factor(cur_w, cur_h, MAX_GIF_PIXELS)
+        if scale < 1.0:
+            logging.info(f"[edit_gif_task] Downscaling frames by factor {scale:.2f} due to size {cur_w}x{cur_h}")
+            ops.append(scale_op(scale))
+        # Decimate long GIFs, keeping the frames text layers start on
+        text_starts = [int(l.get('start_frame', 0)) for op in operations if op.get('type') == 'text' for l in op.get('layers', [])]
+        with _stages.stage("decode"):
+            plan = _decimation_plan(gif, "edit_gif_task", required=text_starts)
+            index = index_gif(abs_gif_path)
+
+        def _frames():
+            frames = _stages.iterate("decode", iter_frames(gif, plan, index))
+            frames = _stages.iterate("transform", apply_ops(frames, ops))
+            return _progress.iterate(frames, _frame_total(gif, plan), 5, 90, "Editing frames")
+
+        output_path = os.path.join(output_dir, f"edited_{uuid.uuid4().hex}.gif")
+        if optimize is not None:
+            quality = int(optimize.get('quality', 80))
+            dither = optimize.get('dither', 'floyd-steinberg')
+            optimized_colors, optimized_lossy, optimized_level = _optimize_settings(
+                quality, int(optimize.get('colors', 256)), int(optimize.get('lossy', 0)))
+            logging.info(f"[edit_gif_task] Quality-based settings: colors={optimized_colors}, lossy={optimized_lossy}, level={optimized_level}")
+            # gifsicle works on encoded files, so it runs as a post-pass over the
+            # single encode; without it, quantize in-stream instead.
+            if shutil.which("gifsicle"):
+                staged_path = os.path.join(output_dir, f"edit_stage_{uuid.uuid4().hex}.gif")
+                with _stages.stage("encode"):
+                    n_written = write_gif(_frames(), staged_path, loop=gif.info.get("loop", 0), delta=True)
+                try:
+                    with _stages.stage("encode"):
+                        _run_gifsicle(staged_path, output_path, optimized_level, optimized_colors, optimized_lossy, dither)
+                except (subprocess.CalledProcessError, FileNotFoundError):
+                    logging.info("[edit_gif_task] gifsicle failed, keeping unoptimized output")
+                    shutil.move(staged_path, output_path)
+                finally:
+                    if os.path.exists(staged_path):
+                        os.remove(staged_path)
+            else:
+                if optimized_colors < 256:
+                    ops.append(quantize_op(optimized_colors, Image.Dither.FLOYDSTEINBERG if dither == "floyd-steinberg" else Image.Dither.NONE))
+                with _stages.stage("encode"):
+                    n_written = write_gif(_frames(), output_path, loop=gif.info.get("loop", 0), delta=True)
+        else:
+            with _stages.stage("encode"):
+                n_written = write_gif(_frames(), output_path, loop=gif.info.get("loop", 0), delta=True)
+
+        if not os.path.exists(output_path):
+            logging.error(f"[edit_gif_task] Output GIF was not created: {output_path}")
+            raise Exception("Output GIF was not created.")
+        logging.info(f"[edit_gif_task] Wrote {n_written} frames at {cur_w}x{cur_h}, size: {os.path.getsize(output_path)} bytes")
+        rel = os.path.relpath(output_path, upload_folder)
+        # Optionally upload to GCS
+        _progress.update(95, "Uploading", force=True)
+        with _stages.stage("upload"):
+            rel, upload_stats = _upload_output(output_path, rel, "edit_gif_task")
+        # Record metrics (best-effort)
+        try:
+            peak_kb = getattr(resource.getrusage(resource.RUSAGE_SELF), 'ru_maxrss', 0)
+            jm = JobMetric(
+                tool='edit',
+                task_id=self.request.id if getattr(self, 'request', None) else None,
+                status='SUCCESS',
+                input_type='gif',
+                input_width=base_w,
+                input_height=base_h,
+                input_frames=getattr(gif, 'n_frames', 1),
+                input_size_bytes=os.path.getsize(abs_gif_path) if os.path.exists(abs_gif_path) else None,
+                output_size_bytes=os.path.getsize(output_path) if os.path.exists(output_path) else None,
+                processing_time_ms=int((time.time() - _task_start) * 1000),
+                options=f"ops={','.join(op.get('type', '?') for op in operations)}; peak_kb={peak_kb}{_transfer_opts(upload_stats)}"
+            )
+            _save_job_metric(jm, _stages)
+        except Exception as _me:
+            logging.warning(f"[metrics] edit save failed: {_me}")
+        return rel
+    except Exception as e:
+        logging.error(f"Error in edit_gif_task: {e}", exc_info=True)
+        try:
+            jm = JobMetric(
+                tool='edit',
+                task_id=self.request.id if getattr(self, 'request', None) else None,
+                status='FAILURE',
+                error_message=str(e),
+                processing_time_ms=int((time.time() - _task_start) * 1000)
+            )
+            _save_job_metric(jm, _stages)
         except Exception:
             pass
         raise
@@ -15,31 +15,33 @@ def cleanup_old_files():
             logging.warning(f"UPLOAD_FOLDER '{upload_folder}' not configured or does not exist. Cleanup task skipped.")
             return
 
-        user_uploads_dir = os.path.join(upload_folder, "user_uploads")
-        if not os.path.isdir(user_uploads_dir):
-            logging.info(f"User uploads directory does not exist, skipping: {user_uploads_dir}")
-            return
-
         # Use a configurable max age
         max_age_seconds = current_app.config.get('TEMP_FILE_MAX_AGE')
         now = time.time()
         deleted_count = 0
-        
-        logging.info(f"Running cleanup on {user_uploads_dir} for items older than {max_age_seconds} seconds.")
 
-        for item_name in os.listdir(user_uploads_dir):
-            item_path = os.path.join(user_uploads_dir, item_name)
-            try:
-                # We are cleaning up the session directories
-                if os.path.isdir(item_path):
-                    item_age = now - os.path.getmtime(item_path)
-                    if item_age > max_age_seconds:
-                        shutil.rmtree(item_path, ignore_errors=True)
-                        logging.info(f"Deleted old temporary directory: {item_path}")
-                        deleted_count += 1
-            except FileNotFoundError:
-                # Can happen if another process deletes it
+        # Session directories, and resumable uploads that were never finalized
+        # (their directory mtime moves with every chunk, so active ones are kept)
+        for base_dir in (os.path.join(upload_folder, "user_uploads"), os.path.join(upload_folder, "chunked_uploads")):
+            if not os.path.isdir(base_dir):
+                logging.info(f"Uploads directory does not exist, skipping: {base_dir}")
                 continue
+
+            logging.info(f"Running cleanup on {base_dir} for items older than {max_age_seconds} seconds.")
+
+            for item_name in os.listdir(base_dir):
+                item_path = os.path.join(base_dir, item_name)
+                try:
+                    # We are cleaning up the session directories
+                    if os.path.isdir(item_path):
+                        item_age = now - os.path.getmtime(item_path)
+                        if item_age > max_age_seconds:
+                            shutil.rmtree(item_path, ignore_errors=True)
+                            logging.info(f"Deleted old temporary directory: {item_path}")
+                            deleted_count += 1
+                except FileNotFoundError:
+                    # Can happen if another process deletes it
+                    continue
         logging.info(f"Cleanup complete. Deleted {deleted_count} old directories.")
     except Exception as e:
         logging.error(f"Error in cleanup task: {e}", exc_info=True)
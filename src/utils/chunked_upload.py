@@ -0,0 +1,176 @@
+"""Resumable, chunked uploads for large videos.
+
+A client creates an upload with its filename and total size, PUTs the bytes
+in chunks of at most ``CHUNK_UPLOAD_MAX_CHUNK`` at any offset (in any order,
+retrying whatever failed), and then passes the ``upload_id`` to
+``/api/video-to-gif`` instead of a file. Each chunk is one short request, so a
+slow uploader never pins a web worker and a dropped connection only costs the
+chunk in flight; ``GET /api/uploads/<id>`` reports what has arrived.
+
+Everything lives in ``UPLOAD_FOLDER/chunked_uploads/<upload_id>/``: chunks are
+written in place into one ``data`` file of the final size, and ``meta.json``
+keeps the received byte ranges (updated under a file lock, since chunks may
+arrive concurrently). :func:`finalize` renames ``data`` into the session
+directory, so the assembled video is never copied. Uploads that are never
+finalized are removed by the periodic cleanup after ``TEMP_FILE_MAX_AGE``.
+
+Chunks are checked against the declared size before anything is written, and
+an upload accepts at most ``CHUNK_UPLOAD_MAX_RESEND`` times its size in chunk
+bytes overall, which leaves room for retries but not for endless rewrites.
+"""
+import fcntl
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List
+
+from werkzeug.utils import secure_filename
+
+CHUNK_UPLOAD_MAX_CHUNK = int(os.environ.get("CHUNK_UPLOAD_MAX_CHUNK", 16 * 1024 * 1024))
+CHUNK_UPLOAD_MAX_RESEND = float(os.environ.get("CHUNK_UPLOAD_MAX_RESEND", 2.0))
+CHUNKED_UPLOADS_DIR = "chunked_uploads"
+_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+def uploads_root(upload_folder: str) -> str:
+    return os.path.join(upload_folder, CHUNKED_UPLOADS_DIR)
+
+
+def _upload_dir(upload_folder: str, upload_id: str) -> str:
+    if not upload_id or not _ID_RE.match(upload_id):
+        raise FileNotFoundError("Unknown upload id")
+    path = os.path.join(uploads_root(upload_folder), upload_id)
+    if not os.path.isdir(path):
+        raise FileNotFoundError("Unknown upload id")
+    return path
+
+
+@contextmanager
+def _locked(upload_dir: str):
+    with open(os.path.join(upload_dir, "lock"), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _read_meta(upload_dir: str) -> Dict:
+    with open(os.path.join(upload_dir, "meta.json")) as fp:
+        return json.load(fp)
+
+
+def _write_meta(upload_dir: str, meta: Dict) -> None:
+    tmp = os.path.join(upload_dir, "meta.json.tmp")
+    with open(tmp, "w") as fp:
+        json.dump(meta, fp)
+    os.replace(tmp, os.path.join(upload_dir, "meta.json"))
+
+
+def _merge(ranges: List[List[int]], start: int, end: int) -> List[List[int]]:
+    merged = []
+    for lo, hi in sorted(ranges + [[start, end]]):
+        if merged and lo <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], hi)
+        else:
+            merged.append([lo, hi])
+    return merged
+
+
+def _status(upload_id: str, meta: Dict) -> Dict:
+    ranges = meta["received"]
+    received = sum(hi - lo for lo, hi in ranges)
+    missing, pos = [], 0
+    for lo, hi in ranges:
+        if lo > pos:
+            missing.append([pos, lo])
+        pos = hi
+    if pos < meta["size"]:
+        missing.append([pos, meta["size"]])
+    return {
+        "upload_id": upload_id,
+        "filename": meta["filename"],
+        "size": meta["size"],
+        "received_bytes": received,
+        "missing": missing,
+        "complete": not missing,
+        "max_chunk_size": CHUNK_UPLOAD_MAX_CHUNK,
+    }
+
+
+def create(upload_folder: str, filename: str, size: int, allowed_extensions: set, max_size: int) -> Dict:
+    """Start an upload of ``size`` bytes; returns its status (with the new ``upload_id``)."""
+    filename = secure_filename(filename or "")
+    if "." not in filename or filename.rsplit(".", 1)[1].lower() not in allowed_extensions:
+        raise ValueError("Invalid video file")
+    if not isinstance(size, int) or size <= 0:
+        raise ValueError("size must be a positive integer")
+    if size > max_size:
+        raise ValueError("File too large.")
+    upload_id = uuid.uuid4().hex
+    upload_dir = os.path.join(uploads_root(upload_folder), upload_id)
+    os.makedirs(upload_dir)
+    with open(os.path.join(upload_dir, "data"), "wb") as fp:
+        fp.truncate(size)  # sparse until the chunks arrive
+    meta = {"filename": filename, "size": size, "created": time.time(), "received": [], "accepted_bytes": 0}
+    _write_meta(upload_dir, meta)
+    return _status(upload_id, meta)
+
+
+def status(upload_folder: str, upload_id: str) -> Dict:
+    upload_dir = _upload_dir(upload_folder, upload_id)
+    with _locked(upload_dir):
+        return _status(upload_id, _read_meta(upload_dir))
+
+
+def write_chunk(upload_folder: str, upload_id: str, offset: int, length: int, stream) -> Dict:
+    """Write ``length`` bytes read from ``stream`` at ``offset``; returns the upload status."""
+    upload_dir = _upload_dir(upload_folder, upload_id)
+    if length is None or length <= 0:
+        raise ValueError("Chunk is empty")
+    if length > CHUNK_UPLOAD_MAX_CHUNK:
+        raise ValueError(f"Chunks must be at most {CHUNK_UPLOAD_MAX_CHUNK} bytes")
+    with _locked(upload_dir):
+        meta = _read_meta(upload_dir)
+        if offset < 0 or offset + length > meta["size"]:
+            raise ValueError("Chunk is outside the upload")
+        # Reserved before writing, so chunks cut short still count against the budget.
+        accepted = meta.get("accepted_bytes", 0) + length
+        if accepted > max(meta["size"] * CHUNK_UPLOAD_MAX_RESEND, meta["size"] + CHUNK_UPLOAD_MAX_CHUNK):
+            raise ValueError("Upload has been resent too many times; start a new upload")
+        meta["accepted_bytes"] = accepted
+        _write_meta(upload_dir, meta)
+    written = 0
+    with open(os.path.join(upload_dir, "data"), "r+b") as fp:
+        fp.seek(offset)
+        while written < length:
+            block = stream.read(min(1024 * 1024, length - written))
+            if not block:
+                break
+            fp.write(block)
+            written += len(block)
+    if written != length:
+        # Connection dropped mid-chunk: nothing is recorded, the client resends it
+        raise ValueError("Chunk was incomplete")
+    with _locked(upload_dir):
+        meta = _read_meta(upload_dir)
+        meta["received"] = _merge(meta["received"], offset, offset + length)
+        _write_meta(upload_dir, meta)
+        return _status(upload_id, meta)
+
+
+def finalize(upload_folder: str, upload_id: str, dest_dir: str) -> str:
+    """Move a complete upload into ``dest_dir`` (same filesystem, no copy) and return its path."""
+    upload_dir = _upload_dir(upload_folder, upload_id)
+    with _locked(upload_dir):
+        meta = _read_meta(upload_dir)
+        if _status(upload_id, meta)["missing"]:
+            raise ValueError("Upload is incomplete")
+        dest_path = os.path.join(dest_dir, meta["filename"])
+        os.replace(os.path.join(upload_dir, "data"), dest_path)
+    shutil.rmtree(upload_dir, ignore_errors=True)
+    return dest_path
@@ -0,0 +1,83 @@
+"""Two-pass palettegen/paletteuse encoding for video-to-GIF.
+
+The first pass builds a palette from the segment stream, the second maps the
+stream onto it. Palettes are cached on disk keyed by the input bytes, the
+segment set and the colour-affecting settings (eq, stats mode). fps and size
+are deliberately left out of the key so re-encodes at another fps or size can
+reuse the palette.
+"""
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import uuid
+from typing import Dict, List
+
+GIF_ENCODERS = ("default", "palette")
+PALETTE_STATS_MODES = ("full", "diff")
+PALETTE_DITHERS = ("sierra2_4a", "sierra2", "floyd_steinberg", "bayer", "none")
+PALETTE_CACHE_MAX = int(os.environ.get("PALETTE_CACHE_MAX", 500))
+
+
+def palette_cache_key(video_path: str, segments: List[Dict], brightness, contrast, stats_mode: str) -> str:
+    h = hashlib.sha256()
+    with open(video_path, "rb") as fp:
+        for chunk in iter(lambda: fp.read(1024 * 1024), b""):
+            h.update(chunk)
+    settings = {
+        "segments": [[float(s["start"]), float(s["end"])] for s in segments],
+        "brightness": float(brightness),
+        "contrast": float(contrast),
+        "stats_mode": stats_mode,
+    }
+    h.update(json.dumps(settings, sort_keys=True).encode())
+    return h.hexdigest()
+
+
+def _evict_old_palettes(cache_dir: str):
+    try:
+        entries = [os.path.join(cache_dir, f) for f in os.listdir(cache_dir) if f.endswith(".png")]
+        if len(entries) <= PALETTE_CACHE_MAX:
+            return
+        entries.sort(key=os.path.getmtime)
+        for path in entries[:len(entries) - PALETTE_CACHE_MAX]:
+            os.remove(path)
+    except Exception as e:
+        logging.warning(f"[ffmpeg_palette] eviction failed: {e}")
+
+
+def get_or_create_palette(input_args: List[str], filter_prefix: str, eq_filter: str, stats_mode: str,
+                          cache_dir: str, cache_key: str) -> str:
+    """Return a palette PNG for the ``[vsrc]`` stream, generating (and caching) it when needed."""
+    os.makedirs(cache_dir, exist_ok=True)
+    palette_path = os.path.join(cache_dir, f"{cache_key}.png")
+    if os.path.exists(palette_path):
+        logging.info(f"[ffmpeg_palette] Reusing cached palette {palette_path}")
+        os.utime(palette_path)
+        return palette_path
+    # Write to a temp name and rename, so a concurrent reader never sees a partial PNG.
+    tmp_path = os.path.join(cache_dir, f".tmp_{uuid.uuid4().hex}.png")
+    cmd = [
+        "ffmpeg", "-v", "error", *input_args,
+        "-filter_complex", f"{filter_prefix};[vsrc]{eq_filter},palettegen=stats_mode={stats_mode}[pal]",
+        "-map", "[pal]", "-y", tmp_path,
+    ]
+    logging.debug(f"[ffmpeg_palette] cmd={' '.join(cmd)}")
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0 or not os.path.exists(tmp_path):
+        logging.error(f"[ffmpeg_palette] palettegen failed: {result.stderr}")
+        raise Exception("FFmpeg palette generation failed.")
+    os.replace(tmp_path, palette_path)
+    _evict_old_palettes(cache_dir)
+    return palette_path
+
+
+def paletteuse_filter(filter_prefix: str, eq_filter: str, dither: str, palette_input_index: int) -> str:
+    """filter_complex mapping ``[vsrc]`` onto the palette input, producing ``[vout]``."""
+    use = f"paletteuse=dither={dither}"
+    if dither == "bayer":
+        use += ":bayer_scale=3"
+    # diff_mode=rectangle limits re-dithering to changed areas, which keeps frames compressible.
+    use += ":diff_mode=rectangle"
+    return f"{filter_prefix};[vsrc]{eq_filter}[veq];[veq][{palette_input_index}:v]{use}[vout]"
@@ -0,0 +1,595 @@
+"""Streaming frame pipeline shared by the GIF tasks.
+
+Frames are decoded lazily from the source image, passed through a chain of
+per-frame operators and encoded straight to the output file, so peak memory
+depends on a couple of frames instead of the whole animation.
+
+An operator is any callable ``op(frame, meta) -> frame`` where ``meta`` is the
+per-frame dict produced by :func:`iter_frames` (``index``, ``duration``). When
+the source was indexed with :func:`src.utils.gif_blocks.index_gif`, ``meta``
+also carries the source frame's ``disposal``, ``transparency`` and ``bbox``,
+plus ``dirty``: the ``(x0, y0, x1, y1)`` box outside of which the frame is
+identical to the previous one yielded. Operators that move pixels keep
+``dirty`` in step (crop shifts it, resizes scale it); operators that may change
+pixels anywhere drop it.
+
+Frames whose ``meta`` carries ``raw`` bytes (see :mod:`src.utils.gif_blocks`)
+are already-encoded source blocks: operators skip them and :func:`write_gif`
+copies the bytes as they are.
+
+With ``delta=True`` the writers emit each frame as only the rectangle that
+changed since the frame shown before it, with unchanged pixels inside that
+rectangle transparent and disposal 1 (leave in place). Transparent frames are
+handled too: the encoder looks one frame ahead and only falls back to a full
+frame disposed to background when a pixel has to turn transparent again.
+"""
+import math
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image, GifImagePlugin
+
+Frame = Tuple[Image.Image, Dict]
+FrameOp = Callable[[Image.Image, Dict], Image.Image]
+
+DEFAULT_DURATION = 100
+
+
+def _box(bbox: Tuple[int, int, int, int], size: Tuple[int, int]) -> Tuple[int, int, int, int]:
+    x, y, w, h = bbox
+    return max(0, x), max(0, y), min(size[0], x + w), min(size[1], y + h)
+
+
+def _union(a: Optional[Tuple[int, int, int, int]], b: Tuple[int, int, int, int]) -> Tuple[int, int, int, int]:
+    if a is None:
+        return b
+    return min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])
+
+
+def _palette_lookup(palette: bytes, transparency: Optional[int]) -> Tuple[np.ndarray, np.ndarray]:
+    """Sorted packed ``0xRRGGBB`` colours of ``palette`` and the first opaque index holding each."""
+    rgb = np.frombuffer(palette, np.uint8).reshape(-1, 3).astype(np.uint32)
+    indices = np.arange(len(rgb), dtype=np.uint8)
+    if transparency is not None:
+        indices = indices[indices != transparency]
+    rgb = rgb[indices]
+    keys, first = np.unique(rgb[:, 0] << 16 | rgb[:, 1] << 8 | rgb[:, 2], return_index=True)
+    return keys, indices[first]
+
+
+def _to_shared_palette(frame: Image.Image, palette: bytes, lookup: Tuple[np.ndarray, np.ndarray],
+                       transparency: Optional[int]) -> Image.Image:
+    """Map a frame Pillow expanded to RGB(A) back onto the source's colour table.
+
+    Returns the frame unchanged if it uses a colour the table does not hold.
+    """
+    if frame.mode == "P":
+        return frame
+    keys, indices = lookup
+    arr = np.asarray(frame.convert("RGB" if transparency is None else "RGBA"))
+    rgb = arr[..., :3].astype(np.uint32)
+    packed = rgb[..., 0] << 16 | rgb[..., 1] << 8 | rgb[..., 2]
+    pos = np.minimum(np.searchsorted(keys, packed), len(keys) - 1)
+    found = keys[pos] == packed
+    out = indices[pos]
+    if transparency is not None:
+        clear = arr[..., 3] == 0
+        out[clear] = transparency
+        found |= clear
+    if not found.all():
+        return frame
+    im = Image.fromarray(out, "P")
+    im.putpalette(palette)
+    if transparency is not None:
+        im.info["transparency"] = transparency
+    return im
+
+
+def iter_frames(gif: Image.Image, plan: Optional[Dict[int, int]] = None, index: Optional[Dict] = None,
+                keep_palette: bool = False) -> Iterator[Frame]:
+    """Yield ``(frame, meta)`` pairs, decoding one frame at a time.
+
+    ``plan`` (from :func:`plan_decimation`) maps the frames to keep to their
+    merged durations; other frames are still decoded by PIL (GIF frames
+    depend on their predecessors) but never copied. ``index`` (from
+    :func:`src.utils.gif_blocks.index_gif`) supplies per-frame disposal,
+    transparency and bounding boxes. With ``keep_palette`` frames stay
+    indexed (mode ``P`` on the source's colour table) instead of being
+    expanded to RGB; it is ignored unless ``index`` reports a shared palette.
+    """
+    keep_palette = keep_palette and bool(index and index.get("shared_palette"))
+    if keep_palette:
+        # Pillow expands frames after the first to RGB. Its LOADING_STRATEGY switch
+        # is a module global shared by every thread, so map the colours back instead.
+        palette = index["global_palette"]
+        transparency = index["frames"][0]["transparency"]
+        lookup = _palette_lookup(palette, transparency)
+    n_frames = getattr(gif, "n_frames", 1)
+    info = index["frames"] if index and len(index["frames"]) == n_frames else None
+    dirty = None
+    for index_ in range(n_frames):
+        if info is not None and index_ > 0:
+            # What the previous frame's disposal cleared plus what this frame draws.
+            prev = info[index_ - 1]
+            if prev["disposal"] in (2, 3):
+                dirty = _union(dirty, _box(prev["bbox"], gif.size))
+            dirty = _union(dirty, _box(info[index_]["bbox"], gif.size))
+        if plan is not None and index_ not in plan:
+            continue
+        gif.seek(index_)
+        frame = gif.copy()
+        if keep_palette:
+            frame = _to_shared_palette(frame, palette, lookup, transparency)
+        meta = {
+            "index": index_,
+            "duration": plan[index_] if plan is not None else gif.info.get("duration", DEFAULT_DURATION),
+        }
+        if info is not None:
+            entry = info[index_]
+            meta.update(disposal=entry["disposal"], transparency=entry["transparency"], bbox=entry["bbox"])
+            if index_ > 0:
+                meta["dirty"] = dirty
+            dirty = None
+        yield frame, meta
+
+
+# Side of the greyscale thumbnails compared when choosing frames to keep.
+DECIMATE_THUMB = 32
+# Share of the average frame-to-frame change every frame adds to the budget,
+# so long static stretches still keep the odd frame.
+DECIMATE_TIME_WEIGHT = 0.25
+
+
+def plan_decimation(gif: Image.Image, max_frames: int, required: Iterable[int] = ()) -> Optional[Dict[int, int]]:
+    """Choose at most ``max_frames`` frames to keep; return ``{index: duration}`` or None if all fit.
+
+    A first pass measures how much each frame differs from the one before it
+    on small greyscale thumbnails. Frames are then picked at even steps of
+    cumulative change, so bursts of motion keep more frames than near-static
+    stretches, and each kept frame's duration absorbs the frames dropped after
+    it, preserving total playback time. ``required`` frames are always kept.
+    """
+    n_frames = getattr(gif, "n_frames", 1)
+    if n_frames <= max_frames:
+        return None
+    durations = np.empty(n_frames, dtype=np.int64)
+    change = np.zeros(n_frames, dtype=np.float64)
+    prev = None
+    for index in range(n_frames):
+        gif.seek(index)
+        durations[index] = gif.info.get("duration", DEFAULT_DURATION)
+        thumb = np.asarray(gif.convert("L").resize((DECIMATE_THUMB, DECIMATE_THUMB), Image.Resampling.BOX), dtype=np.float32)
+        if prev is not None:
+            change[index] = np.abs(thumb - prev).mean()
+        prev = thumb
+    mean = change.mean()
+    cost = change + (DECIMATE_TIME_WEIGHT * mean if mean > 0 else 1.0)
+    slots = max(1, max_frames - 1)
+    # A single hard cut is worth one kept frame, not several slots that collapse onto it.
+    for _ in range(4):
+        cost = np.minimum(cost, cost[1:].sum() / slots)
+    cumulative = np.cumsum(cost) - cost[0]
+    targets = np.arange(slots + 1) * (cumulative[-1] / (slots + 1))
+    keep = set(np.searchsorted(cumulative, targets).tolist()) | {0}
+    keep |= {i for i in required if 0 <= i < n_frames}
+    kept = sorted(keep)
+    bounds = kept[1:] + [n_frames]
+    return {start: int(durations[start:end].sum()) for start, end in zip(kept, bounds)}
+
+
+def apply_ops(frames: Iterable[Frame], ops: List[FrameOp]) -> Iterator[Frame]:
+    """Run every frame through ``ops`` in order; pre-encoded (``raw``) frames are passed through."""
+    for frame, meta in frames:
+        if "raw" not in meta:
+            for op in ops:
+                frame = op(frame, meta)
+        yield frame, meta
+
+
+# --------------------------------------------------------------------------
+# Operators
+
+def _flatten_palette(frame: Image.Image) -> Image.Image:
+    """Expand palette frames so resampling filters work on real colours."""
+    if frame.mode == "P":
+        return frame.convert("RGBA" if "transparency" in frame.info else "RGB")
+    return frame
+
+
+# Source pixels the widest resampling filter (LANCZOS) reads on each side.
+_RESAMPLE_SUPPORT = 3
+
+
+def _scale_dirty(meta: Dict, src: Tuple[int, int], dst: Tuple[int, int]):
+    dirty = meta.get("dirty")
+    if dirty is None:
+        return
+    sx, sy = dst[0] / src[0], dst[1] / src[1]
+    # The filter spans _RESAMPLE_SUPPORT output pixels when downscaling and
+    # that many source pixels (scale times as many output pixels) when upscaling.
+    margin = math.ceil(_RESAMPLE_SUPPORT * max(1.0, sx, sy)) + 1
+    meta["dirty"] = (
+        max(0, int(dirty[0] * sx) - margin),
+        max(0, int(dirty[1] * sy) - margin),
+        min(dst[0], int(dirty[2] * sx + 1) + margin),
+        min(dst[1], int(dirty[3] * sy + 1) + margin),
+    )
+
+
+def resize_op(size: Tuple[int, int], resample=Image.Resampling.LANCZOS) -> FrameOp:
+    def _resize(frame, meta):
+        if frame.size == tuple(size):
+            return frame
+        _scale_dirty(meta, frame.size, tuple(size))
+        return _flatten_palette(frame).resize(size, resample)
+    return _resize
+
+
+def scale_op(scale: float, resample=Image.Resampling.LANCZOS) -> FrameOp:
+    """Downscale by a factor; a no-op when ``scale >= 1``."""
+    def _scale(frame, meta):
+        if scale >= 1.0:
+            return frame
+        new_size = (max(1, int(frame.width * scale)), max(1, int(frame.height * scale)))
+        _scale_dirty(meta, frame.size, new_size)
+        return _flatten_palette(frame).resize(new_size, resample)
+    return _scale
+
+
+def crop_op(box: Tuple[int, int, int, int]) -> FrameOp:
+    def _crop(frame, meta):
+        dirty = meta.get("dirty")
+        if dirty is not None:
+            w, h = box[2] - box[0], box[3] - box[1]
+            x0, y0 = max(dirty[0], box[0]) - box[0], max(dirty[1], box[1]) - box[1]
+            x1, y1 = min(dirty[2], box[2]) - box[0], min(dirty[3], box[3]) - box[1]
+            if x0 >= min(x1, w) or y0 >= min(y1, h):
+                # The change lies outside the crop: nothing changed in it.
+                meta["dirty"] = (0, 0, 0, 0)
+            else:
+                meta["dirty"] = (x0, y0, min(x1, w), min(y1, h))
+        return frame.crop(box)
+    return _crop
+
+
+def quantize_op(colors: int, dither=Image.Dither.FLOYDSTEINBERG) -> FrameOp:
+    def _quantize(frame, meta):
+        # Each frame gets its own palette, so any pixel may change.
+        meta.pop("dirty", None)
+        if frame.mode not in ("RGB", "L", "P"):
+            frame = frame.convert("RGB")
+        return frame.quantize(colors=colors, dither=dither)
+    return _quantize
+
+
+# --------------------------------------------------------------------------
+# Encoder
+
+def _o16(value: int) -> bytes:
+    return int(value).to_bytes(2, "little")
+
+
+def _gif_header(size: Tuple[int, int], loop: Optional[int]) -> bytes:
+    """GIF89a header without a global colour table (every frame carries its own)."""
+    header = b"GIF89a" + _o16(size[0]) + _o16(size[1]) + b"\x00\x00\x00"
+    if loop is not None:
+        header += b"!\xff\x0bNETSCAPE2.0\x03\x01" + _o16(loop) + b"\x00"
+    return header
+
+
+def _exact_palette(rgb: np.ndarray, max_colors: int = 256) -> Optional[Tuple[np.ndarray, List[int]]]:
+    """Index an ``H x W x 3`` array losslessly if it has at most ``max_colors`` colours.
+
+    Median cut is not exact even when the image already fits in the palette, so
+    frames that were indexed to begin with would otherwise drift on re-encode.
+    """
+    keys = (rgb[..., 0].astype(np.uint32) << 16) | (rgb[..., 1].astype(np.uint32) << 8) | rgb[..., 2]
+    uniq, inverse = np.unique(keys.ravel(), return_inverse=True)
+    if len(uniq) > max_colors:
+        return None
+    palette = np.stack([(uniq >> 16) & 255, (uniq >> 8) & 255, uniq & 255], axis=1).astype(np.uint8)
+    return inverse.reshape(keys.shape).astype(np.uint8), palette.ravel().tolist()
+
+
+def _to_palette(frame: Image.Image) -> Tuple[Image.Image, Optional[int]]:
+    """Return a P-mode version of ``frame`` and its transparent index, if any."""
+    transparency = frame.info.get("transparency")
+    if frame.mode == "P" and not isinstance(transparency, bytes):
+        return frame, transparency
+    if frame.mode in ("RGBA", "LA", "PA") or transparency is not None:
+        pal = frame.convert("RGBA").convert("P", palette=Image.Palette.ADAPTIVE)
+        transparency = None
+        if pal.palette is not None and pal.palette.mode == "RGBA":
+            for rgba, idx in pal.palette.colors.items():
+                if rgba[3] == 0:
+                    transparency = idx
+                    break
+        return pal, transparency
+    rgb = frame.convert("RGB")
+    exact = _exact_palette(np.asarray(rgb))
+    if exact is not None:
+        im = Image.fromarray(exact[0], "P")
+        im.putpalette(exact[1])
+        return im, None
+    return rgb.convert("P", palette=Image.Palette.ADAPTIVE), None
+
+
+def encode_frame(frame: Image.Image, meta: Dict, offset: Tuple[int, int] = (0, 0),
+                 disposal: Optional[int] = None) -> bytes:
+    """Encode one frame as a self-contained GIF image block (GCE + local palette + LZW).
+
+    ``disposal`` defaults to 1 (leave in place) for opaque frames and 2
+    (restore to background) for frames with transparency, since frames are
+    full composites and transparent pixels must clear what was there before.
+    """
+    im, transparency = _to_palette(frame)
+    params = {
+        "duration": meta.get("duration", DEFAULT_DURATION),
+        "include_color_table": True,
+        # Always explicit: Pillow's decoder keeps the previous frame's disposal
+        # when it is left unspecified.
+        "disposal": disposal if disposal is not None else (1 if transparency is None else 2),
+    }
+    if transparency is not None:
+        params["transparency"] = transparency
+    return b"".join(GifImagePlugin.getdata(im, offset, **params))
+
+
+# Delta frames keep one palette entry free for "unchanged" pixels.
+_DELTA_MAX_COLORS = 255
+
+
+def is_opaque(frame: Image.Image) -> bool:
+    return frame.mode not in ("RGBA", "LA", "PA") and "transparency" not in frame.info
+
+
+def _transparent_mask(frame: Image.Image) -> Optional[np.ndarray]:
+    """Boolean mask of transparent pixels, or None for an opaque frame."""
+    if is_opaque(frame):
+        return None
+    return np.asarray(frame.convert("RGBA").getchannel("A")) < 128
+
+
+def _can_draw_over(frame: Image.Image, ref: Optional[Image.Image]) -> bool:
+    """Whether ``frame`` can be drawn over ``ref`` left in place: no pixel has to turn transparent."""
+    if ref is None or ref.size != frame.size:
+        return False
+    mask = _transparent_mask(frame)
+    if mask is None:
+        return True
+    ref_mask = _transparent_mask(ref)
+    return ref_mask is not None and not (mask & ~ref_mask).any()
+
+
+def _same_palette(frame: Image.Image, ref: Image.Image) -> bool:
+    return (frame.mode == ref.mode == "P"
+            and frame.info.get("transparency") == ref.info.get("transparency")
+            and frame.getpalette() == ref.getpalette())
+
+
+def _encode_indexed_delta(frame: Image.Image, ref: Image.Image, meta: Dict,
+                          offset: Tuple[int, int]) -> Optional[bytes]:
+    """Delta between two frames on the same colour table, compared and emitted as indices.
+
+    Returns None when the changed rectangle uses every index, leaving none
+    free for "unchanged".
+    """
+    cur = np.asarray(frame)
+    changed = cur != np.asarray(ref)
+    transparency = frame.info.get("transparency")
+    params = {
+        "duration": meta.get("duration", DEFAULT_DURATION),
+        "include_color_table": True,
+        "disposal": 1,
+    }
+    if not changed.any():
+        im = Image.new("P", (1, 1), 0)
+        im.putpalette([0, 0, 0])
+        params["transparency"] = 0
+        return b"".join(GifImagePlugin.getdata(im, (0, 0), **params))
+    rows = np.flatnonzero(changed.any(axis=1))
+    cols = np.flatnonzero(changed.any(axis=0))
+    y0, y1, x0, x1 = rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+    sub = cur[y0:y1, x0:x1].copy()
+    # A transparent frame's own transparent index already leaves the canvas
+    # alone; otherwise any index the rectangle does not use will do.
+    if transparency is None:
+        unused = np.flatnonzero(np.bincount(sub.ravel(), minlength=256) == 0)
+        if not len(unused):
+            return None
+        transparency = int(unused[0])
+    sub[~changed[y0:y1, x0:x1]] = transparency
+    im = Image.fromarray(sub, "P")
+    im.putpalette(frame.getpalette())
+    params["transparency"] = transparency
+    return b"".join(GifImagePlugin.getdata(im, (int(x0 + offset[0]), int(y0 + offset[1])), **params))
+
+
+def encode_delta_frame(frame: Image.Image, ref: Image.Image, meta: Dict,
+                       dirty: Optional[Tuple[int, int, int, int]] = None) -> bytes:
+    """Encode ``frame`` as the sub-rectangle that differs from ``ref`` (the frame displayed before it).
+
+    Both frames must be the same size, ``ref`` must be left in place (disposal
+    0 or 1) and every transparent pixel of ``frame`` must already be
+    transparent in ``ref``. If given, ``dirty`` bounds where the two differ,
+    so only that box is compared.
+    """
+    x_off, y_off = 0, 0
+    if dirty is not None:
+        x_off, y_off = dirty[0], dirty[1]
+        # An empty box is padded to one pixel, which then compares equal.
+        frame = frame.crop((x_off, y_off, max(dirty[2], x_off + 1), max(dirty[3], y_off + 1)))
+        ref = ref.crop((x_off, y_off, max(dirty[2], x_off + 1), max(dirty[3], y_off + 1)))
+    if _same_palette(frame, ref):
+        block = _encode_indexed_delta(frame, ref, meta, (x_off, y_off))
+        if block is not None:
+            return block
+    cur = np.asarray(frame.convert("RGB"))
+    changed = np.any(cur != np.asarray(ref.convert("RGB")), axis=2)
+    mask = _transparent_mask(frame)
+    if mask is not None:
+        ref_mask = _transparent_mask(ref)
+        if ref_mask is not None:
+            changed |= mask != ref_mask
+        # Pixels that stay transparent are left alone.
+        changed &= ~mask
+    params = {
+        "duration": meta.get("duration", DEFAULT_DURATION),
+        "include_color_table": True,
+        "disposal": 1,
+    }
+    if not changed.any():
+        # Nothing changed: a single transparent pixel keeps the frame's duration.
+        im = Image.new("P", (1, 1), 0)
+        im.putpalette([0, 0, 0])
+        params["transparency"] = 0
+        return b"".join(GifImagePlugin.getdata(im, (0, 0), **params))
+    rows = np.flatnonzero(changed.any(axis=1))
+    cols = np.flatnonzero(changed.any(axis=0))
+    y0, y1, x0, x1 = rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+    sub = cur[y0:y1, x0:x1].copy()
+    keep = ~changed[y0:y1, x0:x1]
+    # Unchanged pixels become transparent; paint them with a changed colour so
+    # they do not take up palette entries.
+    sub[keep] = sub[~keep][0]
+    exact = _exact_palette(sub, _DELTA_MAX_COLORS)
+    if exact is not None:
+        indices, palette = exact
+    else:
+        pal = Image.fromarray(sub, "RGB").quantize(colors=_DELTA_MAX_COLORS)
+        indices, palette = np.asarray(pal).copy(), pal.getpalette()
+    # The first unused index is the transparent one, so the colour table stays as small as the frame needs.
+    transparent = int(indices.max()) + 1
+    indices[keep] = transparent
+    im = Image.fromarray(indices, "P")
+    im.putpalette(palette[:transparent * 3] + [0, 0, 0])
+    params["transparency"] = transparent
+    return b"".join(GifImagePlugin.getdata(im, (int(x0 + x_off), int(y0 + y_off)), **params))
+
+
+def _encode_between(frame: Image.Image, meta: Dict, prev: Optional[Image.Image],
+                    nxt: Optional[Image.Image], dirty=None) -> bytes:
+    """Encode ``frame`` given the frames displayed right before and after it.
+
+    ``prev`` is the frame left on the canvas (None when the canvas was cleared
+    or is unknown), ``nxt`` the frame that follows (None at the end or before
+    a copied block). The frame is a delta against ``prev`` when it can be
+    drawn over it, and is left in place unless ``nxt`` needs pixels cleared,
+    in which case it is written whole and disposed to background.
+    """
+    keep = _can_draw_over(nxt, frame) if nxt is not None else is_opaque(frame)
+    if not keep:
+        return encode_frame(frame, meta, disposal=2)
+    if _can_draw_over(frame, prev):
+        return encode_delta_frame(frame, prev, meta, dirty)
+    return encode_frame(frame, meta, disposal=1)
+
+
+def _left_on_canvas(frame: Optional[Image.Image], meta: Dict, nxt: Optional[Image.Image]) -> Optional[Image.Image]:
+    """The frame the canvas holds once ``nxt`` is about to be drawn after ``frame`` (see _encode_between)."""
+    if frame is None:
+        return None
+    if "raw" in meta:
+        # Only an undisposed frame leaves its full composite on the canvas.
+        return frame if meta.get("disposal", 0) in (0, 1) else None
+    keep = _can_draw_over(nxt, frame) if nxt is not None else is_opaque(frame)
+    return frame if keep else None
+
+
+def iter_gif_bytes(frames: Iterable[Frame], loop: Optional[int] = 0, delta: bool = False) -> Iterator[bytes]:
+    """Encode frames incrementally, yielding the GIF file chunk by chunk.
+
+    With ``delta`` each frame is held until the next one arrives, which
+    decides how it is disposed.
+    """
+    wrote_header = False
+    pending = None
+    prev = None
+    for frame, meta in frames:
+        if not wrote_header:
+            yield _gif_header(frame.size, loop)
+            wrote_header = True
+        if not delta:
+            yield meta["raw"] if "raw" in meta else encode_frame(frame, meta)
+            continue
+        nxt = None if "raw" in meta else frame
+        if pending is not None:
+            yield _encode_between(pending[0], pending[1], prev, nxt, pending[1].get("dirty"))
+            prev = _left_on_canvas(pending[0], pending[1], nxt)
+            pending = None
+        if "raw" in meta:
+            yield meta["raw"]
+            prev = _left_on_canvas(frame, meta, None)
+            continue
+        pending = (frame, meta)
+    if pending is not None:
+        yield _encode_between(pending[0], pending[1], prev, None, pending[1].get("dirty"))
+    if not wrote_header:
+        raise ValueError("No frames to encode")
+    yield b";"
+
+
+def write_gif(frames: Iterable[Frame], output_path: str, loop: Optional[int] = 0, delta: bool = False) -> int:
+    """Stream ``frames`` into ``output_path`` and return the number of frames written."""
+    count = 0
+
+    def _counted():
+        nonlocal count
+        for item in frames:
+            count += 1
+            yield item
+
+    with open(output_path, "wb") as fp:
+        for chunk in iter_gif_bytes(_counted(), loop=loop, delta=delta):
+            fp.write(chunk)
+    return count
+
+
+def write_gif_reversed(frames: Iterable[Frame], output_path: str, loop: Optional[int] = 0, delta: bool = False) -> int:
+    """Write ``frames`` in reverse order.
+
+    Frames are still decoded front to back (GIF decoding is sequential); only
+    their compressed blocks are held until the end, not the decoded pixels.
+    With ``delta``, frame ``i`` is shown between frames ``i + 1`` and
+    ``i - 1``, so it is encoded once frame ``i + 1`` has been decoded; a
+    window of three decoded frames is kept.
+    """
+    size = None
+    blocks: List[bytes] = []
+    window: List[Frame] = []  # frames i - 1, i, i + 1 in source order
+
+    def _encode_middle():
+        (after, _), (frame, meta), (before, before_meta) = window
+        # The frame shown before this one is the next source frame; it differs from this one where it is dirty.
+        prev = before if _can_draw_over(frame, before) else None
+        return _encode_between(frame, meta, prev, after, before_meta.get("dirty"))
+
+    for frame, meta in frames:
+        if size is None:
+            size = frame.size
+        if not delta:
+            blocks.append(encode_frame(frame, meta))
+            continue
+        window.append((frame, meta))
+        if len(window) == 2:
+            # The first source frame is shown last.
+            window.insert(0, (None, {}))
+        if len(window) == 4:
+            window.pop(0)
+        if len(window) == 3:
+            blocks.append(_encode_middle())
+    if delta and window:
+        if len(window) == 1:
+            blocks.append(encode_frame(*window[0]))
+        else:
+            # The last source frame is shown first, onto a clear canvas.
+            (after, _), (frame, meta) = window[-2], window[-1]
+            blocks.append(_encode_between(frame, meta, None, after))
+    if size is None:
+        raise ValueError("No frames to encode")
+    with open(output_path, "wb") as fp:
+        fp.write(_gif_header(size, loop))
+        for block in reversed(blocks):
+            fp.write(block)
+        fp.write(b";")
+    return len(blocks)
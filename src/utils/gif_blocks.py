@@ -0,0 +1,257 @@
+"""Block-level access to GIF files.
+
+:func:`index_gif` walks a GIF once without decoding any pixels and records,
+for every frame, its timing/disposal metadata and where its Graphic Control
+Extension, image descriptor, colour table and LZW data live in the file.
+:func:`frame_block` then re-emits a frame's compressed bytes unchanged, so
+frames that an operation does not touch can be copied instead of re-encoded.
+
+Copied blocks are written into a stream whose header has no global colour
+table (see :mod:`src.utils.frame_pipeline`), so frames that relied on the
+source's global table get it attached as a local one.
+"""
+import logging
+import struct
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from src.utils.frame_pipeline import DEFAULT_DURATION, Frame, is_opaque
+
+
+def _skip_sub_blocks(fp) -> bool:
+    while True:
+        size = fp.read(1)
+        if not size:
+            return False
+        if size[0] == 0:
+            return True
+        fp.seek(size[0], 1)
+
+
+def index_gif(path: str) -> Optional[Dict]:
+    """Return ``{"size", "loop", "global_palette", "shared_palette", "frames"}`` for the GIF at ``path``.
+
+    ``shared_palette`` is True when every frame is drawn with the global colour
+    table and the same transparent index, i.e. frames can be decoded as indexed
+    images without changing colours (see ``iter_frames(keep_palette=True)``).
+    Each frame dict has ``index``, ``duration`` (ms), ``disposal``,
+    ``transparency`` (index or None) and ``bbox`` ``(x, y, w, h)``, plus file
+    offsets used by :func:`frame_block`. Returns None when the file is not a
+    GIF or is malformed, so callers can fall back to the decoding path.
+    """
+    try:
+        with open(path, "rb") as fp:
+            head = fp.read(13)
+            if len(head) < 13 or head[:6] not in (b"GIF87a", b"GIF89a"):
+                return None
+            width, height, packed = struct.unpack("<HHB", head[6:11])
+            global_palette = None
+            if packed & 0x80:
+                global_palette = fp.read(3 << ((packed & 7) + 1))
+            loop = None
+            shared = global_palette is not None
+            frames: List[Dict] = []
+            gce = None
+            while True:
+                marker = fp.read(1)
+                if not marker or marker == b";":
+                    break
+                if marker == b"!":
+                    label = fp.read(1)
+                    start = fp.tell() - 2
+                    if label == b"\xf9":
+                        body = fp.read(6)  # block size, packed, delay, transparent index, terminator
+                        if len(body) < 6 or body[0] != 4:
+                            return None
+                        gce = {
+                            "gce_start": start,
+                            "disposal": (body[1] >> 2) & 7,
+                            "duration": struct.unpack("<H", body[2:4])[0] * 10,
+                            "transparency": body[4] if body[1] & 1 else None,
+                        }
+                        if body[5] != 0 and not _skip_sub_blocks(fp):
+                            return None
+                        gce["gce_end"] = fp.tell()
+                    elif label == b"\xff":
+                        app = fp.read(fp.read(1)[0])
+                        if app == b"NETSCAPE2.0":
+                            sub = fp.read(1)
+                            data = fp.read(sub[0]) if sub and sub[0] else b""
+                            if len(data) >= 3 and data[0] == 1:
+                                loop = struct.unpack("<H", data[1:3])[0]
+                            if sub and sub[0] and not _skip_sub_blocks(fp):
+                                return None
+                        elif not _skip_sub_blocks(fp):
+                            return None
+                    elif not _skip_sub_blocks(fp):
+                        return None
+                elif marker == b",":
+                    desc_start = fp.tell() - 1
+                    desc = fp.read(9)
+                    if len(desc) < 9:
+                        return None
+                    x, y, w, h, fpacked = struct.unpack("<HHHHB", desc)
+                    if fpacked & 0x80:
+                        table = fp.read(3 << ((fpacked & 7) + 1))
+                        # Pillow keeps decoding into the first frame's palette
+                        # only while later frames add no table of their own.
+                        if frames or table != global_palette:
+                            shared = False
+                    fp.seek(1, 1)  # LZW minimum code size
+                    if not _skip_sub_blocks(fp):
+                        return None
+                    frame = {
+                        "index": len(frames),
+                        "duration": DEFAULT_DURATION,
+                        "disposal": 0,
+                        "transparency": None,
+                        "bbox": (x, y, w, h),
+                        "local_palette": bool(fpacked & 0x80),
+                        "desc_start": desc_start,
+                        "end": fp.tell(),
+                    }
+                    if gce:
+                        frame.update(gce)
+                    frames.append(frame)
+                    gce = None
+                else:
+                    return None
+    except (OSError, IndexError, struct.error) as e:
+        logging.warning(f"[gif_blocks] could not index {path}: {e}")
+        return None
+    if not frames:
+        return None
+    if len({frame["transparency"] for frame in frames}) > 1:
+        shared = False
+    return {"size": (width, height), "loop": loop, "global_palette": global_palette,
+            "shared_palette": shared, "frames": frames}
+
+
+def frame_block(fp, index: Dict, frame: Dict) -> Optional[bytes]:
+    """Return ``frame``'s GCE + image block as stored in the file opened as ``fp``.
+
+    A frame that used the global colour table gets it inlined as a local one.
+    Returns None if the frame has no colour table at all (see :func:`passthrough_untouched`).
+    """
+    parts = []
+    if "gce_start" in frame:
+        fp.seek(frame["gce_start"])
+        parts.append(fp.read(frame["gce_end"] - frame["gce_start"]))
+    fp.seek(frame["desc_start"])
+    block = fp.read(frame["end"] - frame["desc_start"])
+    if not frame["local_palette"]:
+        palette = index["global_palette"]
+        if not palette:
+            return None
+        bits = (len(palette) // 3).bit_length() - 2
+        # Keep the interlace flag, set "local table present" and its size.
+        packed = (block[9] & 0x40) | 0x80 | bits
+        block = block[:9] + bytes([packed]) + palette + block[10:]
+    parts.append(block)
+    return b"".join(parts)
+
+
+def passthrough_untouched(frames: Iterable[Frame], gif_path: str, index: Dict,
+                          touched: Callable[[int], bool]) -> Iterator[Frame]:
+    """Mark frames that no operator will change for byte-for-byte copying.
+
+    A frame is copied (``meta["raw"]``) only while the output canvas is known to
+    match the source canvas: from the start of the file until the first
+    touched frame, and again from an untouched frame that covers the whole
+    canvas opaquely or follows an untouched frame that was re-encoded as an
+    opaque full composite and is not disposed. Once every remaining frame
+    is untouched and the canvas is in sync the rest is copied without
+    decoding at all (those frames are yielded as ``None``).
+    """
+    entries = index["frames"]
+    if not index["global_palette"] and not all(e["local_palette"] for e in entries):
+        yield from frames
+        return
+    last_touched = max((i for i in range(len(entries)) if touched(i)), default=-1)
+    in_sync = True
+    with open(gif_path, "rb") as fp:
+        for frame, meta in frames:
+            i = meta["index"]
+            if in_sync and i > 0 and i > last_touched:
+                for entry in entries[i:]:
+                    yield None, {"index": entry["index"], "duration": entry["duration"],
+                                 "disposal": entry["disposal"], "raw": frame_block(fp, index, entry)}
+                return
+            entry = entries[i]
+            # An opaque frame covering the whole canvas does not depend on what was shown before it.
+            standalone = entry["bbox"] == (0, 0, *index["size"]) and entry["transparency"] is None
+            if (in_sync or standalone) and not touched(i):
+                in_sync = True
+                yield frame, {**meta, "disposal": entry["disposal"], "raw": frame_block(fp, index, entry)}
+                continue
+            yield frame, meta
+            in_sync = not touched(i) and is_opaque(frame) and entry["disposal"] in (0, 1)
+
+
+def _with_duration(block: bytes, frame: Dict, duration: int) -> bytes:
+    """Return ``block`` (from a GCE-led frame) with its delay set to ``duration`` ms."""
+    delay = struct.pack("<H", min(0xFFFF, int(round(duration / 10))))
+    if "gce_start" not in frame:
+        return b"!\xf9\x04" + bytes([frame["disposal"] << 2]) + delay + b"\x00\x00" + block
+    return block[:4] + delay + block[6:]
+
+
+def reversed_blocks_independent(index: Dict, order: List[int]) -> bool:
+    """Whether the frames in ``order`` (source indices, display order) each show a full picture.
+
+    A frame qualifies when it covers the whole canvas and either is opaque or
+    is drawn on a cleared canvas both in the source and in ``order``: the
+    frame before it (in each sequence) is disposed to background over the full
+    canvas. Such frames can be shown in any order without decoding them.
+    """
+    entries = index["frames"]
+    full = (0, 0, *index["size"])
+
+    def _clears(i: int) -> bool:
+        return entries[i]["bbox"] == full and entries[i]["disposal"] == 2
+
+    for pos, i in enumerate(order):
+        entry = entries[i]
+        if entry["bbox"] != full:
+            return False
+        if entry["transparency"] is None:
+            continue
+        if i > 0 and not _clears(i - 1):
+            return False
+        if pos > 0 and not _clears(order[pos - 1]):
+            return False
+    return True
+
+
+def write_reversed_blocks(gif_path: str, index: Dict, output_path: str, loop: Optional[int] = 0,
+                          plan: Optional[Dict[int, int]] = None) -> Optional[int]:
+    """Write the GIF at ``gif_path`` backwards by copying its compressed frames.
+
+    No pixel is decoded: the source's header and colour tables are kept and
+    each frame's GCE + LZW block is emitted as stored, in reverse order.
+    ``plan`` (see :func:`src.utils.frame_pipeline.plan_decimation`) keeps only
+    some frames, with their delays rewritten to the merged durations.
+    Returns the number of frames written, or None (writing nothing) when a
+    frame depends on the one shown before it and has to be re-encoded.
+    """
+    entries = index["frames"]
+    order = [i for i in reversed(range(len(entries))) if plan is None or i in plan]
+    if not order or not reversed_blocks_independent(index, order):
+        return None
+    with open(gif_path, "rb") as src, open(output_path, "wb") as out:
+        palette = index["global_palette"] or b""
+        header = src.read(13 + len(palette))
+        out.write(b"GIF89a" + header[6:])
+        if loop is not None:
+            out.write(b"!\xff\x0bNETSCAPE2.0\x03\x01" + struct.pack("<H", loop) + b"\x00")
+        for i in order:
+            entry = entries[i]
+            block = b""
+            if "gce_start" in entry:
+                src.seek(entry["gce_start"])
+                block = src.read(entry["gce_end"] - entry["gce_start"])
+            if plan is not None and plan[i] != entry["duration"]:
+                block = _with_duration(block, entry, plan[i])
+            src.seek(entry["desc_start"])
+            out.write(block + src.read(entry["end"] - entry["desc_start"]))
+        out.write(b";")
+    return len(order)
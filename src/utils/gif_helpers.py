@@ -1,6 +1,7 @@
 import os
 import uuid
 import base64
+import hashlib
 import logging
 from typing import List, Dict, Optional, Tuple
 
@@ -9,6 +10,8 @@ from werkzeug.utils import secure_filename
 from PIL import Image
 
 from src.tasks import add_text_layers_to_gif_task
+from src.utils.result_cache import dispatch_cached
+from src.utils.upload_stream import save_upload
 
 ALLOWED_IMAGE_EXTENSIONS = {"png", "jpg", "jpeg", "gif", "bmp", "webp", "apng", "heic", "heif", "mng", "jp2", "avif", "jxl", "pdf"}
 ALLOWED_VIDEO_EXTENSIONS = {"mp4", "avi", "mov", "webm", "mkv", "flv"}
@@ -46,9 +49,7 @@ def resolve_input_gif(*, url: Optional[str] = None, base64_data: Optional[str] =
             f.write(binary)
         return gif_temp_path
     if file:
-        gif_path = os.path.join(temp_dir, secure_filename(file.filename))
-        file.save(gif_path)
-        return gif_path
+        return save_upload(file, os.path.join(temp_dir, secure_filename(file.filename)))
     raise ValueError("Provide either 'url', 'base64_data', or file")
 
 
@@ -119,18 +120,31 @@ def prepare_layers(layers: List[Dict], fps: float, n_frames: int, temp_dir: str)
                     r.raise_for_status()
                     fname = f"font_{idx}_{uuid.uuid4().hex}.ttf"
                     font_path = os.path.join(temp_dir, secure_filename(fname))
+                    digest = hashlib.sha256()
                     with open(font_path, 'wb') as f:
                         for chunk in r.iter_content(chunk_size=8192):
                             f.write(chunk)
+                            digest.update(chunk)
                     entry['font_path'] = font_path
+                    # Identifies the font in cache keys; the path is a per-request temp file.
+                    entry['font_sha256'] = digest.hexdigest()
             except Exception as fe:
                 logging.warning(f"Failed to fetch font_url for layer {idx}: {fe}")
         prepared_layers.append(entry)
     return prepared_layers
 
 
+def cache_params_layers(prepared_layers: List[Dict]) -> List[Dict]:
+    """Layers as they go into a cache key: the per-request font path is dropped, its ``font_sha256`` kept."""
+    return [{k: v for k, v in l.items() if k != 'font_path'} for l in prepared_layers]
+
+
 def dispatch_add_text_layers_task(gif_path: str, prepared_layers: List[Dict], temp_dir: str, upload_folder: str):
-    return add_text_layers_to_gif_task.apply_async([gif_path, prepared_layers, temp_dir, upload_folder], queue="fileops")
+    """Queue the text-layers task through the result cache. Returns ``(task_id, cached_result)``."""
+    params = {"layers": cache_params_layers(prepared_layers)}
+    return dispatch_cached(add_text_layers_to_gif_task, [gif_path, prepared_layers, temp_dir, upload_folder],
+                           tool='add-text-layers', input_paths=[gif_path], params=params,
+                           upload_folder=upload_folder, temp_dir=temp_dir)
 
 
 def resolve_video_input(url: Optional[str], file, session_dir: str, allowed_extensions: set, max_content_length: int) -> str:
@@ -143,8 +157,7 @@ def resolve_video_input(url: Optional[str], file, session_dir: str, allowed_exte
         raise ValueError("No file provided")
     if file.filename == "" or not allowed_file(file.filename, allowed_extensions):
         raise ValueError("Invalid video file")
-    file_path = os.path.join(session_dir, secure_filename(file.filename))
-    file.save(file_path)
+    file_path = save_upload(file, os.path.join(session_dir, secure_filename(file.filename)))
     if not os.path.exists(file_path) or os.path.getsize(file_path) == 0:
         raise ValueError(f"Failed to save uploaded video: {file.filename}. Please try again.")
     return file_path
@@ -0,0 +1,215 @@
+"""Buffered, batched writer for metric and log rows.
+
+Tasks hand their finished :class:`JobMetric` (with its JobStage rows attached)
+and the ``/api/ai/*`` request hook its :class:`APILog` to :func:`submit`,
+which only appends the row to an in-process buffer. A daemon thread drains
+the buffer every ``METRICS_FLUSH_INTERVAL`` seconds, or as soon as
+``METRICS_BATCH_SIZE`` rows are waiting, and inserts each batch in one
+transaction inside an app context. Neither a task nor a request waits on the
+database: a locked SQLite file or a Postgres outage only delays the rows.
+
+When a batch insert fails its rows are retried one at a time. Rows that
+still fail while others get through are bad data, not an outage: they are
+logged, dropped and counted as ``rejected`` in :func:`stats`, so one bad row
+cannot hold up every row behind it. When nothing gets through (the database
+is down or locked) the rows go back to the front of the buffer and the
+thread backs off (up to ``METRICS_MAX_BACKOFF`` seconds); the rows that were
+tried are put behind the untried ones, so the next attempt probes with
+different rows. The buffer holds at most ``METRICS_BUFFER_MAX`` rows; past
+that the oldest are dropped and counted in :func:`stats`, so an outage
+cannot grow worker memory without bound.
+
+The buffer is flushed when a Celery pool process shuts down and at interpreter
+exit. Rows still buffered when a process is killed (e.g. by the hard task time
+limit) are lost, which is acceptable for metrics.
+"""
+import atexit
+import collections
+import contextlib
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from celery.signals import worker_process_shutdown
+from flask import current_app, has_app_context
+
+METRICS_FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL", 2.0))  # seconds
+METRICS_BATCH_SIZE = int(os.environ.get("METRICS_BATCH_SIZE", 200))
+METRICS_BUFFER_MAX = int(os.environ.get("METRICS_BUFFER_MAX", 5000))
+METRICS_MAX_BACKOFF = float(os.environ.get("METRICS_MAX_BACKOFF", 60.0))  # seconds
+# Single-row writes in a row that fail, with none succeeding, before a batch counts as an outage.
+METRICS_OUTAGE_PROBES = int(os.environ.get("METRICS_OUTAGE_PROBES", 3))
+
+_buffer = collections.deque(maxlen=METRICS_BUFFER_MAX)
+_lock = threading.Lock()  # guards _buffer, _thread and _stats
+_write_lock = threading.Lock()  # one writer at a time (flush thread vs. shutdown flush)
+_wakeup = threading.Event()
+_thread: Optional[threading.Thread] = None
+_app = None  # the Flask app rows were submitted under; the flush thread writes in its context
+_stats = {"submitted": 0, "written": 0, "dropped": 0, "rejected": 0, "failed_writes": 0}
+
+
+def _reset():
+    # Rows buffered before fork belong to the parent; the child starts its own thread on demand.
+    global _buffer, _lock, _write_lock, _wakeup, _thread
+    _buffer = collections.deque(maxlen=METRICS_BUFFER_MAX)
+    _lock = threading.Lock()
+    _write_lock = threading.Lock()
+    _wakeup = threading.Event()
+    _thread = None
+    for key in _stats:
+        _stats[key] = 0
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset)
+
+
+def _flask_app():
+    if _app is not None:
+        return _app
+    try:
+        from src.main import app
+        return app
+    except ImportError:
+        return None
+
+
+def _write(batch: List) -> None:
+    """Insert ``batch`` (model instances, e.g. JobMetrics with their stages) in one transaction."""
+    from src.models.user import db
+    flask_app = _flask_app()
+    ctx = flask_app.app_context() if flask_app else contextlib.nullcontext()
+    with ctx:
+        try:
+            db.session.add_all(batch)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        finally:
+            # Detach the rows so a retry can add them to a fresh session.
+            db.session.expunge_all()
+
+
+def _take(limit: int) -> List:
+    with _lock:
+        return [_buffer.popleft() for _ in range(min(limit, len(_buffer)))]
+
+
+def _put_back(batch: List) -> None:
+    with _lock:
+        room = _buffer.maxlen - len(_buffer)
+        keep = batch[:room] if room < len(batch) else batch
+        _stats["dropped"] += len(batch) - len(keep)
+        _buffer.extendleft(reversed(keep))
+
+
+def _write_each(batch: List) -> Tuple[int, List, List]:
+    """Write ``batch`` row by row after the batch insert failed.
+
+    Returns ``(written, rejected, retry)``. Rows that fail are rejected once
+    another row got through; if the first METRICS_OUTAGE_PROBES rows all fail
+    the database is taken to be down and every unwritten row is returned for
+    a retry, the tried ones last.
+    """
+    written, failed = 0, []
+    for i, row in enumerate(batch):
+        try:
+            _write([row])
+        except Exception as e:
+            failed.append((row, e))
+            if not written and len(failed) >= METRICS_OUTAGE_PROBES:
+                return 0, [], batch[i + 1:] + [r for r, _ in failed]
+            continue
+        written += 1
+    if not written:
+        return 0, [], [r for r, _ in failed]
+    return written, failed, []
+
+
+def _drain(max_batches: Optional[int] = None) -> bool:
+    """Write buffered rows batch by batch; False when the database is unreachable (rows are put back)."""
+    done = 0
+    with _write_lock:
+        while max_batches is None or done < max_batches:
+            batch = _take(METRICS_BATCH_SIZE)
+            if not batch:
+                return True
+            try:
+                _write(batch)
+                written, rejected, retry = len(batch), [], []
+            except Exception as e:
+                logging.warning(f"[metrics_sink] write of {len(batch)} rows failed, retrying row by row: {e}")
+                written, rejected, retry = _write_each(batch)
+            for row, err in rejected:
+                logging.warning(f"[metrics_sink] dropping row that cannot be written: {row!r}: {err}")
+            with _lock:
+                _stats["written"] += written
+                _stats["rejected"] += len(rejected)
+            if retry:
+                _put_back(retry)
+                with _lock:
+                    _stats["failed_writes"] += 1
+                logging.warning(f"[metrics_sink] database unavailable, {len(retry)} rows will be retried")
+                return False
+            done += 1
+    return True
+
+
+def _run():
+    backoff = METRICS_FLUSH_INTERVAL
+    while True:
+        _wakeup.wait(backoff)
+        _wakeup.clear()
+        if _drain():
+            backoff = METRICS_FLUSH_INTERVAL
+        else:
+            backoff = min(max(backoff, 1.0) * 2, METRICS_MAX_BACKOFF)
+
+
+def _ensure_thread():
+    global _thread
+    if _thread is None or not _thread.is_alive():
+        _thread = threading.Thread(target=_run, name="metrics-sink", daemon=True)
+        _thread.start()
+
+
+def submit(row) -> None:
+    """Queue a model instance for the next batch write. Never touches the database."""
+    global _app
+    if _app is None and has_app_context():
+        _app = current_app._get_current_object()
+    with _lock:
+        if len(_buffer) == _buffer.maxlen:
+            _stats["dropped"] += 1
+        _buffer.append(row)
+        _stats["submitted"] += 1
+        pending = len(_buffer)
+        _ensure_thread()
+    if pending >= METRICS_BATCH_SIZE:
+        _wakeup.set()
+
+
+def flush() -> bool:
+    """Write everything buffered now, in the calling thread. Returns False if a write failed."""
+    try:
+        return _drain()
+    except Exception as e:
+        logging.warning(f"[metrics_sink] flush failed: {e}")
+        return False
+
+
+def stats() -> Dict[str, int]:
+    with _lock:
+        return dict(_stats, pending=len(_buffer))
+
+
+@worker_process_shutdown.connect
+def _flush_on_shutdown(**kwargs):
+    flush()
+
+
+atexit.register(flush)
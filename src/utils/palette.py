@@ -0,0 +1,52 @@
+"""Shared-palette quantization.
+
+Instead of running an adaptive palette per frame, one palette is built from a
+pixel sample taken across all frames and every frame is mapped onto it. That
+is one median-cut run instead of N, and frames that share a palette compress
+better and do not flicker between slightly different colour tables.
+"""
+from typing import List, Sequence
+
+import numpy as np
+from PIL import Image
+
+# Pixels sampled across all frames to build the palette.
+PALETTE_SAMPLE_PIXELS = 256 * 1024
+# method -> (Pillow quantizer, k-means refinement passes)
+PALETTE_METHODS = {
+    "mediancut": (Image.Quantize.MEDIANCUT, 0),
+    "octree": (Image.Quantize.FASTOCTREE, 0),
+    "kmeans": (Image.Quantize.MEDIANCUT, 4),
+}
+
+
+def sample_pixels(frames: Sequence[np.ndarray], max_pixels: int = PALETTE_SAMPLE_PIXELS) -> np.ndarray:
+    """Return an ``(N, 3)`` uint8 sample spread evenly over ``frames`` (each ``H x W x 3``)."""
+    total = sum(f.shape[0] * f.shape[1] for f in frames)
+    stride = max(1, total // max_pixels)
+    parts = [f.reshape(-1, 3)[::stride] for f in frames]
+    return np.concatenate(parts, axis=0)
+
+
+def build_shared_palette(frames: Sequence[np.ndarray], colors: int = 256, method: str = "mediancut") -> Image.Image:
+    """Build one P-mode palette image from a sample of every frame.
+
+    ``method`` is ``mediancut``, ``octree`` (fastest) or ``kmeans`` (median
+    cut refined with a few k-means passes over the sample).
+    """
+    quantizer, kmeans = PALETTE_METHODS.get(method, PALETTE_METHODS["mediancut"])
+    sample = sample_pixels(frames)
+    # quantize() wants an image; lay the sample out as a single row.
+    sample_img = Image.fromarray(sample.reshape(1, -1, 3), "RGB")
+    return sample_img.quantize(colors=colors, method=quantizer, kmeans=kmeans)
+
+
+def apply_palette(frames: Sequence[np.ndarray], palette_img: Image.Image, dither: bool = False) -> List[Image.Image]:
+    """Map every RGB frame onto ``palette_img``."""
+    mode = Image.Dither.FLOYDSTEINBERG if dither else Image.Dither.NONE
+    return [Image.fromarray(f, "RGB").quantize(palette=palette_img, dither=mode) for f in frames]
+
+
+def quantize_shared(frames: Sequence[np.ndarray], colors: int = 256, dither: bool = False,
+                    method: str = "mediancut") -> List[Image.Image]:
+    return apply_palette(frames, build_shared_palette(frames, colors, method), dither)
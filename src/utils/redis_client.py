@@ -0,0 +1,31 @@
+"""Shared, lazily created Redis clients for the web and worker processes."""
+import logging
+import os
+import time
+
+from src.celery_app import fix_redis_ssl_url
+
+_clients = {}
+_failed_at = 0.0
+
+
+def get_redis(decode_responses: bool = True):
+    """Return a process-wide Redis client, or None when Redis is unreachable (retried every 60s)."""
+    global _failed_at
+    client = _clients.get(decode_responses)
+    if client is not None:
+        return client
+    if time.time() - _failed_at < 60:
+        return None
+    try:
+        import redis
+        url = os.environ.get("RESULT_CACHE_REDIS_URL") or os.environ.get("REDIS_URL") or "redis://localhost:6379/0"
+        client = redis.Redis.from_url(fix_redis_ssl_url(url), socket_timeout=1, socket_connect_timeout=1,
+                                      decode_responses=decode_responses)
+        client.ping()
+        _clients[decode_responses] = client
+    except Exception as e:
+        logging.warning(f"[redis_client] Redis unavailable: {e}")
+        _failed_at = time.time()
+        client = None
+    return client
@@ -0,0 +1,267 @@
+"""Content-addressed cache of finished GIF task results.
+
+Keys are a hash of the input bytes plus the normalized operation parameters,
+values are whatever the task returned (a GCS object name or a path relative to
+``UPLOAD_FOLDER``). Entries live in Redis so web and worker processes share
+them; if Redis is unreachable every call degrades to a cache miss.
+
+Flow: the route calls :func:`dispatch_cached`. On a hit no work is queued and a
+synthetic SUCCESS result is stored under a fresh task id so ``/task-status``
+keeps working unchanged. On a miss the task is queued and its id recorded as
+pending; the ``task_success`` signal (fired in the worker) then stores the
+result under the key.
+
+Inputs given as a URL (the ``url`` form of /resize, /crop, /optimize,
+/reverse, /add-text and /gif-maker) are not cached: the worker downloads them,
+so the request thread has no bytes to key on, and fetching them there just to
+hash them would cost the download the cache is meant to save.
+
+The key is computed on the request thread, so inputs that would have to be
+read in full (more than ``RESULT_CACHE_MAX_HASH_BYTES`` whose digest was not
+taken while they were uploaded) bypass the cache. A hit is only served if its
+result still exists, locally or as a GCS object; otherwise it is evicted.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from typing import Dict, Iterable, Optional
+
+from celery.signals import task_success
+
+from src.celery_app import celery as celery_app
+from src.utils.gcs_helpers import gcs_object_exists
+from src.utils.redis_client import get_redis
+from src.utils.transport import stash_args
+
+KEY_PREFIX = "gifcache"
+RESULT_CACHE_TTL = int(os.environ.get("RESULT_CACHE_TTL", 3600))  # seconds
+RESULT_CACHE_MAX_ENTRIES = int(os.environ.get("RESULT_CACHE_MAX_ENTRIES", 5000))
+PENDING_TTL = 900  # seconds a queued task may take before its cache slot is dropped
+# Inputs are read at most this far on the request thread to build a key; larger ones skip the cache.
+RESULT_CACHE_MAX_HASH_BYTES = int(os.environ.get("RESULT_CACHE_MAX_HASH_BYTES", 64 * 1024 * 1024))
+
+
+def _enabled() -> bool:
+    return os.environ.get("RESULT_CACHE_ENABLED", "true").lower() != "false"
+
+
+def _get_redis():
+    return get_redis(decode_responses=True)
+
+
+# path -> (size, mtime_ns, sha256) of uploads hashed while they were received (see upload_stream)
+_known_digests: Dict[str, tuple] = {}
+_KNOWN_DIGESTS_MAX = 1000
+
+
+def remember_digest(path: str, sha256_hex: str) -> None:
+    """Record the SHA-256 of a file that was just written, so the cache key need not re-read it."""
+    if len(_known_digests) >= _KNOWN_DIGESTS_MAX:
+        _known_digests.clear()
+    st = os.stat(path)
+    _known_digests[path] = (st.st_size, st.st_mtime_ns, sha256_hex)
+
+
+def _digest_known(path: str) -> bool:
+    known = _known_digests.get(path)
+    if known is None:
+        return False
+    st = os.stat(path)
+    return known[:2] == (st.st_size, st.st_mtime_ns)
+
+
+def hash_cost(paths: Iterable[str]) -> int:
+    """Bytes :func:`cache_key` would have to read for ``paths`` (uploads hashed on arrival are free)."""
+    return sum(os.path.getsize(path) for path in paths if not _digest_known(path))
+
+
+def file_digest(path: str) -> str:
+    known = _known_digests.pop(path, None)
+    if known is not None:
+        st = os.stat(path)
+        if known[:2] == (st.st_size, st.st_mtime_ns):
+            return known[2]
+    h = hashlib.sha256()
+    with open(path, "rb") as fp:
+        for chunk in iter(lambda: fp.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _hash_files(paths: Iterable[str]) -> str:
+    h = hashlib.sha256()
+    for path in paths:
+        h.update(file_digest(path).encode())
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def cache_key(tool: str, input_paths: Iterable[str], params: Dict) -> str:
+    """Build the cache key for ``tool`` applied to the given input files with ``params``."""
+    normalized = json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+    digest = hashlib.sha256(f"{_hash_files(input_paths)}|{normalized}".encode()).hexdigest()
+    return f"{KEY_PREFIX}:{tool}:{digest}"
+
+
+def _incr(field: str):
+    r = _get_redis()
+    if r is None:
+        return
+    try:
+        r.hincrby(f"{KEY_PREFIX}:stats", field, 1)
+    except Exception:
+        pass
+
+
+def lookup(key: str, upload_folder: Optional[str] = None) -> Optional[str]:
+    """Return the cached result for ``key`` or None. Results that were cleaned up or expired count as misses."""
+    r = _get_redis()
+    if r is None:
+        return None
+    try:
+        result = r.get(key)
+    except Exception as e:
+        logging.warning(f"[result_cache] lookup failed: {e}")
+        return None
+    if result:
+        try:
+            gone = not _result_exists(result, upload_folder)
+        except Exception as e:
+            # Unknown: run the task rather than serve a result that may be gone, but keep the entry.
+            logging.warning(f"[result_cache] could not check {result}: {e}")
+            return None
+        if gone:
+            _forget(r, key)
+            result = None
+    _incr("hits" if result else "misses")
+    return result
+
+
+def _result_exists(result: str, upload_folder: Optional[str]) -> bool:
+    """Whether a cached result can still be served: a local file, or else a GCS object."""
+    if upload_folder and os.path.exists(os.path.join(upload_folder, result)):
+        return True
+    bucket_name = os.environ.get("GCS_UPLOAD_BUCKET") or os.environ.get("GCS_BUCKET_NAME")
+    if not bucket_name:
+        return not upload_folder
+    return gcs_object_exists(bucket_name, result)
+
+
+def store(key: str, result: str):
+    """Store ``result`` under ``key`` and evict the oldest entries beyond RESULT_CACHE_MAX_ENTRIES."""
+    r = _get_redis()
+    if r is None or not isinstance(result, str):
+        return
+    try:
+        index = f"{KEY_PREFIX}:index"
+        now = time.time()
+        pipe = r.pipeline()
+        pipe.set(key, result, ex=RESULT_CACHE_TTL)
+        pipe.zadd(index, {key: now})
+        # Age-based: drop index entries whose keys have already expired.
+        pipe.zremrangebyscore(index, 0, now - RESULT_CACHE_TTL)
+        pipe.zcard(index)
+        size = pipe.execute()[-1]
+        overflow = size - RESULT_CACHE_MAX_ENTRIES
+        if overflow > 0:
+            oldest = r.zrange(index, 0, overflow - 1)
+            if oldest:
+                r.delete(*oldest)
+                r.zrem(index, *oldest)
+                r.hincrby(f"{KEY_PREFIX}:stats", "evictions", len(oldest))
+        _incr("stores")
+    except Exception as e:
+        logging.warning(f"[result_cache] store failed: {e}")
+
+
+def _forget(r, key: str):
+    try:
+        r.delete(key)
+        r.zrem(f"{KEY_PREFIX}:index", key)
+    except Exception:
+        pass
+
+
+def register_pending(task_id: str, key: str):
+    r = _get_redis()
+    if r is None:
+        return
+    try:
+        r.set(f"{KEY_PREFIX}:pending:{task_id}", key, ex=PENDING_TTL)
+    except Exception as e:
+        logging.warning(f"[result_cache] register_pending failed: {e}")
+
+
+def stats() -> Dict:
+    """Hit/miss/store/eviction counters plus current entry count."""
+    r = _get_redis()
+    if r is None:
+        return {"enabled": False}
+    try:
+        counters = {k: int(v) for k, v in (r.hgetall(f"{KEY_PREFIX}:stats") or {}).items()}
+        lookups = counters.get("hits", 0) + counters.get("misses", 0)
+        return {
+            "enabled": _enabled(),
+            "entries": r.zcard(f"{KEY_PREFIX}:index"),
+            "ttl_seconds": RESULT_CACHE_TTL,
+            "max_entries": RESULT_CACHE_MAX_ENTRIES,
+            "hit_rate": round(counters.get("hits", 0) / lookups, 4) if lookups else None,
+            **counters,
+        }
+    except Exception as e:
+        logging.warning(f"[result_cache] stats failed: {e}")
+        return {"enabled": False, "error": str(e)}
+
+
+def dispatch_cached(task, args, *, tool: str, input_paths: Iterable[str], params: Dict,
+                    upload_folder: str, temp_dir: Optional[str] = None, queue: str = "fileops"):
+    """Return ``(task_id, cached_result)``; queue ``task`` with ``args`` only on a cache miss.
+
+    On a hit ``temp_dir`` (holding the now-unneeded upload) is removed, since no
+    task will run to clean it up.
+    """
+    key = None
+    input_paths = list(input_paths)
+    if _enabled() and hash_cost(input_paths) > RESULT_CACHE_MAX_HASH_BYTES:
+        logging.info(f"[result_cache] input too large to hash on the request thread, skipping cache for {tool}")
+        _incr("skipped")
+    elif _enabled():
+        try:
+            key = cache_key(tool, input_paths, params)
+            result = lookup(key, upload_folder)
+            if result:
+                task_id = str(uuid.uuid4())
+                celery_app.backend.store_result(task_id, result, "SUCCESS")
+                logging.info(f"[result_cache] hit for {tool}: {result}")
+                if temp_dir:
+                    shutil.rmtree(temp_dir, ignore_errors=True)
+                return task_id, result
+        except Exception as e:
+            logging.warning(f"[result_cache] lookup skipped for {tool}: {e}")
+            key = None
+    # Small single-file inputs travel through Redis/shm instead of the shared filesystem
+    async_result = task.apply_async(stash_args(args, input_paths), queue=queue)
+    if key:
+        register_pending(async_result.id, key)
+    return async_result.id, None
+
+
+@task_success.connect
+def _store_on_success(sender=None, result=None, **kwargs):
+    """Worker side: move a finished task's result into the cache if the route registered it."""
+    r = _get_redis() if _enabled() else None
+    if r is None:
+        return
+    try:
+        task_id = sender.request.id
+        pending = f"{KEY_PREFIX}:pending:{task_id}"
+        key = r.get(pending)
+        if key:
+            r.delete(pending)
+            store(key, result)
+    except Exception as e:
+        logging.warning(f"[result_cache] failed to record result: {e}")
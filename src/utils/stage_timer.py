@@ -0,0 +1,83 @@
+"""Named stage timings for task metrics.
+
+A task keeps one :class:`StageTimer` and wraps its phases::
+
+    timer = StageTimer()
+    with timer.stage("download"):
+        path = _ensure_local_path(...)
+    frames = timer.iterate("decode", iter_frames(gif))
+    frames = timer.iterate("transform", apply_ops(frames, ops))
+    with timer.stage("encode"):
+        write_gif(frames, output_path)
+
+Stages nest and their time is exclusive: while ``encode`` pulls a frame
+through ``transform`` and ``decode`` the time is booked to the inner stage
+only, so the interleaved phases of the streaming frame pipeline are still
+told apart. The durations are stored as JobStage rows next to the task's
+JobMetric.
+
+Tasks use the stage names download, decode, transform, encode and upload,
+so ``/admin/job-metrics/summary`` can line them up across tools.
+"""
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional
+
+
+class StageTimer:
+    def __init__(self):
+        self.durations: Dict[str, float] = {}
+        self._stack: List[List] = []  # [name, resumed_at] of the open stages, innermost last
+
+    def _book(self, now: float):
+        if self._stack:
+            name, resumed = self._stack[-1]
+            self.durations[name] = self.durations.get(name, 0.0) + now - resumed
+
+    def _enter(self, name: str):
+        now = time.perf_counter()
+        self._book(now)
+        self._stack.append([name, now])
+
+    def _exit(self):
+        now = time.perf_counter()
+        self._book(now)
+        self._stack.pop()
+        if self._stack:
+            self._stack[-1][1] = now
+
+    @contextmanager
+    def stage(self, name: str):
+        self._enter(name)
+        try:
+            yield
+        finally:
+            self._exit()
+
+    def iterate(self, name: str, iterable: Iterable) -> Iterator:
+        """Yield from ``iterable``, booking the time spent producing each item to ``name``."""
+        it = iter(iterable)
+        while True:
+            self._enter(name)
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+            finally:
+                self._exit()
+            yield item
+
+    def add(self, name: str, ms: float):
+        """Book a duration measured elsewhere (e.g. by the GCS helpers)."""
+        self.durations[name] = self.durations.get(name, 0.0) + ms / 1000.0
+
+    def ms(self) -> Dict[str, int]:
+        return {name: int(round(seconds * 1000)) for name, seconds in self.durations.items()}
+
+    def summary(self) -> str:
+        return ", ".join(f"{name}={ms}ms" for name, ms in self.ms().items())
+
+    def rows(self, tool: Optional[str]) -> list:
+        """JobStage rows for the recorded stages (attach them to the task's JobMetric)."""
+        from src.models.metrics import JobStage
+        return [JobStage(tool=tool, stage=name, duration_ms=ms) for name, ms in self.ms().items()]
@@ -0,0 +1,238 @@
+"""Task status for ``/task-status`` and pushed status events for ``/task-events``.
+
+:func:`status_payload` builds the status body from the result backend without
+waiting on a result: ``AsyncResult.state`` reads the stored meta once and the
+result comes from that same read. A task that returned the id of another task
+(``orchestrate_gif_from_urls_task`` returns its chord's callback) reports the
+state of that task instead.
+
+Workers publish a small JSON message on ``taskevents:<task_id>`` in Redis when
+a task succeeds or fails (and, through :func:`publish`, whenever it reports
+progress). :func:`stream` subscribes to that channel and yields Server-Sent
+Events, so a client keeps one connection open instead of polling. Success and
+failure messages only wake the stream up; the body it sends is always rebuilt
+with :func:`status_payload`, so both endpoints report the same thing. Between
+messages the stream sends a keepalive comment and re-reads the backend, which
+also covers events published before the client subscribed. Without Redis the
+stream falls back to re-reading the backend every ``TASK_EVENTS_POLL`` seconds.
+
+A stream holds its connection for up to ``TASK_EVENTS_TIMEOUT`` seconds, so it
+needs a threaded or async server worker; on a single sync worker it would
+block every other request.
+"""
+import json
+import logging
+import os
+import time
+from typing import Dict, Iterator, Optional, Tuple
+
+from celery.result import AsyncResult, GroupResult
+from celery.signals import task_failure, task_success
+
+from src.celery_app import celery as celery_app
+from src.utils.redis_client import get_redis
+
+CHANNEL_PREFIX = "taskevents"
+TERMINAL_STATES = ("SUCCESS", "FAILURE", "REVOKED")
+TASK_EVENTS_TIMEOUT = int(os.environ.get("TASK_EVENTS_TIMEOUT", 600))  # seconds per stream
+TASK_EVENTS_KEEPALIVE = float(os.environ.get("TASK_EVENTS_KEEPALIVE", 15))  # seconds between keepalives
+TASK_EVENTS_POLL = float(os.environ.get("TASK_EVENTS_POLL", 1))  # seconds, only without Redis
+PROGRESS_MIN_INTERVAL = float(os.environ.get("PROGRESS_MIN_INTERVAL", 1.0))  # seconds between PROGRESS writes
+
+
+def channel(task_id: str) -> str:
+    return f"{CHANNEL_PREFIX}:{task_id}"
+
+
+def _looks_like_task_id(value) -> bool:
+    return isinstance(value, str) and len(value) == 36 and value.count("-") == 4
+
+
+def _load(task_id: str):
+    try:
+        return GroupResult.restore(task_id, backend=celery_app.backend) or AsyncResult(task_id, backend=celery_app.backend)
+    except Exception:
+        return AsyncResult(task_id, backend=celery_app.backend)
+
+
+def _resolve(task_id: str) -> Tuple[Dict, str]:
+    """Status body for ``task_id`` plus the id of the task it currently depends on."""
+    task = _load(task_id)
+    state = task.state
+    if state == 'PENDING':
+        return {'state': state, 'status': 'Pending...'}, task_id
+    if state == 'PROGRESS':
+        info = task.info if isinstance(task.info, dict) else {}
+        return {
+            'state': state,
+            'status': info.get('status', 'Processing...'),
+            'progress': info.get('progress', 0),
+        }, task_id
+    if state == 'SUCCESS':
+        result = None
+        try:
+            result = task.result
+            # A chord's result is a list; the GIF path is its only item
+            if isinstance(result, list) and len(result) == 1:
+                result = result[0]
+        except Exception as e:
+            logging.error(f"[task_events] Error reading result for {task_id}: {e}")
+        if _looks_like_task_id(result) and result != task_id:
+            logging.info(f"[task_events] {task_id} resolved to callback task {result}")
+            return _resolve(result)
+        return {'state': state, 'status': 'Task completed!', 'result': result}, task_id
+    if state == 'FAILURE':
+        error_msg = 'An unknown error occurred during processing.'
+        if isinstance(task.info, Exception):
+            if isinstance(task.info, ValueError):
+                error_msg = str(task.info)
+            else:
+                logging.error(f"Task {task_id} failed with an unhandled exception: {task.info!r}")
+        return {'state': state, 'status': 'Task failed!', 'error': error_msg}, task_id
+    return {'state': state, 'status': 'Unknown state'}, task_id
+
+
+def status_payload(task_id: str) -> Dict:
+    """The ``/task-status`` body for ``task_id``; never waits for the task."""
+    return _resolve(task_id)[0]
+
+
+def publish(task_id: Optional[str], payload: Dict) -> None:
+    """Push ``payload`` to streams following ``task_id`` (no-op without Redis)."""
+    if not task_id:
+        return
+    r = get_redis(decode_responses=True)
+    if r is None:
+        return
+    try:
+        r.publish(channel(task_id), json.dumps(payload, default=str))
+    except Exception as e:
+        logging.warning(f"[task_events] publish failed for {task_id}: {e}")
+
+
+@task_success.connect
+def _publish_success(sender=None, **kwargs):
+    publish(getattr(getattr(sender, "request", None), "id", None), {"state": "SUCCESS"})
+
+
+@task_failure.connect
+def _publish_failure(sender=None, task_id=None, **kwargs):
+    publish(task_id, {"state": "FAILURE"})
+
+
+class ProgressReporter:
+    """Rate-limited PROGRESS updates for a bound task.
+
+    Each update is stored with ``update_state`` (read by ``/task-status``) and
+    published to ``/task-events`` streams. At most one update per
+    ``PROGRESS_MIN_INTERVAL`` seconds reaches the result backend; the rest are
+    dropped. Calls outside a worker (no request id, e.g. a task called
+    directly) do nothing.
+    """
+
+    def __init__(self, task, min_interval: float = None):
+        request = getattr(task, "request", None)
+        self.task = task
+        self.task_id = None if getattr(request, "is_eager", False) else getattr(request, "id", None)
+        self.min_interval = PROGRESS_MIN_INTERVAL if min_interval is None else min_interval
+        self._last_at = None
+        self._last = None
+
+    def update(self, progress: float, status: str = 'Processing...', force: bool = False) -> None:
+        if not self.task_id:
+            return
+        meta = {'status': status, 'progress': int(max(0, min(100, progress)))}
+        now = time.monotonic()
+        if meta == self._last or (not force and self._last_at is not None and now - self._last_at < self.min_interval):
+            return
+        self._last_at, self._last = now, meta
+        try:
+            self.task.update_state(state='PROGRESS', meta=meta)
+        except Exception as e:
+            logging.warning(f"[task_events] progress update failed for {self.task_id}: {e}")
+        publish(self.task_id, {'state': 'PROGRESS', **meta})
+
+    def iterate(self, iterable, total: int, start: float, end: float, status: str) -> Iterator:
+        """Yield from ``iterable``, moving progress from ``start`` to ``end`` over ``total`` items."""
+        total = max(int(total or 0), 1)
+        for i, item in enumerate(iterable, 1):
+            yield item
+            self.update(start + (end - start) * min(i, total) / total, status)
+
+
+def _sse(payload: Dict) -> str:
+    return f"event: status\ndata: {json.dumps(payload, default=str)}\n\n"
+
+
+def _subscribe(task_id: str):
+    r = get_redis(decode_responses=True)
+    if r is None:
+        return None
+    try:
+        pubsub = r.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(channel(task_id))
+        return pubsub
+    except Exception as e:
+        logging.warning(f"[task_events] subscribe failed for {task_id}: {e}")
+        return None
+
+
+def _close(pubsub):
+    if pubsub is not None:
+        try:
+            pubsub.close()
+        except Exception:
+            pass
+
+
+def stream(task_id: str, timeout: float = None, keepalive: float = None) -> Iterator[str]:
+    """Yield SSE messages for ``task_id`` until it finishes or ``timeout`` passes."""
+    timeout = TASK_EVENTS_TIMEOUT if timeout is None else timeout
+    keepalive = TASK_EVENTS_KEEPALIVE if keepalive is None else keepalive
+    deadline = time.monotonic() + timeout
+    yield f"retry: {int(TASK_EVENTS_POLL * 1000)}\n\n"
+    following = task_id
+    # Subscribe before the first backend read so no event falls in between.
+    pubsub = _subscribe(following)
+    try:
+        payload, current = _resolve(task_id)
+        last = None
+        while True:
+            if current != following:
+                _close(pubsub)
+                following = current
+                pubsub = _subscribe(following)
+                payload, current = _resolve(task_id)
+                continue
+            if payload != last:
+                yield _sse(payload)
+                last = payload
+            if payload['state'] in TERMINAL_STATES:
+                return
+            if time.monotonic() >= deadline:
+                yield _sse({'state': payload['state'], 'status': 'Stream timed out, poll /task-status instead'})
+                return
+            message = None
+            if pubsub is not None:
+                try:
+                    message = pubsub.get_message(timeout=min(keepalive, max(deadline - time.monotonic(), 0.01)))
+                except Exception as e:
+                    logging.warning(f"[task_events] lost subscription for {following}: {e}")
+                    _close(pubsub)
+                    pubsub = None
+            else:
+                time.sleep(TASK_EVENTS_POLL)
+            if message and message.get('type') == 'message':
+                try:
+                    event = json.loads(message['data'])
+                except (TypeError, ValueError):
+                    continue
+                if event.get('state') == 'PROGRESS':
+                    payload = {'state': 'PROGRESS', 'status': event.get('status', 'Processing...'),
+                               'progress': event.get('progress', 0)}
+                    continue
+            elif pubsub is not None:
+                yield ": keepalive\n\n"
+            payload, current = _resolve(task_id)
+    finally:
+        _close(pubsub)
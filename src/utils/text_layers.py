@@ -0,0 +1,317 @@
+"""Text layer rendering shared by the text and edit tasks.
+
+Fonts and text measurements are memoized per process: bundled fonts are
+keyed by ``(path, size)`` and downloaded fonts by ``(sha256, size)``. Because
+the same font object is returned for the same key, wrapping and line widths
+can be keyed by font identity. Downloaded fonts live in per-request temp dirs,
+so they are loaded from memory instead of mapped from a file about to be deleted.
+"""
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+from src.utils.frame_pipeline import FrameOp, is_opaque
+
+_FONTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fonts")
+
+FONT_PATHS = {
+    "Arial": [os.path.join(_FONTS_DIR, "DejaVuSans.ttf")],
+    "Helvetica": [os.path.join(_FONTS_DIR, "DejaVuSans.ttf")],
+    "Times New Roman": [os.path.join(_FONTS_DIR, "DejaVuSerif.ttf")],
+    "Courier New": [os.path.join(_FONTS_DIR, "DejaVuSansMono.ttf")],
+    "Verdana": [os.path.join(_FONTS_DIR, "DejaVuSans.ttf")],
+    "Georgia": [os.path.join(_FONTS_DIR, "DejaVuSerif.ttf")],
+    "Comic Sans MS": [os.path.join(_FONTS_DIR, "ComicNeue-Regular.ttf")],
+    "Impact": [os.path.join(_FONTS_DIR, "impact.ttf")],
+}
+FALLBACK_FONT = os.path.join(_FONTS_DIR, "DejaVuSans.ttf")
+
+UPLOADED_FONT_CACHE_SIZE = int(os.environ.get("UPLOADED_FONT_CACHE_SIZE", 32))
+_uploaded_fonts: "OrderedDict[Tuple[str, int], ImageFont.FreeTypeFont]" = OrderedDict()
+_uploaded_fonts_lock = threading.Lock()
+
+
+def hex_to_rgb(value):
+    value = value.lstrip('#')
+    lv = len(value)
+    return tuple(int(value[i:i + lv // 3], 16) for i in range(0, lv, lv // 3))
+
+
+@lru_cache(maxsize=256)
+def _truetype(path: str, size: int):
+    """Bundled fonts only: FreeType maps the file for as long as the font is alive."""
+    return ImageFont.truetype(path, size)
+
+
+def _uploaded_font(path: str, digest, size: int):
+    """Load a downloaded font from memory, keyed by its content hash (computed if ``digest`` is None)."""
+    data = None
+    if digest is None:
+        with open(path, 'rb') as fp:
+            data = fp.read()
+        digest = hashlib.sha256(data).hexdigest()
+    key = (digest, size)
+    with _uploaded_fonts_lock:
+        font = _uploaded_fonts.get(key)
+        if font is not None:
+            _uploaded_fonts.move_to_end(key)
+            return font
+    if data is None:
+        with open(path, 'rb') as fp:
+            data = fp.read()
+    font = ImageFont.truetype(io.BytesIO(data), size)
+    with _uploaded_fonts_lock:
+        font = _uploaded_fonts.setdefault(key, font)
+        _uploaded_fonts.move_to_end(key)
+        while len(_uploaded_fonts) > UPLOADED_FONT_CACHE_SIZE:
+            _uploaded_fonts.popitem(last=False)
+    return font
+
+
+@lru_cache(maxsize=256)
+def load_font(font_family, font_size):
+    font = None
+    # Try named fonts first
+    if font_family in FONT_PATHS:
+        for p in FONT_PATHS[font_family]:
+            try:
+                if os.path.exists(p):
+                    font = _truetype(p, font_size)
+                    break
+            except Exception:
+                continue
+    if font is None:
+        # Fallback
+        try:
+            if os.path.exists(FALLBACK_FONT):
+                font = _truetype(FALLBACK_FONT, font_size)
+        except Exception:
+            pass
+    if font is None:
+        font = ImageFont.load_default()
+    return font
+
+
+def load_layer_font(layer: Dict, font_size: int):
+    """Load the layer's uploaded font if present, otherwise its font family."""
+    if layer.get('font_path') and os.path.exists(layer['font_path']):
+        try:
+            return _uploaded_font(layer['font_path'], layer.get('font_sha256'), font_size)
+        except Exception:
+            pass
+    return load_font(layer.get('font_family', 'Arial'), font_size)
+
+
+@lru_cache(maxsize=4096)
+def text_length(text: str, font) -> float:
+    return font.getlength(text)
+
+
+@lru_cache(maxsize=1024)
+def _wrap_text(text: str, font, max_width: int) -> Tuple[str, ...]:
+    lines = []
+    for para in text.split('\n'):
+        words = para.split()
+        line = ''
+        for w in words:
+            test = f"{line} {w}".strip()
+            if text_length(test, font) <= max_width or not line:
+                line = test
+            else:
+                lines.append(line)
+                line = w
+        if line:
+            lines.append(line)
+    return tuple(lines)
+
+
+def wrap_text(draw, text, font, max_width):
+    if not text:
+        return []
+    return list(_wrap_text(text, font, int(max_width)))
+
+
+def draw_text_block(draw, lines, top_left, font, fill, stroke_color=None, stroke_width=0, line_height=None):
+    if not lines:
+        return
+    if line_height is None:
+        ascent, descent = font.getmetrics()
+        line_height = ascent + descent + 2
+    x, y = top_left
+    stroke = {'stroke_width': stroke_width, 'stroke_fill': stroke_color} if stroke_width and stroke_color is not None else {}
+    for i, line in enumerate(lines):
+        draw.text((x, y + i * line_height), line, font=font, fill=fill, **stroke)
+
+
+def render_text_sprite(lines, font, fill, stroke_color=None, stroke_width=0, line_height=None):
+    """Render a text block once into a tight RGBA sprite.
+
+    Returns ``(sprite, (dx, dy))`` where the offset is where the sprite's top-left
+    sits relative to the block's top-left (negative when the stroke or glyphs
+    overhang it), or ``(None, (0, 0))`` when there is nothing to draw.
+    """
+    if not lines:
+        return None, (0, 0)
+    if line_height is None:
+        ascent, descent = font.getmetrics()
+        line_height = ascent + descent + 2
+    sw = int(stroke_width or 0) if stroke_color is not None else 0
+    boxes = []
+    for i, line in enumerate(lines):
+        l, t, r, b = font.getbbox(line, stroke_width=sw)
+        boxes.append((l, t + i * line_height, r, b + i * line_height))
+    left = min(bx[0] for bx in boxes)
+    top = min(bx[1] for bx in boxes)
+    right = max(bx[2] for bx in boxes)
+    bottom = max(bx[3] for bx in boxes)
+    if right <= left or bottom <= top:
+        return None, (0, 0)
+    sprite = Image.new('RGBA', (right - left, bottom - top), (0, 0, 0, 0))
+    draw_text_block(ImageDraw.Draw(sprite), lines, (-left, -top), font, fill, stroke_color, sw, line_height)
+    return sprite, (left, top)
+
+
+def composite_sprite(frame_img, sprite, position, alpha=1.0):
+    """Blend ``sprite`` onto an RGB or RGBA frame in place at ``position``, scaled by ``alpha``.
+
+    RGBA frames keep their transparency outside the text.
+    """
+    mask = sprite.getchannel('A')
+    if alpha < 1.0:
+        mask = mask.point(lambda v: int(v * alpha))
+    x, y = int(position[0]), int(position[1])
+    if frame_img.mode != 'RGBA':
+        frame_img.paste(sprite, (x, y), mask)
+        return
+    # alpha_composite needs a destination inside the frame: drop what overhangs the top/left.
+    left, top = max(0, -x), max(0, -y)
+    if left >= sprite.width or top >= sprite.height:
+        return
+    if alpha < 1.0:
+        sprite = sprite.copy()
+        sprite.putalpha(mask)
+    frame_img.alpha_composite(sprite, (x + left, y + top), (left, top))
+
+
+def calculate_position(img_w, img_h, block_w, block_h, h_align, v_align, offset_x, offset_y):
+    if h_align == 'left':
+        base_x = 0
+    elif h_align == 'center':
+        base_x = (img_w - block_w) // 2
+    elif h_align == 'right':
+        base_x = img_w - block_w
+    else:
+        base_x = (img_w - block_w) // 2
+    if v_align == 'top':
+        base_y = 0
+    elif v_align == 'middle':
+        base_y = (img_h - block_h) // 2
+    elif v_align == 'bottom':
+        base_y = img_h - block_h
+    else:
+        base_y = (img_h - block_h) // 2
+    return base_x + offset_x, base_y + offset_y
+
+
+def animation_state(animation_style, frame_index, start_frame, end_frame):
+    """Return ``(alpha, y_offset)`` for a layer's cached sprite on the given frame."""
+    progress = max(0.0, min(1.0, (frame_index - start_frame) / max(1, (end_frame - start_frame))))
+    if animation_style == 'fade':
+        return progress, 0
+    if animation_style == 'slide_up':
+        return 1.0, int(50 * (1 - progress))
+    return 1.0, 0
+
+
+def normalize_layers(layers: List[Dict]) -> List[Dict]:
+    """Convert any hex colors to RGB tuples."""
+    normalized_layers = []
+    for l in layers:
+        col = l.get('color', '#ffffff')
+        sc = l.get('stroke_color', '#000000')
+        if isinstance(col, str) and col.startswith('#'):
+            col = hex_to_rgb(col)
+        if isinstance(sc, str) and sc.startswith('#'):
+            sc = hex_to_rgb(sc)
+        normalized_layers.append({**l, 'color': col, 'stroke_color': sc})
+    return normalized_layers
+
+
+def layout_layer(draw, layer: Dict, frame_w: int, frame_h: int):
+    """Return ``(font, lines, position, line_height)`` for a layer on a frame of the given size."""
+    font_size = int(layer.get('font_size', 24))
+    font = load_layer_font(layer, font_size)
+    max_width = int(frame_w * float(layer.get('max_width_ratio', 0.95)))
+    lines = wrap_text(draw, layer.get('text', ''), font, max_width)
+    ascent, descent = font.getmetrics()
+    line_height = max(10, int((ascent + descent + 2) * float(layer.get('line_height', 1.2))))
+    block_w = max((text_length(line, font) for line in lines), default=0)
+    block_h = max(1, len(lines)) * line_height
+    # auto-fit: shrink font if too tall
+    if layer.get('auto_fit', True):
+        guard = 0
+        while block_h > frame_h * 0.95 and font_size > 8 and guard < 50:
+            font_size = max(8, int(font_size * 0.9))
+            font = load_layer_font(layer, font_size)
+            ascent, descent = font.getmetrics()
+            line_height = max(10, int((ascent + descent + 2) * float(layer.get('line_height', 1.2))))
+            lines = wrap_text(draw, layer.get('text', ''), font, max_width)
+            block_w = max((text_length(line, font) for line in lines), default=0)
+            block_h = max(1, len(lines)) * line_height
+            guard += 1
+    pos = calculate_position(frame_w, frame_h, block_w, block_h,
+                             layer.get('horizontal_align', 'center'), layer.get('vertical_align', 'middle'),
+                             int(layer.get('offset_x', 0)), int(layer.get('offset_y', 0)))
+    return font, lines, pos, line_height
+
+
+def layer_active(layer: Dict, frame_idx: int) -> bool:
+    return int(layer['start_frame']) <= frame_idx <= int(layer['end_frame'])
+
+
+def text_layers_op(layers: List[Dict], is_animated: bool = True) -> FrameOp:
+    """Frame operator drawing normalized ``layers``; static images ignore frame windows and animation.
+
+    Each layer is laid out and rendered into a sprite once per frame size; frames
+    only composite the sprites, with fade and slide applied as alpha and offset.
+    """
+    sprites = {}
+
+    def _layer_sprite(i, layer, size):
+        key = (i, size)
+        if key not in sprites:
+            font, lines, pos, line_height = layout_layer(None, layer, size[0], size[1])
+            sprite, (dx, dy) = render_text_sprite(lines, font, layer['color'], layer['stroke_color'],
+                                                  int(layer.get('stroke_width') or 0), line_height)
+            sprites[key] = (sprite, (pos[0] + dx, pos[1] + dy))
+        return sprites[key]
+
+    def _draw_layers(frame_img, meta):
+        frame_idx = meta['index']
+        # Captions come and go between frames, so the source's change box no longer holds.
+        meta.pop('dirty', None)
+        active = [(i, l) for i, l in enumerate(layers) if not is_animated or layer_active(l, frame_idx)]
+        if not active:
+            # Leave frames outside every layer window exactly as decoded.
+            return frame_img
+        # Keep the alpha of transparent sources so captioned frames match the copied ones.
+        frame_img = frame_img.convert('RGB' if is_opaque(frame_img) else 'RGBA')
+        for i, l in active:
+            sprite, (x, y) = _layer_sprite(i, l, frame_img.size)
+            if sprite is None:
+                continue
+            alpha, y_offset = 1.0, 0
+            if is_animated:
+                alpha, y_offset = animation_state(l.get('animation_style', 'none'), frame_idx,
+                                                  int(l['start_frame']), int(l['end_frame']))
+            if alpha <= 0:
+                continue
+            composite_sprite(frame_img, sprite, (x, y + y_offset), alpha)
+        return frame_img
+    return _draw_layers
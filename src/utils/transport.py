@@ -0,0 +1,139 @@
+"""In-memory handoff of small task inputs from the web process to the worker.
+
+Inputs at or under ``INLINE_TRANSPORT_MAX_BYTES`` are stored under their
+content hash and the task receives a token instead of a filesystem path:
+
+- ``mem://<sha256>.<nonce>/<name>``: bytes in Redis, for workers on other hosts.
+- ``shm://<sha256>/<name>``: a file in ``/dev/shm``, for workers on the same host.
+
+Redis is also the Celery broker, so each stash gets its own key and the
+worker deletes it as it reads it; ``INLINE_TRANSPORT_TTL`` only reclaims
+inputs whose task never ran. A redelivered task (``task_acks_late``) finds
+its input gone and fails like one whose input expired.
+
+``INLINE_TRANSPORT`` selects ``redis`` (default), ``shm`` or ``off``. The
+worker resolves tokens in ``_ensure_local_path``. Anything that cannot be
+stashed keeps using the plain path.
+"""
+import hashlib
+import logging
+import os
+import shutil
+import time
+import uuid
+from typing import Iterable, List, Optional
+
+from src.utils.redis_client import get_redis
+
+INLINE_TRANSPORT_MAX_BYTES = int(os.environ.get("INLINE_TRANSPORT_MAX_BYTES", 8 * 1024 * 1024))
+INLINE_TRANSPORT_TTL = int(os.environ.get("INLINE_TRANSPORT_TTL", 3600))  # seconds
+SHM_DIR = os.environ.get("INLINE_TRANSPORT_SHM_DIR", "/dev/shm/easygifmaker")
+KEY_PREFIX = "gifinput"
+
+
+def _mode() -> str:
+    return os.environ.get("INLINE_TRANSPORT", "redis").lower()
+
+
+def is_token(path) -> bool:
+    return isinstance(path, str) and path.startswith(("mem://", "shm://"))
+
+
+def _split_token(token: str):
+    scheme, rest = token.split("://", 1)
+    digest, name = rest.split("/", 1)
+    return scheme, digest, os.path.basename(name)
+
+
+def _prune_shm():
+    """Drop shared-memory inputs older than the TTL; nothing else expires them."""
+    cutoff = time.time() - INLINE_TRANSPORT_TTL
+    try:
+        for entry in os.scandir(SHM_DIR):
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+    except Exception as e:
+        logging.warning(f"[transport] shm prune failed: {e}")
+
+
+def stash_input(local_path: str) -> Optional[str]:
+    """Store a small file for the worker and return its token, or None to keep using the path."""
+    mode = _mode()
+    if mode not in ("redis", "shm"):
+        return None
+    try:
+        if os.path.getsize(local_path) > INLINE_TRANSPORT_MAX_BYTES:
+            return None
+        with open(local_path, "rb") as fp:
+            data = fp.read()
+        digest = hashlib.sha256(data).hexdigest()
+        name = os.path.basename(local_path)
+        if mode == "shm":
+            os.makedirs(SHM_DIR, exist_ok=True)
+            _prune_shm()
+            shm_path = os.path.join(SHM_DIR, f"{digest}_{name}")
+            if not os.path.exists(shm_path):
+                tmp_path = f"{shm_path}.{os.getpid()}.tmp"
+                with open(tmp_path, "wb") as fp:
+                    fp.write(data)
+                os.replace(tmp_path, shm_path)
+            return f"shm://{digest}/{name}"
+        r = get_redis(decode_responses=False)
+        if r is None:
+            return None
+        # One key per stash: the reader deletes it, so identical uploads must not share one.
+        key_id = f"{digest}.{uuid.uuid4().hex}"
+        r.set(f"{KEY_PREFIX}:{key_id}", data, ex=INLINE_TRANSPORT_TTL)
+        return f"mem://{key_id}/{name}"
+    except Exception as e:
+        logging.warning(f"[transport] Could not stash {local_path}, passing the path instead: {e}")
+        return None
+
+
+def resolve_token(token: str, output_dir: str) -> str:
+    """Materialize a token as a local file the task owns (and deletes when done)."""
+    scheme, digest, name = _split_token(token)
+    if scheme == "shm":
+        shm_path = os.path.join(SHM_DIR, f"{digest}_{name}")
+        if not os.path.exists(shm_path):
+            raise FileNotFoundError(f"Inline input expired or missing: {token}")
+        # Hard-link into the task's own name so its cleanup never races a retry or a duplicate upload.
+        local_path = os.path.join(SHM_DIR, f"{digest}_{os.getpid()}_{name}")
+        try:
+            os.link(shm_path, local_path)
+        except OSError:
+            shutil.copyfile(shm_path, local_path)
+        return local_path
+    r = get_redis(decode_responses=False)
+    data = None
+    if r is not None:
+        # GET + DEL in one transaction (GETDEL needs Redis 6.2).
+        key = f"{KEY_PREFIX}:{digest}"
+        pipe = r.pipeline()
+        pipe.get(key)
+        pipe.delete(key)
+        data = pipe.execute()[0]
+    if data is None:
+        raise FileNotFoundError(f"Inline input expired or missing: {token}")
+    os.makedirs(output_dir, exist_ok=True)
+    local_path = os.path.join(output_dir, name)
+    with open(local_path, "wb") as fp:
+        fp.write(data)
+    return local_path
+
+
+def stash_args(args: List, input_paths: Iterable[str]) -> List:
+    """Replace input paths in a task's positional args with transport tokens, deleting the local copies."""
+    input_paths = set(input_paths)
+    out = []
+    for arg in args:
+        if isinstance(arg, str) and arg in input_paths:
+            token = stash_input(arg)
+            if token:
+                try:
+                    os.remove(arg)
+                except OSError:
+                    pass
+                arg = token
+        out.append(arg)
+    return out
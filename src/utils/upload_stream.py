@@ -0,0 +1,89 @@
+"""Write multipart uploads once, straight into their session directory.
+
+Werkzeug parses a multipart body into whatever ``Request._get_file_stream``
+returns. By default that is a temporary file, so a large video is written to
+the temp dir first and ``FileStorage.save()`` then copies it into the session
+directory. :class:`UploadRequest` (the app's request class) writes each file
+part of a request that called :func:`receive_into` to a ``.part`` file inside
+that directory instead, hashing the bytes as they arrive. :func:`save_upload`
+then renames the part to its final name, so nothing is copied, and hands its
+SHA-256 to the result cache, so the cache key does not read the file again.
+
+Requests that never call :func:`receive_into` (and non-file form fields) are
+parsed exactly as before. Parts that were never saved, including those of a
+request whose body was cut off, are deleted when the request is closed.
+"""
+import hashlib
+import os
+import uuid
+
+from flask import Request, request
+
+from src.utils.result_cache import remember_digest
+
+UPLOAD_DIR_KEY = "easygifmaker.upload_dir"
+PARTS_KEY = "easygifmaker.upload_parts"
+
+
+class HashingFile:
+    """A real file in the upload directory that hashes everything written to it."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.size = 0
+        self._sha = hashlib.sha256()
+        self._fp = open(path, "w+b")
+
+    def write(self, data) -> int:
+        self._sha.update(data)
+        self.size += len(data)
+        return self._fp.write(data)
+
+    def hexdigest(self) -> str:
+        return self._sha.hexdigest()
+
+    def __getattr__(self, name):
+        return getattr(self._fp, name)
+
+    def __iter__(self):
+        return iter(self._fp)
+
+
+class UploadRequest(Request):
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        target = self.environ.get(UPLOAD_DIR_KEY)
+        if not target:
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        part = HashingFile(os.path.join(target, f".{uuid.uuid4().hex}.part"))
+        self.environ.setdefault(PARTS_KEY, []).append(part)
+        return part
+
+    def close(self) -> None:
+        # Flask closes the request when its context is torn down, even after an error.
+        try:
+            super().close()
+        finally:
+            for part in self.environ.pop(PARTS_KEY, []):
+                part.close()
+                try:
+                    os.remove(part.path)  # gone already if save_upload renamed it
+                except FileNotFoundError:
+                    pass
+
+
+def receive_into(directory: str) -> None:
+    """Stream this request's uploaded files into ``directory``; call before touching request.form/files."""
+    request.environ[UPLOAD_DIR_KEY] = directory
+
+
+def save_upload(file, dest_path: str) -> str:
+    """Move an uploaded ``FileStorage`` to ``dest_path`` (rename when it was streamed, copy otherwise)."""
+    stream = file.stream
+    if isinstance(stream, HashingFile) and os.path.dirname(stream.path) == os.path.dirname(dest_path):
+        stream.flush()
+        stream.close()
+        os.replace(stream.path, dest_path)
+        remember_digest(dest_path, stream.hexdigest())
+    else:
+        file.save(dest_path)
+    return dest_path
@@ -0,0 +1,83 @@
+"""Segment extraction strategies for video-to-GIF.
+
+``trim``: a single ffmpeg process decodes the input from the start and
+``trim`` filters cut out each segment. Simple, but everything before the last
+segment end is decoded.
+
+``seek``: every segment is extracted by its own ffmpeg process using input
+seeking (``-ss`` before ``-i``), so decoding starts at the keyframe before the
+segment instead of at 0. Pieces are extracted in parallel, already at the
+target fps/size, into lossless FFV1 files and joined with the concat demuxer.
+"""
+import logging
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+SEGMENT_STRATEGIES = ("auto", "seek", "trim")
+# With a single segment starting this early, seeking saves too little to pay for the extra pass.
+SEEK_MIN_START = float(os.environ.get("VIDEO_SEEK_MIN_START", 5.0))
+
+
+def resolve_segment_strategy(strategy: Optional[str], segments: List[Dict]) -> str:
+    """Pick ``seek`` or ``trim``; ``auto`` seeks for multiple segments or a late single segment."""
+    strategy = (strategy or os.environ.get("VIDEO_SEGMENT_STRATEGY", "auto")).lower()
+    if strategy not in SEGMENT_STRATEGIES:
+        logging.warning(f"[video_segments] Unknown segment strategy {strategy!r}, using auto")
+        strategy = "auto"
+    if strategy != "auto":
+        return strategy
+    if len(segments) > 1 or float(segments[0]["start"]) >= SEEK_MIN_START:
+        return "seek"
+    return "trim"
+
+
+def _extract_piece(video_path: str, seg: Dict, piece_path: str, video_filter: str):
+    start = float(seg["start"])
+    duration = float(seg["end"]) - start
+    cmd = [
+        "ffmpeg", "-v", "error", "-ss", f"{start}", "-i", video_path, "-t", f"{duration}",
+        "-an", "-sn", "-vf", video_filter, "-c:v", "ffv1", "-y", piece_path,
+    ]
+    logging.debug(f"[video_segments] cmd={' '.join(cmd)}")
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0 or not os.path.exists(piece_path):
+        logging.error(f"[video_segments] Segment extraction failed: {result.stderr}")
+        raise Exception("FFmpeg segment extraction failed. Please check video format and parameters.")
+    return piece_path
+
+
+def extract_segments(video_path: str, segments: List[Dict], work_dir: str, video_filter: str,
+                     max_workers: Optional[int] = None) -> str:
+    """Extract every segment in parallel and return the path of a concat demuxer list joining them."""
+    os.makedirs(work_dir, exist_ok=True)
+    pieces = [os.path.join(work_dir, f"segment_{i:03d}.mkv") for i in range(len(segments))]
+    workers = max(1, min(len(segments), max_workers or os.cpu_count() or 1))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(lambda args: _extract_piece(video_path, *args, video_filter), zip(segments, pieces)))
+    list_path = os.path.join(work_dir, "segments.txt")
+    with open(list_path, "w") as fp:
+        for piece in pieces:
+            fp.write(f"file '{piece}'\n")
+    return list_path
+
+
+def build_video_source(video_path: str, segments: List[Dict], fps, width, height, strategy: str,
+                       work_dir: str) -> Tuple[List[str], str]:
+    """Return ``(input_args, filter_prefix)`` where the prefix ends in a ``[vsrc]`` stream at the target fps/size."""
+    scale_filter = f"fps={fps},scale={width}:{height}:flags=lanczos"
+    if strategy == "seek":
+        list_path = extract_segments(video_path, segments, work_dir, scale_filter)
+        return ["-f", "concat", "-safe", "0", "-i", list_path], "[0:v]null[vsrc]"
+    fc_parts = []
+    v_labels = []
+    for i, seg in enumerate(segments):
+        fc_parts.append(
+            f"[0:v]trim=start={seg['start']}:end={seg['end']},setpts=PTS-STARTPTS[v{i}]"
+        )
+        v_labels.append(f"[v{i}]")
+    # Concat segments (video only)
+    fc_parts.append("".join(v_labels) + f"concat=n={len(segments)}:v=1:a=0[vcat]")
+    fc_parts.append(f"[vcat]{scale_filter}[vsrc]")
+    return ["-i", video_path], ";".join(fc_parts)
@@ -50,6 +50,26 @@ fi
 PORT_TO_BIND=${PORT:-8080}
 echo "[Entrypoint] Preparing to start processes on port ${PORT_TO_BIND}..."
 
+# gthread (default): each worker serves GUNICORN_THREADS requests at once, so a
+# slow /api/upload or /api/download?proxy=1 client no longer stalls the API.
+# Set GUNICORN_WORKER_CLASS=sync to get the old one-request-at-a-time worker.
+GUNICORN_WORKER_CLASS=${GUNICORN_WORKER_CLASS:-gthread}
+GUNICORN_WORKERS=${GUNICORN_WORKERS:-1}
+GUNICORN_THREADS=${GUNICORN_THREADS:-8}
+echo "[Entrypoint] Gunicorn: worker_class=${GUNICORN_WORKER_CLASS} workers=${GUNICORN_WORKERS} threads=${GUNICORN_THREADS}"
+GUNICORN_ARGS=(
+    -b 0.0.0.0:${PORT_TO_BIND}
+    --timeout=1800
+    --keep-alive=10
+    --worker-class=${GUNICORN_WORKER_CLASS}
+    --workers=${GUNICORN_WORKERS}
+    --threads=${GUNICORN_THREADS}
+    --worker-connections=10
+    --limit-request-line=8192
+    --limit-request-field_size=16384
+    --preload
+)
+
 # Decide whether Celery should run based on availability of a broker URL
 SHOULD_RUN_CELERY=false
 if [ -n "${CELERY_BROKER_URL:-}" ] || [ -n "${REDIS_URL:-}" ]; then
@@ -58,16 +78,7 @@ fi
 
 if [ "$SHOULD_RUN_CELERY" = true ]; then
     echo "[Entrypoint] Starting Gunicorn in background..."
-    gunicorn -b 0.0.0.0:${PORT_TO_BIND} \
-        --timeout=1800 \
-        --keep-alive=10 \
-        --worker-class=sync \
-        --workers=1 \
-        --worker-connections=10 \
-        --limit-request-line=8192 \
-        --limit-request-field_size=16384 \
-        --preload \
-        src.main:app &
+    gunicorn "${GUNICORN_ARGS[@]}" src.main:app &
 
     sleep 2
     echo "[Entrypoint] Starting Celery worker (foreground)..."
@@ -84,14 +95,5 @@ if [ "$SHOULD_RUN_CELERY" = true ]; then
 else
     echo "[Entrypoint] No Celery broker configured. Running web server only."
     # Run Gunicorn in the foreground to keep the container alive
-    exec gunicorn -b 0.0.0.0:${PORT_TO_BIND} \
-        --timeout=1800 \
-        --keep-alive=10 \
-        --worker-class=sync \
-        --workers=1 \
-        --worker-connections=10 \
-        --limit-request-line=8192 \
-        --limit-request-field_size=16384 \
-        --preload \
-        src.main:app
+    exec gunicorn "${GUNICORN_ARGS[@]}" src.main:app
 fi
@@ -0,0 +1,59 @@
+import io
+import os
+
+import pytest
+
+from src.utils import chunked_upload
+
+
+def test_chunks_resume_and_finalize_without_copy(tmp_path, monkeypatch):
+    from src.main import app
+
+    monkeypatch.setitem(app.config, "UPLOAD_FOLDER", str(tmp_path))
+    client = app.test_client()
+    payload = os.urandom(250_000)
+
+    r = client.post("/api/uploads", json={"filename": "clip.mp4", "size": len(payload)})
+    assert r.status_code == 201
+    upload_id = r.get_json()["upload_id"]
+
+    # Second chunk first, then a dropped first chunk (body shorter than Content-Length)
+    r = client.put(f"/api/uploads/{upload_id}?offset=100000", data=payload[100000:])
+    assert r.get_json()["missing"] == [[0, 100000]]
+    with pytest.raises(ValueError):
+        chunked_upload.write_chunk(str(tmp_path), upload_id, 0, 100000, io.BytesIO(payload[:40000]))
+    status = client.get(f"/api/uploads/{upload_id}").get_json()
+    assert status["received_bytes"] == 150000 and not status["complete"]
+
+    r = client.put(f"/api/uploads/{upload_id}", data=payload[:100000],
+                   headers={"Content-Range": "bytes 0-99999/250000"})
+    assert r.get_json()["complete"]
+
+    data_file = tmp_path / "chunked_uploads" / upload_id / "data"
+    inode = os.stat(data_file).st_ino
+    session_dir = tmp_path / "session"
+    session_dir.mkdir()
+    path = chunked_upload.finalize(str(tmp_path), upload_id, str(session_dir))
+    assert open(path, "rb").read() == payload
+    assert os.stat(path).st_ino == inode
+    assert client.get(f"/api/uploads/{upload_id}").status_code == 404
+
+
+def test_chunks_past_the_size_or_budget_are_rejected_unread(tmp_path, monkeypatch):
+    class Unread(io.BytesIO):
+        def read(self, *args):
+            raise AssertionError("chunk body was read")
+
+    upload_id = chunked_upload.create(str(tmp_path), "clip.mp4", 1000, {"mp4"}, 10_000)["upload_id"]
+    with pytest.raises(ValueError, match="outside"):
+        chunked_upload.write_chunk(str(tmp_path), upload_id, 900, 200, Unread())
+
+    # Resends are allowed up to CHUNK_UPLOAD_MAX_RESEND times the size (at least one extra chunk)
+    monkeypatch.setattr(chunked_upload, "CHUNK_UPLOAD_MAX_CHUNK", 1000)
+    budget = max(1000 * chunked_upload.CHUNK_UPLOAD_MAX_RESEND, 1000 + chunked_upload.CHUNK_UPLOAD_MAX_CHUNK)
+    sent = 0
+    while sent + 1000 <= budget:
+        chunked_upload.write_chunk(str(tmp_path), upload_id, 0, 1000, io.BytesIO(b"x" * 1000))
+        sent += 1000
+    with pytest.raises(ValueError, match="resent too many times"):
+        chunked_upload.write_chunk(str(tmp_path), upload_id, 0, 1000, Unread())
@@ -0,0 +1,106 @@
+import os
+
+from PIL import Image
+
+from src.tasks import edit_gif_task
+
+
+def _make_gif(path, n=6, size=(80, 60)):
+    frames = [Image.new("RGB", size, (i * 30, 120, 200 - i * 20)) for i in range(n)]
+    frames[0].save(path, save_all=True, append_images=frames[1:], duration=100, loop=0)
+    return path
+
+
+def test_edit_gif_task_applies_operations_in_one_pass(tmp_path, monkeypatch):
+    monkeypatch.delenv("GCS_BUCKET_NAME", raising=False)
+    monkeypatch.delenv("GCS_UPLOAD_BUCKET", raising=False)
+    upload_folder = str(tmp_path)
+    output_dir = os.path.join(upload_folder, "out")
+    gif_path = _make_gif(os.path.join(upload_folder, "in.gif"))
+    operations = [
+        {"type": "crop", "x": 0, "y": 0, "width": 40, "height": 40},
+        {"type": "resize", "width": 20, "height": 20},
+        {"type": "text", "layers": [{"text": "Hi", "font_size": 8, "color": "#ffffff",
+                                     "stroke_color": "#000000", "start_frame": 0, "end_frame": 5}]},
+        {"type": "optimize", "quality": 60},
+    ]
+    rel = edit_gif_task(gif_path, operations, output_dir, upload_folder)
+    with Image.open(os.path.join(upload_folder, rel)) as result:
+        assert result.size == (20, 20)
+        assert result.n_frames == 6
+    assert not os.path.exists(gif_path)
+
+
+def test_small_outputs_are_accepted(tmp_path, monkeypatch):
+    from src.tasks import crop_gif_task, reverse_gif_task
+
+    monkeypatch.delenv("GCS_BUCKET_NAME", raising=False)
+    monkeypatch.delenv("GCS_UPLOAD_BUCKET", raising=False)
+    upload_folder = str(tmp_path)
+    output_dir = os.path.join(upload_folder, "out")
+    os.makedirs(output_dir)
+    # Delta encoding keeps outputs like these well under a kilobyte.
+    for run in (lambda p: reverse_gif_task(p, output_dir, upload_folder),
+                lambda p: crop_gif_task(p, 0, 0, 8, 8, "free", output_dir, upload_folder)):
+        gif_path = _make_gif(os.path.join(upload_folder, "tiny.gif"), size=(12, 12))
+        path = os.path.join(upload_folder, run(gif_path))
+        assert os.path.getsize(path) < 1024
+        with Image.open(path) as out:
+            assert out.n_frames == 6
+
+
+def test_edit_route_rejects_bad_operations(tmp_path, monkeypatch):
+    import io
+    import json
+
+    from src.main import app
+    from src.utils.limiter import limiter
+
+    monkeypatch.setitem(app.config, "UPLOAD_FOLDER", str(tmp_path))
+    monkeypatch.setattr(limiter, "enabled", False)
+    gif_bytes = open(_make_gif(os.path.join(tmp_path, "in.gif")), "rb").read()
+    client = app.test_client()
+
+    def post(operations):
+        data = {"file": (io.BytesIO(gif_bytes), "in.gif"), "operations": json.dumps(operations)}
+        r = client.post("/api/edit", data=data, content_type="multipart/form-data")
+        return r.status_code, r.get_json()["error"]
+
+    assert post([{"type": "resize", "width": "wide", "height": 20}]) == (400, "resize operation at index 0: width must be an integer")
+    assert post([{"type": "crop", "x": [1], "width": 10}])[0] == 400
+    assert post([{"type": "resize", "height": 20}])[0] == 400
+    assert post([{"type": "optimize", "quality": 80.5}])[0] == 400
+    assert post([{"type": "text", "layers": [{"text": "Hi", "font_size": "big"}]}])[0] == 400
+    assert post([{"type": "resize", "width": 20, "height": 20}] * 11) == (400, "At most 10 operations are allowed")
+    assert post([{"type": "optimize", "dither": "sparkle"}]) == (
+        400, "optimize operation at index 0: dither must be one of floyd-steinberg, atkinson, burkes, none")
+    assert post([{"type": "crop", "aspect_ratio": "5:4"}])[0] == 400
+    assert post([{"type": "resize", "width": 20, "height": 20, "maintain_aspect_ratio": "false"}])[0] == 400
+
+
+def test_edit_text_is_drawn_after_the_size_cap(tmp_path, monkeypatch):
+    import src.tasks as tasks
+    from src.tasks import add_text_to_gif_task
+
+    monkeypatch.delenv("GCS_BUCKET_NAME", raising=False)
+    monkeypatch.delenv("GCS_UPLOAD_BUCKET", raising=False)
+    monkeypatch.setattr(tasks, "MAX_GIF_PIXELS", 40 * 30)
+    upload_folder = str(tmp_path)
+    output_dir = os.path.join(upload_folder, "out")
+    layer = {"text": "Hi", "font_size": 12, "color": "#ffffff", "font_family": "Arial", "stroke_color": "#000000",
+             "stroke_width": 1, "horizontal_align": "center", "vertical_align": "middle", "offset_x": 0,
+             "offset_y": 0, "start_frame": 0, "end_frame": 5, "animation_style": "none",
+             "line_height": 1.0, "auto_fit": False}
+    edited = edit_gif_task(_make_gif(os.path.join(upload_folder, "a.gif")),
+                           [{"type": "text", "layers": [layer]}], output_dir, upload_folder)
+    standalone = add_text_to_gif_task(_make_gif(os.path.join(upload_folder, "b.gif")), *(
+        layer[k] for k in ("text", "font_size", "color", "font_family", "stroke_color", "stroke_width",
+                           "horizontal_align", "vertical_align", "offset_x", "offset_y", "start_frame",
+                           "end_frame", "animation_style")), output_dir, upload_folder)
+    with Image.open(os.path.join(upload_folder, edited)) as a, \
+            Image.open(os.path.join(upload_folder, standalone)) as b:
+        assert a.size == b.size == (40, 30)
+        for i in range(6):
+            a.seek(i)
+            b.seek(i)
+            assert a.convert("RGB").tobytes() == b.convert("RGB").tobytes(), i
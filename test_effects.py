@@ -0,0 +1,56 @@
+import tracemalloc
+
+import numpy as np
+from PIL import Image
+
+from src.utils.effects import fade_in, zoom_in
+from src.utils.palette import build_shared_palette, quantize_shared
+
+
+def _image():
+    rng = np.random.default_rng(0)
+    return Image.fromarray((rng.random((30, 40, 3)) * 255).astype("uint8"))
+
+
+def test_fade_in_runs_from_white_to_image():
+    img = _image()
+    stack = fade_in(img, steps=6)
+    assert stack.shape == (6, 30, 40, 3)
+    assert (stack[0] == 255).all()
+    assert (stack[-1] == np.asarray(img)).all()
+
+
+def test_zoom_in_ends_on_the_original_frame():
+    img = _image()
+    stack = zoom_in(img, steps=6)
+    assert stack.shape == (6, 30, 40, 3)
+    assert (stack[-1] == np.asarray(img)).all()
+    assert not (stack[0] == np.asarray(img)).all()
+
+
+def test_quantize_shared_uses_one_palette():
+    frames = quantize_shared(list(fade_in(_image(), steps=4)), colors=64)
+    assert len(frames) == 4
+    assert all(f.mode == "P" for f in frames)
+    assert len({bytes(f.getpalette()) for f in frames}) == 1
+
+
+def test_build_shared_palette_methods():
+    frames = list(fade_in(_image(), steps=3))
+    for method in ("mediancut", "octree", "kmeans"):
+        pal = build_shared_palette(frames, colors=32, method=method)
+        assert pal.mode == "P"
+        assert len(pal.getcolors()) <= 32
+
+
+def test_effects_peak_memory_stays_near_the_output():
+    img = Image.fromarray(np.zeros((1500, 2000, 3), dtype=np.uint8))
+    for effect in (fade_in, zoom_in):
+        tracemalloc.start()
+        try:
+            stack = effect(img, steps=6)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        # The uint8 stack is 54 MB; a float stack of every step would be four times that.
+        assert peak < stack.nbytes * 2, (effect.__name__, peak)
@@ -0,0 +1,18 @@
+from src.utils.ffmpeg_palette import palette_cache_key, paletteuse_filter
+
+
+def test_palette_key_tracks_input_segments_and_colour_settings(tmp_path):
+    video = tmp_path / "v.mp4"
+    video.write_bytes(b"fake video bytes")
+    segs = [{"start": 1, "end": 2}]
+    key = palette_cache_key(str(video), segs, 0.0, 1.0, "full")
+    assert key == palette_cache_key(str(video), [{"start": 1.0, "end": 2.0}], 0, 1, "full")
+    assert key != palette_cache_key(str(video), segs, 0.1, 1.0, "full")
+    assert key != palette_cache_key(str(video), segs, 0.0, 1.0, "diff")
+    assert key != palette_cache_key(str(video), [{"start": 1, "end": 3}], 0.0, 1.0, "full")
+
+
+def test_paletteuse_filter_maps_vsrc_to_vout():
+    fc = paletteuse_filter("[0:v]null[vsrc]", "eq=brightness=0:contrast=1", "bayer", 1)
+    assert fc.startswith("[0:v]null[vsrc];[vsrc]eq=brightness=0:contrast=1[veq];[veq][1:v]paletteuse=dither=bayer")
+    assert fc.endswith("[vout]")
@@ -0,0 +1,251 @@
+import os
+
+import numpy as np
+from PIL import Image, GifImagePlugin
+
+from src.utils.frame_pipeline import (
+    iter_frames,
+    apply_ops,
+    write_gif,
+    write_gif_reversed,
+    resize_op,
+    crop_op,
+    plan_decimation,
+)
+from src.utils.gif_blocks import index_gif
+
+
+def _make_gif(path, n=5, size=(40, 30)):
+    frames = [Image.new("RGB", size, (i * 40, 100, 200 - i * 30)) for i in range(n)]
+    frames[0].save(path, save_all=True, append_images=frames[1:],
+                   duration=[100 + 10 * i for i in range(n)], loop=0)
+    return path
+
+
+def _durations(path):
+    with Image.open(path) as im:
+        out = []
+        for i in range(im.n_frames):
+            im.seek(i)
+            out.append(im.info.get("duration"))
+        return out
+
+
+def test_iter_frames_is_lazy_and_keeps_durations(tmp_path):
+    src = _make_gif(os.path.join(tmp_path, "in.gif"))
+    with Image.open(src) as gif:
+        frames = iter_frames(gif)
+        frame, meta = next(frames)
+        assert meta == {"index": 0, "duration": 100}
+        assert frame.size == (40, 30)
+
+
+def test_write_gif_applies_ops_in_order(tmp_path):
+    src = _make_gif(os.path.join(tmp_path, "in.gif"))
+    out = os.path.join(tmp_path, "out.gif")
+    with Image.open(src) as gif:
+        n = write_gif(apply_ops(iter_frames(gif), [crop_op((0, 0, 20, 20)), resize_op((10, 10))]), out)
+    assert n == 5
+    with Image.open(out) as result:
+        assert result.size == (10, 10)
+        assert result.n_frames == 5
+    assert _durations(out) == [100, 110, 120, 130, 140]
+
+
+def test_write_gif_reversed(tmp_path):
+    src = _make_gif(os.path.join(tmp_path, "in.gif"))
+    out = os.path.join(tmp_path, "rev.gif")
+    with Image.open(src) as gif:
+        write_gif_reversed(iter_frames(gif), out)
+    assert _durations(out) == [140, 130, 120, 110, 100]
+    with Image.open(out) as result:
+        assert result.convert("RGB").getpixel((0, 0))[0] == 160
+
+
+def _moving_box_gif(path, n=6):
+    frames = []
+    for i in range(n):
+        im = Image.new("RGB", (60, 40), (30, 60, 90))
+        im.paste((250, 200, 20 * i), (i * 6, 5, i * 6 + 15, 20))
+        frames.append(im)
+    frames[0].save(path, save_all=True, append_images=frames[1:], duration=80, loop=0)
+    return path
+
+
+def _rgb_frames(path):
+    with Image.open(path) as im:
+        out = []
+        for i in range(im.n_frames):
+            im.seek(i)
+            out.append(im.convert("RGB").tobytes())
+        return out
+
+
+def test_delta_encoding_matches_full_frames(tmp_path):
+    src = _moving_box_gif(os.path.join(tmp_path, "in.gif"))
+    for writer in (write_gif, write_gif_reversed):
+        full = os.path.join(tmp_path, "full.gif")
+        delta = os.path.join(tmp_path, "delta.gif")
+        with Image.open(src) as gif:
+            writer(iter_frames(gif), full)
+        with Image.open(src) as gif:
+            writer(iter_frames(gif), delta, delta=True)
+        assert _rgb_frames(delta) == _rgb_frames(full)
+        assert os.path.getsize(delta) < os.path.getsize(full)
+
+
+def _trail_gif(path, n=6):
+    """Transparent background with a growing trail: pixels only ever turn opaque."""
+    frames = []
+    im = Image.new("RGBA", (60, 40), (0, 0, 0, 0))
+    for i in range(n):
+        im = im.copy()
+        im.paste((250, 20 * i, 20, 255), (i * 6, 5, i * 6 + 15, 20))
+        frames.append(im)
+    frames[0].save(path, save_all=True, append_images=frames[1:], duration=80, loop=0, disposal=1)
+    return path
+
+
+def _rgba_frames(path):
+    with Image.open(path) as im:
+        out = []
+        for i in range(im.n_frames):
+            im.seek(i)
+            rgba = im.convert("RGBA")
+            out.append([px if px[3] else (0, 0, 0, 0) for px in rgba.getdata()])
+        return out
+
+
+def test_transparent_frames_are_delta_encoded(tmp_path):
+    src = _trail_gif(os.path.join(tmp_path, "in.gif"))
+    for writer in (write_gif, write_gif_reversed):
+        full = os.path.join(tmp_path, "full.gif")
+        delta = os.path.join(tmp_path, "delta.gif")
+        with Image.open(src) as gif:
+            writer(iter_frames(gif), full)
+        with Image.open(src) as gif:
+            writer(iter_frames(gif, index=index_gif(src)), delta, delta=True)
+        assert _rgba_frames(delta) == _rgba_frames(full)
+        if writer is write_gif:
+            # Forward, every frame only adds opaque pixels, so none needs a full redraw.
+            assert os.path.getsize(delta) < os.path.getsize(full)
+
+
+
+def _partial_gif(path, n=6, size=(120, 60)):
+    """Global colour table only; after a full first frame, only a box near the right edge is redrawn."""
+    rng = np.random.default_rng(3)
+    palette = list(rng.integers(0, 256, 768))
+    data = b"GIF89a" + size[0].to_bytes(2, "little") + size[1].to_bytes(2, "little") + bytes([0xF7, 0, 0]) + bytes(palette)
+    for i in range(n):
+        shape, offset = ((size[1], size[0]), (0, 0)) if i == 0 else ((20, 19), (95, 30))
+        im = Image.fromarray(rng.integers(0, 256, shape).astype("uint8"), "P")
+        im.putpalette(palette)
+        data += b"".join(GifImagePlugin.getdata(im, offset, duration=80, disposal=1, include_color_table=False))
+    with open(path, "wb") as fp:
+        fp.write(data + b";")
+    return path
+
+
+def _assert_dirty_path_matches(src, ops):
+    index = index_gif(src)
+    assert index["shared_palette"]
+    for keep_palette in (True, False):
+        outputs = []
+        for idx in (index, None):
+            out = src + (".dirty.gif" if idx else ".plain.gif")
+            with Image.open(src) as gif:
+                write_gif(apply_ops(iter_frames(gif, index=idx, keep_palette=keep_palette), ops), out, delta=True)
+            with Image.open(out) as result:
+                for i in range(result.n_frames):
+                    result.seek(i)
+                    x0, y0, x1, y1 = result.tile[0][1]
+                    assert x1 <= result.size[0] and y1 <= result.size[1]
+            outputs.append(_rgb_frames(out))
+        assert outputs[0] == outputs[1]
+
+
+def test_crop_outside_the_change_keeps_frames_on_canvas(tmp_path):
+    src = _partial_gif(os.path.join(tmp_path, "in.gif"))
+    _assert_dirty_path_matches(src, [crop_op((0, 0, 86, 51))])
+
+
+def test_upscale_dirty_box_covers_the_filter(tmp_path):
+    src = _partial_gif(os.path.join(tmp_path, "in.gif"))
+    for factor in (2, 4, 8):
+        _assert_dirty_path_matches(src, [resize_op((120 * factor, 60 * factor))])
+
+
+def test_iter_frames_carries_source_metadata(tmp_path):
+    src = _moving_box_gif(os.path.join(tmp_path, "in.gif"))
+    index = index_gif(src)
+    with Image.open(src) as gif:
+        metas = [meta for _, meta in iter_frames(gif, index=index)]
+    assert [m["bbox"] for m in metas] == [f["bbox"] for f in index["frames"]]
+    assert "dirty" not in metas[0]
+    # The box moves 6px per frame; the change is bounded by the source frame's bbox.
+    x0, y0, x1, y1 = metas[2]["dirty"]
+    assert x0 <= 6 and x1 >= 27 and y0 <= 5 and y1 >= 20
+
+
+def test_plan_decimation_keeps_total_duration_and_favours_motion(tmp_path):
+    path = os.path.join(tmp_path, "in.gif")
+    # Near-still frames: one pixel changes, so Pillow does not merge them on save.
+    still = []
+    for i in range(30):
+        im = Image.new("RGB", (40, 30), (0, 0, 0))
+        im.putpixel((0, 0), (i * 8, 0, 0))
+        still.append(im)
+    moving = []
+    for i in range(30):
+        im = Image.new("RGB", (40, 30), (0, 0, 0))
+        im.paste((255, 255, 255), (i, 0, i + 10, 30))
+        moving.append(im)
+    frames = still + moving
+    frames[0].save(path, save_all=True, append_images=frames[1:],
+                   duration=[50 + i % 2 for i in range(60)], loop=0)
+    with Image.open(path) as gif:
+        total = sum(_durations(path))
+        assert plan_decimation(gif, 60) is None
+        plan = plan_decimation(gif, 20, required=[7])
+        assert len(plan) <= 21 and 0 in plan and 7 in plan
+        assert sum(plan.values()) == total
+        assert sum(1 for i in plan if i >= 30) > sum(1 for i in plan if i < 30)
+        kept = list(iter_frames(gif, plan))
+    assert [m["index"] for _, m in kept] == sorted(plan)
+    assert [m["duration"] for _, m in kept] == [plan[i] for i in sorted(plan)]
+
+
+def _transparent_palette_gif(path, n=4, size=(30, 20)):
+    """Global colour table only, transparent index 3, whose colour index 7 repeats."""
+    rng = np.random.default_rng(4)
+    palette = rng.integers(0, 256, (256, 3)).astype("uint8")
+    palette[7] = palette[3]
+    data = b"GIF89a" + size[0].to_bytes(2, "little") + size[1].to_bytes(2, "little") + bytes([0xF7, 0, 0]) + palette.tobytes()
+    for i in range(n):
+        pixels = rng.integers(0, 256, (size[1], size[0])).astype("uint8")
+        pixels[:, i * 4:i * 4 + 6] = 3
+        pixels[0] = 7
+        im = Image.fromarray(pixels, "P")
+        im.putpalette(palette.tobytes())
+        data += b"".join(GifImagePlugin.getdata(im, (0, 0), duration=80, disposal=2, transparency=3,
+                                                include_color_table=False))
+    with open(path, "wb") as fp:
+        fp.write(data + b";")
+    return path
+
+
+def test_keep_palette_does_not_touch_the_global_loading_strategy(tmp_path, monkeypatch):
+    # Another thread may decode a GIF at any time, so the module-wide setting must be left alone.
+    monkeypatch.setattr(GifImagePlugin, "LOADING_STRATEGY", GifImagePlugin.LoadingStrategy.RGB_ALWAYS)
+    for src in (_partial_gif(os.path.join(tmp_path, "a.gif")), _transparent_palette_gif(os.path.join(tmp_path, "b.gif"))):
+        index = index_gif(src)
+        assert index["shared_palette"]
+        with Image.open(src) as gif:
+            kept = [f for f, _ in iter_frames(gif, index=index, keep_palette=True)]
+        with Image.open(src) as gif:
+            expanded = [f for f, _ in iter_frames(gif, index=index)]
+        assert GifImagePlugin.LOADING_STRATEGY == GifImagePlugin.LoadingStrategy.RGB_ALWAYS
+        assert {f.mode for f in kept} == {"P"}
+        for a, b in zip(kept, expanded):
+            assert np.array_equal(np.asarray(a.convert("RGBA")), np.asarray(b.convert("RGBA")))
@@ -0,0 +1,39 @@
+from src.utils import gcs_helpers
+
+
+class _Blob:
+    def __init__(self, uploads):
+        self.uploads = uploads
+
+    def upload_from_filename(self, path):
+        self.uploads.append(path)
+
+
+class _Client:
+    created = 0
+
+    def __init__(self):
+        _Client.created += 1
+        self.uploads = []
+
+    def bucket(self, name):
+        client = self
+
+        class _Bucket:
+            def blob(self, object_name):
+                return _Blob(client.uploads)
+        return _Bucket()
+
+
+def test_client_is_reused_and_upload_reports_throughput(tmp_path, monkeypatch):
+    monkeypatch.setattr(gcs_helpers.storage, "Client", _Client)
+    monkeypatch.setattr(gcs_helpers, "_client", None)
+    src = tmp_path / "out.gif"
+    src.write_bytes(b"x" * 2048)
+    stats = {}
+    gcs_helpers.upload_file_to_gcs(str(src), "bucket", "a.gif", stats=stats)
+    gcs_helpers.upload_file_to_gcs(str(src), "bucket", "b.gif")
+    assert _Client.created == 1
+    assert gcs_helpers.get_storage_client().uploads == [str(src), str(src)]
+    assert stats["bytes"] == 2048 and stats["parallel"] is False
+    assert stats["mbps"] > 0
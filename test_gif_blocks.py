@@ -0,0 +1,110 @@
+import os
+
+import numpy as np
+from PIL import Image, GifImagePlugin
+
+from src.utils.frame_pipeline import iter_frames, apply_ops, crop_op, write_gif
+from src.utils.gif_blocks import index_gif, passthrough_untouched, write_reversed_blocks
+
+
+def _make_gif(path, n=8, size=(40, 30)):
+    rng = np.random.default_rng(0)
+    base = (rng.random((size[1], size[0], 3)) * 255).astype("uint8")
+    frames = []
+    for i in range(n):
+        arr = base.copy()
+        arr[5:10, i * 4:i * 4 + 4] = 255
+        frames.append(Image.fromarray(arr).convert("P", palette=Image.Palette.ADAPTIVE))
+    frames[0].save(path, save_all=True, append_images=frames[1:],
+                   duration=[100 + 10 * i for i in range(n)], loop=0, disposal=1)
+    return path
+
+
+def _composites(path):
+    with Image.open(path) as im:
+        out = []
+        for i in range(im.n_frames):
+            im.seek(i)
+            out.append(np.asarray(im.convert("RGB")))
+        return out
+
+
+def test_index_gif_reads_frame_metadata(tmp_path):
+    src = _make_gif(os.path.join(tmp_path, "in.gif"))
+    index = index_gif(src)
+    assert index["size"] == (40, 30)
+    assert index["loop"] == 0
+    assert [f["duration"] for f in index["frames"]] == [100 + 10 * i for i in range(8)]
+    assert all(f["disposal"] == 1 for f in index["frames"])
+    assert index_gif(__file__) is None
+
+
+def test_untouched_frames_are_copied(tmp_path):
+    src = _make_gif(os.path.join(tmp_path, "in.gif"))
+    out = os.path.join(tmp_path, "out.gif")
+    touched = {3, 4}
+    raw = []
+
+    def _blank(frame, meta):
+        return Image.new("RGB", frame.size, (0, 0, 0))
+
+    with Image.open(src) as gif:
+        frames = passthrough_untouched(iter_frames(gif), src, index_gif(src), lambda i: i in touched)
+        frames = apply_ops(frames, [lambda f, m: _blank(f, m) if m["index"] in touched else f])
+        write_gif(((f, m) for f, m in frames if not raw.append("raw" in m)), out, delta=True)
+
+    # Frame 5 is re-encoded to bring the canvas back in sync, the rest is copied.
+    assert raw == [True, True, True, False, False, False, True, True]
+    expected, actual = _composites(src), _composites(out)
+    for i in range(8):
+        if i in touched:
+            assert not actual[i].any()
+        else:
+            assert np.array_equal(expected[i], actual[i])
+
+
+def test_reverse_copies_independent_frames(tmp_path):
+    rng = np.random.default_rng(1)
+    src = os.path.join(tmp_path, "noise.gif")
+    frames = [Image.fromarray((rng.random((30, 40, 3)) * 255).astype("uint8")).convert("P", palette=Image.Palette.ADAPTIVE)
+              for _ in range(6)]
+    frames[0].save(src, save_all=True, append_images=frames[1:], duration=[50 * (i + 1) for i in range(6)], loop=0, disposal=2)
+    out = os.path.join(tmp_path, "out.gif")
+
+    assert write_reversed_blocks(src, index_gif(src), out, loop=0, plan={0: 100, 2: 300, 5: 300}) == 3
+    expected, actual = _composites(src), _composites(out)
+    assert all(np.array_equal(a, e) for a, e in zip(actual, [expected[5], expected[2], expected[0]]))
+    assert [f["duration"] for f in index_gif(out)["frames"]] == [300, 300, 100]
+
+    # Frames that only redraw part of the canvas need decoding.
+    moving = _make_gif(os.path.join(tmp_path, "in.gif"))
+    assert write_reversed_blocks(moving, index_gif(moving), out) is None
+
+
+def _global_palette_gif(path, n=6, size=(40, 30)):
+    """Frames drawn with the global colour table only, as most encoders write them."""
+    rng = np.random.default_rng(2)
+    palette = list(rng.integers(0, 256, 768))
+    data = b"GIF89a" + size[0].to_bytes(2, "little") + size[1].to_bytes(2, "little") + bytes([0xF7, 0, 0]) + bytes(palette)
+    for i in range(n):
+        im = Image.fromarray(rng.integers(0, 256, (10, 12)).astype("uint8"), "P")
+        im.putpalette(palette)
+        data += b"".join(GifImagePlugin.getdata(im, (i * 4, i * 3), duration=80, disposal=1, include_color_table=False))
+    with open(path, "wb") as fp:
+        fp.write(data + b";")
+    return path
+
+
+def test_crop_keeps_shared_palette(tmp_path):
+    src = _global_palette_gif(os.path.join(tmp_path, "in.gif"))
+    out = os.path.join(tmp_path, "out.gif")
+    index = index_gif(src)
+    assert index["shared_palette"]
+    assert not index_gif(_make_gif(os.path.join(tmp_path, "local.gif")))["shared_palette"]
+
+    with Image.open(src) as gif:
+        frames = list(iter_frames(gif, None, index, keep_palette=True))
+        assert {f.mode for f, _ in frames} == {"P"}
+        write_gif(apply_ops(iter(frames), [crop_op((5, 4, 35, 26))]), out, delta=True)
+    expected, actual = _composites(src), _composites(out)
+    assert all(np.array_equal(a, e[4:26, 5:35]) for a, e in zip(actual, expected))
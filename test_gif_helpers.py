@@ -38,3 +38,36 @@ def test_extract_and_prepare_layers(tmp_path):
     prepared = prepare_layers(layers, fps=10, n_frames=10, temp_dir=str(tmp_path))
     assert prepared[0]['start_frame'] == 0
     assert prepared[0]['end_frame'] == 9
+
+
+def test_font_url_changes_the_cache_key(tmp_path, monkeypatch):
+    from src.utils import gif_helpers
+    from src.utils.result_cache import cache_key
+
+    fonts = {"https://fonts.example/a.ttf": b"font-a", "https://fonts.example/b.ttf": b"font-b"}
+
+    class _Response:
+        def __init__(self, url):
+            self.body = fonts[url]
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def raise_for_status(self):
+            pass
+
+        def iter_content(self, chunk_size):
+            yield self.body
+
+    monkeypatch.setattr(gif_helpers.requests, "get", lambda url, **kw: _Response(url))
+    gif_path = os.path.join(tmp_path, "in.gif")
+    Image.new("RGB", (10, 10), "blue").save(gif_path)
+
+    keys = set()
+    for url in fonts:
+        layers = prepare_layers([{"text": "Hi", "font_url": url}], 10, 1, str(tmp_path))
+        keys.add(cache_key("add-text-layers", [gif_path], {"layers": gif_helpers.cache_params_layers(layers)}))
+    assert len(keys) == 2
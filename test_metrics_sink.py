@@ -0,0 +1,60 @@
+from src.utils import metrics_sink
+
+
+def test_failed_write_keeps_rows_for_retry(monkeypatch):
+    metrics_sink._reset()
+    written = []
+    outage = {"on": True}
+
+    def fake_write(batch):
+        if outage["on"]:
+            raise RuntimeError("database is locked")
+        written.extend(batch)
+
+    monkeypatch.setattr(metrics_sink, "_write", fake_write)
+    monkeypatch.setattr(metrics_sink, "_ensure_thread", lambda: None)
+    monkeypatch.setattr(metrics_sink, "METRICS_BATCH_SIZE", 2)
+
+    for i in range(5):
+        metrics_sink.submit(i)
+    assert metrics_sink.flush() is False
+    assert metrics_sink.stats()["pending"] == 5
+
+    outage["on"] = False
+    assert metrics_sink.flush() is True
+    assert written == [0, 1, 2, 3, 4]
+    stats = metrics_sink.stats()
+    assert stats["written"] == 5 and stats["failed_writes"] == 1 and stats["pending"] == 0
+    assert stats["rejected"] == 0
+
+
+def test_bad_row_is_dropped_instead_of_blocking(monkeypatch):
+    metrics_sink._reset()
+    written = []
+
+    def fake_write(batch):
+        if "bad" in batch:
+            raise ValueError("value too long for type character varying(512)")
+        written.extend(batch)
+
+    monkeypatch.setattr(metrics_sink, "_write", fake_write)
+    monkeypatch.setattr(metrics_sink, "_ensure_thread", lambda: None)
+    monkeypatch.setattr(metrics_sink, "METRICS_BATCH_SIZE", 4)
+
+    for row in ["bad", 1, 2, "bad", 3, 4, 5]:
+        metrics_sink.submit(row)
+    assert metrics_sink.flush() is True
+    assert written == [1, 2, 3, 4, 5]
+    stats = metrics_sink.stats()
+    assert stats["rejected"] == 2 and stats["pending"] == 0 and stats["failed_writes"] == 0
+
+
+def test_full_buffer_drops_oldest(monkeypatch):
+    metrics_sink._reset()
+    monkeypatch.setattr(metrics_sink, "_ensure_thread", lambda: None)
+    metrics_sink._buffer = metrics_sink.collections.deque(maxlen=3)
+    for i in range(5):
+        metrics_sink.submit(i)
+    assert list(metrics_sink._buffer) == [2, 3, 4]
+    assert metrics_sink.stats()["dropped"] == 2
+    metrics_sink._reset()
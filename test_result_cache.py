@@ -0,0 +1,107 @@
+from src.utils.result_cache import cache_key
+
+
+def test_cache_key_depends_on_bytes_and_params_not_param_order(tmp_path):
+    a = tmp_path / "a.gif"
+    b = tmp_path / "b.gif"
+    a.write_bytes(b"GIF89a-one")
+    b.write_bytes(b"GIF89a-one")
+    key = cache_key("resize", [str(a)], {"width": 100, "height": 50})
+    assert key.startswith("gifcache:resize:")
+    assert key == cache_key("resize", [str(b)], {"height": 50, "width": 100})
+    assert key != cache_key("resize", [str(a)], {"width": 101, "height": 50})
+    assert key != cache_key("crop", [str(a)], {"width": 100, "height": 50})
+    b.write_bytes(b"GIF89a-two")
+    assert key != cache_key("resize", [str(b)], {"width": 100, "height": 50})
+
+
+class _Redis:
+    def __init__(self, data):
+        self.data = data
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def zrem(self, *args):
+        pass
+
+    def hincrby(self, *args):
+        pass
+
+
+def test_expired_gcs_result_is_evicted(tmp_path, monkeypatch):
+    from src.utils import result_cache
+
+    r = _Redis({"gifcache:resize:a": "out/a.gif", "gifcache:resize:b": "out/b.gif"})
+    monkeypatch.setattr(result_cache, "_get_redis", lambda: r)
+    monkeypatch.setenv("GCS_UPLOAD_BUCKET", "bucket")
+    monkeypatch.setattr(result_cache, "gcs_object_exists", lambda bucket, name: name == "out/a.gif")
+    assert result_cache.lookup("gifcache:resize:a", str(tmp_path)) == "out/a.gif"
+    assert result_cache.lookup("gifcache:resize:b", str(tmp_path)) is None
+    assert "gifcache:resize:b" not in r.data
+
+    # A failed existence check is a miss, but the entry stays
+    def unreachable(bucket, name):
+        raise ConnectionError("gcs down")
+    monkeypatch.setattr(result_cache, "gcs_object_exists", unreachable)
+    assert result_cache.lookup("gifcache:resize:a", str(tmp_path)) is None
+    assert "gifcache:resize:a" in r.data
+
+
+def test_large_inputs_skip_hashing(tmp_path, monkeypatch):
+    from src.utils import result_cache
+
+    big = tmp_path / "big.mp4"
+    big.write_bytes(b"x" * 4096)
+    queued = []
+
+    class _Task:
+        def apply_async(self, args, queue):
+            queued.append(args)
+            return type("Result", (), {"id": "task-1"})()
+
+    monkeypatch.setattr(result_cache, "RESULT_CACHE_MAX_HASH_BYTES", 1024)
+    monkeypatch.setattr(result_cache, "stash_args", lambda args, paths: args)
+    monkeypatch.setattr(result_cache, "file_digest", lambda path: (_ for _ in ()).throw(AssertionError("hashed")))
+    task_id, cached = result_cache.dispatch_cached(_Task(), [str(big)], tool="video-to-gif", input_paths=[str(big)],
+                                                   params={}, upload_folder=str(tmp_path))
+    assert (task_id, cached) == ("task-1", None)
+    assert queued == [[str(big)]]
+
+    # A digest taken while the upload streamed in costs nothing, whatever the size
+    result_cache.remember_digest(str(big), "0" * 64)
+    assert result_cache.hash_cost([str(big)]) == 0
+
+
+def test_add_text_upload_goes_through_the_cache(tmp_path, monkeypatch):
+    import io
+
+    from PIL import Image
+
+    from src.main import app
+    from src.routes import gif as gif_routes
+    from src.utils.limiter import limiter
+
+    calls = []
+
+    def fake_dispatch(task, args, **kwargs):
+        calls.append((task, args, kwargs))
+        return "task-1", "out/cached.gif"
+
+    monkeypatch.setitem(app.config, "UPLOAD_FOLDER", str(tmp_path))
+    monkeypatch.setattr(limiter, "enabled", False)
+    monkeypatch.setattr(gif_routes, "dispatch_cached", fake_dispatch)
+    buf = io.BytesIO()
+    Image.new("RGB", (10, 10), "red").save(buf, format="GIF")
+    buf.seek(0)
+    r = app.test_client().post("/api/add-text", data={"file": (buf, "in.gif"), "text": "Hi"},
+                               content_type="multipart/form-data")
+    assert r.status_code == 202
+    assert r.get_json() == {"task_id": "task-1", "cached": True, "result": "out/cached.gif"}
+    task, args, kwargs = calls[0]
+    assert task is gif_routes.add_text_to_gif_task and args[1] == "Hi"
+    assert kwargs["tool"] == "add-text" and kwargs["params"]["text"] == "Hi"
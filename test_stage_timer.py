@@ -0,0 +1,23 @@
+from src.utils import stage_timer
+from src.utils.stage_timer import StageTimer
+
+
+def test_nested_stages_are_exclusive(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(stage_timer.time, "perf_counter", lambda: now[0])
+    timer = StageTimer()
+
+    def _decoded():
+        for item in "ab":
+            now[0] += 2
+            yield item
+
+    frames = timer.iterate("decode", _decoded())
+    with timer.stage("encode"):
+        for _ in frames:
+            now[0] += 1
+    timer.add("upload", 2500)
+
+    # Producing frames is booked to decode only, although encode was pulling them.
+    assert timer.ms() == {"decode": 4000, "encode": 2000, "upload": 2500}
+    assert timer.summary() == "encode=2000ms, decode=4000ms, upload=2500ms"
@@ -0,0 +1,84 @@
+import json
+
+from src.utils import task_events
+
+
+class FakePubSub:
+    def __init__(self, messages):
+        self.messages = list(messages)
+        self.channels = []
+
+    def subscribe(self, name):
+        self.channels.append(name)
+
+    def get_message(self, timeout=None):
+        return self.messages.pop(0) if self.messages else None
+
+    def close(self):
+        pass
+
+
+def _events(chunks):
+    return [json.loads(c.split("data: ", 1)[1]) for c in chunks if c.startswith("event: status")]
+
+
+def test_stream_pushes_progress_then_follows_callback(monkeypatch):
+    pubsubs = []
+    subscribed = []
+
+    def fake_subscribe(task_id):
+        subscribed.append(task_id)
+        ps = FakePubSub(pubsubs.pop(0))
+        return ps
+
+    states = {
+        "orchestrator": [({"state": "PENDING", "status": "Pending..."}, "orchestrator"),
+                         ({"state": "PROGRESS", "status": "Building GIF", "progress": 80}, "callback"),
+                         ({"state": "PROGRESS", "status": "Building GIF", "progress": 80}, "callback"),
+                         ({"state": "SUCCESS", "status": "Task completed!", "result": "out.gif"}, "callback")],
+    }
+    monkeypatch.setattr(task_events, "_resolve", lambda task_id: states[task_id].pop(0))
+    monkeypatch.setattr(task_events, "_subscribe", fake_subscribe)
+    pubsubs.extend([
+        [{"type": "message", "data": json.dumps({"state": "PROGRESS", "status": "Downloading", "progress": 30})},
+         {"type": "message", "data": json.dumps({"state": "SUCCESS"})}],
+        [{"type": "message", "data": json.dumps({"state": "SUCCESS"})}],
+    ])
+
+    events = _events(task_events.stream("orchestrator", timeout=5, keepalive=0.01))
+    assert [e["state"] for e in events] == ["PENDING", "PROGRESS", "PROGRESS", "SUCCESS"]
+    assert events[1]["progress"] == 30 and events[2]["progress"] == 80
+    assert events[-1]["result"] == "out.gif"
+    assert subscribed == ["orchestrator", "callback"]
+
+
+class FakeTask:
+    class request:
+        id = "task-1"
+        is_eager = False
+
+    def __init__(self):
+        self.states = []
+
+    def update_state(self, state=None, meta=None):
+        self.states.append((state, meta))
+
+
+def test_progress_updates_are_rate_limited(monkeypatch):
+    clock = {"now": 0.0}
+    published = []
+    monkeypatch.setattr(task_events.time, "monotonic", lambda: clock["now"])
+    monkeypatch.setattr(task_events, "publish", lambda task_id, payload: published.append(payload))
+    task = FakeTask()
+    reporter = task_events.ProgressReporter(task, min_interval=1.0)
+
+    frames = []
+    for frame in reporter.iterate(range(100), 100, 0, 100, "Resizing frames"):
+        frames.append(frame)
+        clock["now"] += 0.0625  # 16 frames per second
+    reporter.update(100, "Uploading", force=True)
+
+    assert frames == list(range(100))
+    assert [m["progress"] for _, m in task.states] == [1, 17, 33, 49, 65, 81, 97, 100]
+    assert all(state == "PROGRESS" for state, _ in task.states)
+    assert published[-1] == {"state": "PROGRESS", "status": "Uploading", "progress": 100}
@@ -0,0 +1,99 @@
+import os
+
+from PIL import Image, ImageDraw
+
+from src.utils.frame_pipeline import apply_ops, iter_frames, write_gif
+from src.utils.gif_blocks import index_gif, passthrough_untouched
+from src.utils.text_layers import (
+    layer_active, load_font, load_layer_font, normalize_layers, render_text_sprite, text_layers_op, wrap_text,
+    _wrap_text,
+)
+
+
+def test_fonts_are_loaded_once_per_family_and_size():
+    assert load_font('Arial', 24) is load_font('Arial', 24)
+    assert load_layer_font({'font_family': 'Arial'}, 24) is load_font('Arial', 24)
+    assert load_font('Arial', 24) is not load_font('Arial', 30)
+
+
+def test_wrap_text_is_memoized():
+    font = load_font('Arial', 16)
+    draw = ImageDraw.Draw(Image.new('RGB', (10, 10)))
+    before = _wrap_text.cache_info().hits
+    first = wrap_text(draw, 'one two three four five six', font, 60)
+    second = wrap_text(draw, 'one two three four five six', font, 60)
+    assert first == second and len(first) > 1
+    assert _wrap_text.cache_info().hits == before + 1
+
+
+def _layer(**kw):
+    return normalize_layers([{'text': 'Hi', 'font_size': 20, 'color': '#ffffff', 'stroke_color': '#000000',
+                              'stroke_width': 3, 'start_frame': 0, 'end_frame': 4, **kw}])
+
+
+def test_render_text_sprite_covers_the_stroke():
+    font = load_font('Arial', 20)
+    plain, _ = render_text_sprite(['Hi'], font, (255, 255, 255))
+    stroked, (dx, _) = render_text_sprite(['Hi'], font, (255, 255, 255), (0, 0, 0), 3)
+    assert stroked.width == plain.width + 6 and stroked.height == plain.height + 6
+    assert dx == -3
+
+
+def test_fade_scales_sprite_alpha():
+    op = text_layers_op(_layer(animation_style='fade'), is_animated=True)
+    frame = Image.new('RGB', (80, 60), (0, 0, 255))
+    first = op(frame.copy(), {'index': 0})
+    middle = op(frame.copy(), {'index': 2})
+    last = op(frame.copy(), {'index': 4})
+    assert first.tobytes() == frame.tobytes()
+    assert max(px[0] for px in middle.getdata()) < max(px[0] for px in last.getdata()) == 255
+    assert op(frame.copy(), {'index': 5}).tobytes() == frame.tobytes()
+
+
+def _transparent_gif(path, n=6, size=(80, 60)):
+    frames = []
+    for i in range(n):
+        frame = Image.new('RGBA', size, (0, 0, 0, 0))
+        frame.paste((255, 0, 0, 255), (i * 10, 40, i * 10 + 10, 50))
+        frames.append(frame)
+    frames[0].save(path, save_all=True, append_images=frames[1:], duration=100, loop=0, disposal=2)
+    return path
+
+
+def test_captioned_frames_keep_source_transparency(tmp_path):
+    src = _transparent_gif(os.path.join(tmp_path, 'in.gif'))
+    out = os.path.join(tmp_path, 'out.gif')
+    layers = _layer(start_frame=2, end_frame=3, vertical_align='top')
+    with Image.open(src) as gif:
+        frames = passthrough_untouched(iter_frames(gif), src, index_gif(src),
+                                       lambda i: any(layer_active(l, i) for l in layers))
+        write_gif(apply_ops(frames, [text_layers_op(layers)]), out, delta=True)
+
+    with Image.open(out) as im:
+        for i in range(im.n_frames):
+            im.seek(i)
+            rgba = im.convert('RGBA')
+            # The bottom-right corner is transparent in every source frame.
+            assert rgba.getpixel((79, 59))[3] == 0, i
+            assert rgba.getpixel((i * 10 + 5, 45)) == (255, 0, 0, 255), i
+
+
+def test_downloaded_fonts_do_not_pin_their_file(tmp_path):
+    import shutil
+
+    from src.utils.text_layers import FALLBACK_FONT
+
+    font_dir = tmp_path / 'request'
+    font_dir.mkdir()
+    path = str(font_dir / 'font.ttf')
+    shutil.copyfile(FALLBACK_FONT, path)
+    font = load_layer_font({'font_path': path}, 22)
+    shutil.rmtree(font_dir)
+    # FreeType maps a font opened by path, pinning the deleted file for the font's lifetime.
+    with open('/proc/self/maps') as fp:
+        assert str(font_dir) not in fp.read()
+
+    # The same font downloaded again by another request is served from the cache.
+    font_dir.mkdir()
+    shutil.copyfile(FALLBACK_FONT, path)
+    assert load_layer_font({'font_path': path}, 22) is font
@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+from src.utils import transport
+
+
+def test_shm_handoff_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setenv("INLINE_TRANSPORT", "shm")
+    monkeypatch.setattr(transport, "SHM_DIR", str(tmp_path / "shm"))
+    src = tmp_path / "in.gif"
+    src.write_bytes(b"GIF89a small input")
+    args = transport.stash_args([str(src), 10, "x"], [str(src)])
+    token = args[0]
+    assert token.startswith("shm://") and token.endswith("/in.gif")
+    assert args[1:] == [10, "x"]
+    assert not src.exists()
+    local = transport.resolve_token(token, str(tmp_path / "out"))
+    with open(local, "rb") as fp:
+        assert fp.read() == b"GIF89a small input"
+
+
+def test_large_inputs_keep_their_path(tmp_path, monkeypatch):
+    monkeypatch.setenv("INLINE_TRANSPORT", "shm")
+    monkeypatch.setattr(transport, "SHM_DIR", str(tmp_path / "shm"))
+    monkeypatch.setattr(transport, "INLINE_TRANSPORT_MAX_BYTES", 4)
+    src = tmp_path / "big.gif"
+    src.write_bytes(b"0123456789")
+    assert transport.stash_args([str(src)], [str(src)]) == [str(src)]
+    assert os.path.exists(src)
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.ttl = {}
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+        self.ttl[key] = ex
+
+    def pipeline(self):
+        redis = self
+
+        class _Pipe:
+            def __init__(self):
+                self.calls = []
+
+            def get(self, key):
+                self.calls.append(lambda: redis.data.get(key))
+
+            def delete(self, key):
+                self.calls.append(lambda: int(redis.data.pop(key, None) is not None))
+
+            def execute(self):
+                return [call() for call in self.calls]
+
+        return _Pipe()
+
+
+def test_redis_inputs_are_deleted_once_read(tmp_path, monkeypatch):
+    fake = _FakeRedis()
+    monkeypatch.setenv("INLINE_TRANSPORT", "redis")
+    monkeypatch.setattr(transport, "get_redis", lambda decode_responses=True: fake)
+    tokens = []
+    for _ in range(2):
+        src = tmp_path / "in.gif"
+        src.write_bytes(b"GIF89a same input")
+        tokens.append(transport.stash_args([str(src)], [str(src)])[0])
+    # Identical uploads get separate keys, so one job's read cannot remove the other's input.
+    assert tokens[0] != tokens[1] and len(fake.data) == 2
+    assert set(fake.ttl.values()) == {transport.INLINE_TRANSPORT_TTL}
+
+    local = transport.resolve_token(tokens[0], str(tmp_path / "out"))
+    with open(local, "rb") as fp:
+        assert fp.read() == b"GIF89a same input"
+    assert len(fake.data) == 1
+    with pytest.raises(FileNotFoundError):
+        transport.resolve_token(tokens[0], str(tmp_path / "out"))
+    transport.resolve_token(tokens[1], str(tmp_path / "out2"))
+    assert fake.data == {}
@@ -0,0 +1,59 @@
+import hashlib
+import io
+import os
+
+from flask import Flask, jsonify, request
+
+from src.utils import result_cache
+from src.utils.upload_stream import HashingFile, UploadRequest, receive_into, save_upload
+
+
+def test_upload_is_written_once_into_the_session_dir(tmp_path, monkeypatch):
+    app = Flask(__name__)
+    app.request_class = UploadRequest
+    seen = {}
+
+    @app.post("/upload")
+    def upload():
+        receive_into(str(tmp_path))
+        file = request.files["file"]
+        seen["streamed"] = isinstance(file.stream, HashingFile)
+        path = save_upload(file, os.path.join(str(tmp_path), "video.mp4"))
+        return jsonify(path=path)
+
+    payload = os.urandom(3 * 1024 * 1024)
+    r = app.test_client().post("/upload", data={"file": (io.BytesIO(payload), "video.mp4")},
+                               content_type="multipart/form-data")
+    assert r.status_code == 200
+    assert seen["streamed"]
+    assert sorted(os.listdir(tmp_path)) == ["video.mp4"]
+    assert (tmp_path / "video.mp4").read_bytes() == payload
+
+    # The digest taken while streaming is reused for the cache key instead of re-reading the file
+    monkeypatch.setattr(result_cache, "open", lambda *a, **k: (_ for _ in ()).throw(AssertionError("re-read")),
+                        raising=False)
+    assert result_cache.file_digest(r.get_json()["path"]) == hashlib.sha256(payload).hexdigest()
+
+
+def test_unsaved_and_truncated_parts_are_removed(tmp_path):
+    app = Flask(__name__)
+    app.request_class = UploadRequest
+
+    @app.post("/upload")
+    def upload():
+        receive_into(str(tmp_path))
+        save_upload(request.files["keep"], os.path.join(str(tmp_path), "keep.mp4"))
+        return jsonify(ignored=request.files["ignored"].filename)
+
+    client = app.test_client()
+    r = client.post("/upload", content_type="multipart/form-data",
+                    data={"keep": (io.BytesIO(b"a" * 1000), "keep.mp4"), "ignored": (io.BytesIO(b"b" * 1000), "x.mp4")})
+    assert r.status_code == 200
+    assert os.listdir(tmp_path) == ["keep.mp4"]
+
+    # The client goes away mid-body: the form parser fails, the part it started is still removed
+    body = (b"--b\r\nContent-Disposition: form-data; name=\"keep\"; filename=\"v.mp4\"\r\n"
+            b"Content-Type: video/mp4\r\n\r\n" + b"c" * 5000)
+    r = client.post("/upload", data=body, headers={"Content-Type": "multipart/form-data; boundary=b"})
+    assert r.status_code >= 400
+    assert os.listdir(tmp_path) == ["keep.mp4"]
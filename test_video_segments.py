@@ -0,0 +1,19 @@
+from src.utils.video_segments import resolve_segment_strategy, build_video_source
+
+
+def test_auto_strategy_seeks_for_multiple_or_late_segments(monkeypatch):
+    monkeypatch.delenv("VIDEO_SEGMENT_STRATEGY", raising=False)
+    assert resolve_segment_strategy(None, [{"start": 0, "end": 3}]) == "trim"
+    assert resolve_segment_strategy(None, [{"start": 60, "end": 63}]) == "seek"
+    assert resolve_segment_strategy("auto", [{"start": 0, "end": 1}, {"start": 2, "end": 3}]) == "seek"
+    assert resolve_segment_strategy("trim", [{"start": 60, "end": 63}]) == "trim"
+    monkeypatch.setenv("VIDEO_SEGMENT_STRATEGY", "seek")
+    assert resolve_segment_strategy(None, [{"start": 0, "end": 3}]) == "seek"
+
+
+def test_trim_source_filters_every_segment(tmp_path):
+    segments = [{"start": 1, "end": 2}, {"start": 5, "end": 6}]
+    input_args, prefix = build_video_source("in.mp4", segments, 10, 320, 180, "trim", str(tmp_path))
+    assert input_args == ["-i", "in.mp4"]
+    assert "trim=start=5:end=6" in prefix
+    assert prefix.endswith("[vcat]fps=10,scale=320:180:flags=lanczos[vsrc]")
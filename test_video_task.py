@@ -0,0 +1,17 @@
+import os
+import time
+
+import pytest
+
+from src.tasks import convert_video_to_gif_task
+
+
+def test_missing_input_fails_fast(tmp_path, monkeypatch):
+    monkeypatch.delenv("GCS_BUCKET_NAME", raising=False)
+    monkeypatch.delenv("GCS_UPLOAD_BUCKET", raising=False)
+    upload_folder = str(tmp_path)
+    started = time.monotonic()
+    with pytest.raises(FileNotFoundError):
+        convert_video_to_gif_task(os.path.join(upload_folder, "gone.mp4"), [{"start": 0, "end": 1}], 10, 64, 64,
+                                  os.path.join(upload_folder, "out"), upload_folder)
+    assert time.monotonic() - started < 1